@@ -0,0 +1,5 @@
+"""
+Standalone benchmarks for the hlt starter kit and the bot utilities.
+
+Run them from the repository root, e.g. ``python -m benchmarks.bench_parse``.
+"""
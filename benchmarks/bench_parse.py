@@ -0,0 +1,37 @@
+"""
+Benchmark for hlt.game_map.Map._parse.
+
+Generates 4-player frames (engine.scenario) with a growing number of ships and reports the parse time per frame
+and per ship. With the cursor based parser the time per ship should stay flat as the frame grows.
+
+Usage: python -m benchmarks.bench_parse [--repeat N]
+"""
+
+import argparse
+import timeit
+
+from engine import scenario
+
+SHIP_COUNTS = [50, 100, 200, 400, 800, 1600]
+NUM_PLAYERS = 4
+NUM_PLANETS = 28
+WIDTH, HEIGHT = 384, 256
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="timed parses per frame size")
+    args = parser.parse_args()
+
+    print("{:>8} {:>12} {:>12}".format("ships", "ms/frame", "us/ship"))
+    for num_ships in SHIP_COUNTS:
+        generated = scenario.generate(num_players=NUM_PLAYERS, num_ships=num_ships, num_planets=NUM_PLANETS,
+                                      width=WIDTH, height=HEIGHT)
+        parsed = generated.map()
+        frame = generated.frame
+        best = min(timeit.repeat(lambda: parsed._parse(frame), number=1, repeat=args.repeat))
+        print("{:>8} {:>12.3f} {:>12.3f}".format(num_ships, best * 1e3, best * 1e6 / num_ships))
+
+
+if __name__ == "__main__":
+    main()
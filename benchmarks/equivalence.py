@@ -0,0 +1,114 @@
+"""
+Equivalence gate for the batched collision kernels.
+
+Vectorized versions of scalar hot paths are only drop-in replacements if they give the same bits: the bot compares
+distances against thresholds, and one ulp flips a borderline course from free to blocked. This check draws random
+segment/circle pairs, half of them placed so that the closest approach lands right on the collision distance, and
+compares the kernel behind hlt.collision.intersect_segment_circles and intersect_segments_circles with
+intersect_segment_circle pair by pair, both the intersection result and the closest approach time. The first
+mismatches are printed and the check exits with status 1.
+
+Usage: python -m benchmarks.equivalence [--pairs N] [--seed N]
+"""
+
+import argparse
+import math
+import random
+import sys
+
+import numpy as np
+
+from hlt import collision
+from hlt.entity import Position
+
+#: Segment/circle pairs drawn by default
+PAIRS = 300000
+#: Fudge the kernels are called with, the ship radius
+FUDGE = 0.5
+#: Mismatches printed before giving up
+SHOWN = 5
+
+
+def _pairs(rng, count):
+    """
+    Random segments and circles over a Halite-sized map. Every other pair has its circle at exactly the collision
+    distance from a point of the segment, where rounding decides the outcome.
+
+    :return: Columns start_x, start_y, end_x, end_y, x, y, radius
+    :rtype: list[numpy.ndarray]
+    """
+    rows = []
+    for index in range(count):
+        start_x, start_y = rng.uniform(0, 384), rng.uniform(0, 256)
+        if index % 16 == 0:
+            end_x, end_y = start_x, start_y
+        else:
+            length, angle = rng.uniform(0, 60), rng.uniform(0, 2 * math.pi)
+            end_x, end_y = start_x + length * math.cos(angle), start_y + length * math.sin(angle)
+        radius = rng.choice([0.5, rng.uniform(3, 16)])
+        if index % 2:
+            t, side = rng.uniform(-0.2, 1.2), rng.uniform(0, 2 * math.pi)
+            x = start_x + (end_x - start_x) * t + (radius + FUDGE) * math.cos(side)
+            y = start_y + (end_y - start_y) * t + (radius + FUDGE) * math.sin(side)
+        else:
+            x, y = start_x + rng.uniform(-80, 80), start_y + rng.uniform(-80, 80)
+        rows.append((start_x, start_y, end_x, end_y, x, y, radius))
+    return [np.array(column) for column in zip(*rows)]
+
+
+def _closest_time(start, end, circle):
+    """
+    :return: The closest approach time intersect_segment_circle computes, before its t < 0 test
+    :rtype: float
+    """
+    dx = end.x - start.x
+    dy = end.y - start.y
+    a = dx**2 + dy**2
+    b = -2 * (start.x**2 - start.x*end.x - start.x*circle.x + end.x*circle.x +
+              start.y**2 - start.y*end.y - start.y*circle.y + end.y*circle.y)
+    return 0.0 if a == 0.0 else max(min(-b / (2 * a), 1.0), 0.0)
+
+
+def check(count, seed):
+    """
+    :param int count: Pairs to draw
+    :param int seed: Seed of the draw
+    :return: Whether every pair matched
+    :rtype: bool
+    """
+    start_x, start_y, end_x, end_y, x, y, radius = _pairs(random.Random(seed), count)
+    # The kernel broadcasts: one-dimensional columns test the pairs element by element
+    hits, times = collision._intersect(start_x, start_y, end_x, end_y, x, y, radius, FUDGE)
+    # The scalar version gets Python floats, as in the bot: ** on numpy scalars is not the C pow
+    start_x, start_y, end_x, end_y, x, y, radius = [column.tolist() for column in
+                                                    (start_x, start_y, end_x, end_y, x, y, radius)]
+    mismatches = 0
+    for index in range(count):
+        start, end = Position(start_x[index], start_y[index]), Position(end_x[index], end_y[index])
+        circle = Position(x[index], y[index])
+        circle.radius = radius[index]
+        expected_hit = collision.intersect_segment_circle(start, end, circle, fudge=FUDGE)
+        expected_time = _closest_time(start, end, circle)
+        if bool(hits[index]) != expected_hit or float(times[index]) != expected_time:
+            mismatches += 1
+            if mismatches <= SHOWN:
+                print("pair {}: segment ({!r}, {!r}) -> ({!r}, {!r}), circle ({!r}, {!r}) r={!r}: kernel {} t={!r}, "
+                      "scalar {} t={!r}".format(index, start.x, start.y, end.x, end.y, circle.x, circle.y,
+                                                circle.radius, bool(hits[index]), float(times[index]), expected_hit,
+                                                expected_time))
+    print("collision._intersect: {} of {} pairs differ from intersect_segment_circle".format(
+        mismatches, count))
+    return not mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=PAIRS, help="segment/circle pairs to draw")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the draw")
+    args = parser.parse_args()
+    if not check(args.pairs, args.seed):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Golden-output regression gate for bot1.
+
+Replays the frames of stored recordings (hlt.replay files) through the bot1 turn loop in-process, with a fresh
+FeatureCollector and RushDetector, and compares every command queue byte for byte with the reply stored for that
+frame. Every turn must also fit in the time budget. The first diverging or overrunning turn is printed and the
+check exits with status 1, so an optimization that changes what the bot does cannot go unnoticed.
+
+Recordings come from the engine (python -m engine.server ... --record DIR) or from hlt.Game(record=...). After an
+intended change of behavior, regenerate the golden replies from the same frames:
+
+    python -m benchmarks.golden record benchmarks/golden/bot1_2p.hlr benchmarks/golden/bot1_2p.hlr
+
+Usage: python -m benchmarks.golden check [GOLDEN ...] [--budget-ms MS]
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+import bot1
+from hlt import replay
+from utils.feature_collector import FeatureCollector
+from utils.rush_detector import RushDetector
+
+#: Directory of the committed golden recordings
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+#: Time budget of one turn, in milliseconds. The engine allows 2 s per turn; the default keeps a safety margin.
+BUDGET_MS = 1000.0
+#: Name the bot sends before the first turn
+BOT_NAME = "bot_v1"
+
+_COMMAND = re.compile(r"(?=[tdu] )")
+
+
+def replay_turns(recording):
+    """
+    Play the bot on every frame of a recording, as a fresh game.
+
+    :param replay.ReplayReader recording: The recording
+    :return: Generator of (turn, commands, seconds) for every frame after the initial map
+    :rtype: generator
+    """
+    game_map = recording.map(0)
+    fc = FeatureCollector()
+    rd = RushDetector()
+    for turn in range(1, len(recording)):
+        frame = recording.frame(turn)
+        start = time.perf_counter()
+        game_map._parse(frame)
+        commands = "".join(bot1.play_turn(game_map, fc, rd)).encode("ascii")
+        yield turn, commands, time.perf_counter() - start
+
+
+def record(source, destination):
+    """
+    Write the frames of a recording, with the replies of the current bot, as a new golden recording. The source
+    and the destination may be the same file.
+
+    :param str source: Recording the frames are taken from
+    :param str destination: Path of the golden recording
+    :return: Number of recorded turns
+    :rtype: int
+    """
+    recording = replay.ReplayReader(source)
+    frames = [bytes(recording.frame(turn)) for turn in range(len(recording))]
+    replies = [commands for _, commands, _ in replay_turns(recording)]
+    tag = recording.tag
+    size = "{} {}".format(recording.width, recording.height)
+    recording.close()
+
+    writer = replay.ReplayWriter(destination)
+    writer.write_engine(str(tag).encode("ascii"))
+    writer.write_engine(size.encode("ascii"))
+    writer.write_engine(frames[0])
+    writer.write_bot(BOT_NAME.encode("ascii"))
+    for frame, commands in zip(frames[1:], replies):
+        writer.write_engine(frame)
+        writer.write_bot(commands)
+    writer.close()
+    return len(replies)
+
+
+def check(path, budget):
+    """
+    Replay a golden recording and compare the bot's commands with the stored ones.
+
+    :param str path: Golden recording
+    :param float budget: Time budget of one turn, in seconds
+    :return: Whether every turn matched within the budget
+    :rtype: bool
+    """
+    recording = replay.ReplayReader(path)
+    slowest = 0.0
+    compared = 0
+    try:
+        for turn, commands, elapsed in replay_turns(recording):
+            expected = recording.reply(turn)
+            if expected is None:
+                break  # The recording stops before the bot answered this frame
+            compared += 1
+            slowest = max(slowest, elapsed)
+            if commands != expected:
+                _report_divergence(path, turn, bytes(expected), commands)
+                return False
+            if elapsed > budget:
+                print("{}: turn {} took {:.1f} ms, over the budget of {:.1f} ms".format(
+                    path, turn, elapsed * 1e3, budget * 1e3))
+                return False
+        print("{}: {} turns match, slowest turn {:.1f} ms".format(path, compared, slowest * 1e3))
+        return True
+    finally:
+        recording.close()
+
+
+def _report_divergence(path, turn, expected, actual):
+    """
+    Print the first diverging turn and the commands that differ.
+
+    :return: nothing
+    """
+    expected = _COMMAND.split(expected.decode("ascii"))[1:]
+    actual = _COMMAND.split(actual.decode("ascii"))[1:]
+    print("{}: commands diverge on turn {}".format(path, turn))
+    for command in sorted(set(expected) - set(actual)):
+        print("  - " + command)
+    for command in sorted(set(actual) - set(expected)):
+        print("  + " + command)
+    if set(expected) == set(actual):
+        print("  same commands in a different order")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    checking = commands.add_parser("check", help="compare the bot with golden recordings")
+    checking.add_argument("golden", nargs="*", help="golden recordings (default: {}/*.hlr)".format(
+        os.path.relpath(GOLDEN_DIR)))
+    checking.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="time budget of one turn")
+    recording = commands.add_parser("record", help="store the current bot's commands as golden")
+    recording.add_argument("source", help="recording to take the frames from")
+    recording.add_argument("destination", help="golden recording to write")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print("{}: {} turns recorded".format(args.destination, record(args.source, args.destination)))
+        return
+    paths = args.golden or sorted(glob.glob(os.path.join(GOLDEN_DIR, "*.hlr")))
+    if not paths:
+        parser.error("no golden recordings found")
+    if not all([check(path, args.budget_ms / 1e3) for path in paths]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
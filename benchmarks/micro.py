@@ -0,0 +1,363 @@
+"""
+Microbenchmarks of the hlt and utils hot paths, over generated frames from the opening to 600+ ships.
+
+Every benchmark is timed on every frame size and reported per call and per operation (one ship navigated, one
+segment tested, ...). Results are written as JSON so two runs can be compared:
+
+    python -m benchmarks.micro --output before.json
+    python -m benchmarks.micro --output after.json --compare before.json
+
+Usage: python -m benchmarks.micro [--only NAME,...] [--ships N,...] [--repeat N] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import timeit
+
+import numpy as np
+
+import hlt
+from engine import scenario
+from utils import geometry, navigation
+from utils.feature_collector import FeatureCollector
+
+#: Total ships of the generated 4-player frames, from the opening to a crowded late game
+SHIP_COUNTS = (12, 60, 160, 600)
+#: Ships used as subjects by the per-ship benchmarks
+SAMPLE = 10
+#: Slowdown ratio reported as a regression by --compare
+THRESHOLD = 1.10
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark. The decorated function gets the generated Scenario and returns (function, operations):
+    the zero-argument function to time and the number of operations one call performs.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _frame(num_ships, seed=0):
+    """
+    :return: A 4-player scenario with num_ships ships, on a map sized like the Halite ones for that many ships
+    :rtype: scenario.Scenario
+    """
+    width, height = (240, 160) if num_ships <= 200 else (384, 256)
+    return scenario.generate(seed, num_players=4, num_ships=num_ships, num_planets=28, width=width, height=height)
+
+
+def _subjects(game_map):
+    """
+    :return: Up to SAMPLE undocked ships of player 0, and for each the closest point of its nearest planet
+    :rtype: list[(hlt.entity.Ship, hlt.entity.Position)]
+    """
+    ships = [ship for ship in game_map.get_me().all_ships()
+             if ship.docking_status == hlt.entity.Ship.DockingStatus.UNDOCKED][:SAMPLE]
+    planets = game_map.all_planets()
+    return [(ship, ship.closest_point_to(min(planets, key=ship.calculate_distance_between))) for ship in ships]
+
+
+def _across(game_map):
+    """
+    :return: The ships of _subjects, each with the mirror of its position through the map center: long diagonal
+        paths across the map
+    :rtype: list[(hlt.entity.Ship, hlt.entity.Position)]
+    """
+    return [(ship, hlt.entity.Position(game_map.width - ship.x, game_map.height - ship.y))
+            for ship, _ in _subjects(game_map)]
+
+
+@benchmark("map.parse")
+def bench_parse(generated):
+    game_map = generated.map()
+    return lambda: game_map._parse(generated.frame), 1
+
+
+@benchmark("map.nearby_entities_by_distance")
+def bench_nearby(generated):
+    game_map = generated.map()
+    ships = [ship for ship, _ in _subjects(game_map)]
+    return lambda: [game_map.nearby_entities_by_distance(ship) for ship in ships], len(ships)
+
+
+@benchmark("map.entities_by_distance")
+def bench_by_distance(generated):
+    game_map = generated.map()
+    ships = [ship for ship, _ in _subjects(game_map)]
+    # The usual question: the closest enemy ship
+    return lambda: [next(game_map.entities_by_distance(ship, hlt.entity.Ship, exclude_owner=game_map.my_id))
+                    for ship in ships], len(ships)
+
+
+@benchmark("map.obstacles_between")
+def bench_obstacles(generated):
+    game_map = generated.map()
+    pairs = _subjects(game_map)
+    return lambda: [game_map.obstacles_between(ship, target) for ship, target in pairs], len(pairs)
+
+
+@benchmark("map.obstacles_between.across")
+def bench_obstacles_across(generated):
+    game_map = generated.map()
+    pairs = _across(game_map)
+    return lambda: [game_map.obstacles_between(ship, target) for ship, target in pairs], len(pairs)
+
+
+@benchmark("collision.intersect_segment_circle")
+def bench_intersect(generated):
+    game_map = generated.map()
+    tests = [(ship, target, entity) for ship, target in _subjects(game_map)
+             for entity in game_map.all_planets() + game_map._all_ships()]
+    intersect = hlt.collision.intersect_segment_circle
+    return lambda: [intersect(start, end, circle, fudge=0.6) for start, end, circle in tests], len(tests)
+
+
+@benchmark("collision.intersect_segments_circles")
+def bench_intersect_batch(generated):
+    game_map = generated.map()
+    pairs = _subjects(game_map)
+    circles = game_map.all_planets() + game_map._all_ships()
+    start_x, start_y = [ship.x for ship, _ in pairs], [ship.y for ship, _ in pairs]
+    end_x, end_y = [target.x for _, target in pairs], [target.y for _, target in pairs]
+    x, y, radius = [e.x for e in circles], [e.y for e in circles], [e.radius for e in circles]
+    intersect = hlt.collision.intersect_segments_circles
+    return lambda: intersect(start_x, start_y, end_x, end_y, x, y, radius, fudge=0.6), len(pairs) * len(circles)
+
+
+@benchmark("ship.navigate")
+def bench_navigate(generated):
+    game_map = generated.map()
+    pairs = _subjects(game_map)
+    speed = hlt.constants.MAX_SPEED
+    return lambda: [ship.navigate(target, game_map, speed) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.nav")
+def bench_nav(generated):
+    game_map = generated.map()
+    pairs = _subjects(game_map)
+    return lambda: [navigation.nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.rush_nav")
+def bench_rush_nav(generated):
+    game_map = generated.map()
+    pairs = _subjects(game_map)
+    return lambda: [navigation.rush_nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.nav.across")
+def bench_nav_across(generated):
+    game_map = generated.map()
+    pairs = _across(game_map)
+    return lambda: [navigation.nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.rush_nav.across")
+def bench_rush_nav_across(generated):
+    game_map = generated.map()
+    pairs = _across(game_map)
+    return lambda: [navigation.rush_nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.interval_nav")
+def bench_interval_nav(generated):
+    game_map = generated.map()
+    pairs = _subjects(game_map)
+    return lambda: [navigation.interval_nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.interval_nav.across")
+def bench_interval_nav_across(generated):
+    game_map = generated.map()
+    pairs = _across(game_map)
+    return lambda: [navigation.interval_nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.route_nav.across")
+def bench_route_nav_across(generated):
+    game_map = generated.map()
+    pairs = _across(game_map)
+    return lambda: [navigation.route_nav(ship, target, game_map, None, {}) for ship, target in pairs], len(pairs)
+
+
+@benchmark("navigation.flow_nav")
+def bench_flow_nav(generated):
+    game_map = generated.map()
+    # Every ship goes to the planet nearest to the opposite corner, most of them from behind other planets
+    pairs = [(ship, min(game_map.all_planets(), key=target.calculate_distance_between))
+             for ship, target in _across(game_map)]
+    return lambda: [navigation.flow_nav(ship, planet, game_map, None, {}) for ship, planet in pairs], len(pairs)
+
+
+@benchmark("pathfinding.route")
+def bench_route(generated):
+    graph = generated.map().visibility_graph()
+    pairs = _across(generated.map())
+
+    def route():
+        # Searches, not cache hits
+        graph._routes.clear()
+        return [graph.route(ship, target) for ship, target in pairs]
+    return route, len(pairs)
+
+
+def _segments(game_map):
+    """
+    :return: A straight MAX_SPEED move of every ship of the frame, towards the map center
+    :rtype: list[geometry.Seg]
+    """
+    center = hlt.entity.Position(game_map.width / 2, game_map.height / 2)
+    segments = []
+    for ship in game_map._all_ships():
+        move = geometry.Point.polar(hlt.constants.MAX_SPEED, ship.calculate_angle_between(center))
+        start = geometry.Point(ship.x, ship.y)
+        segments.append(geometry.Seg(start, start + move))
+    return segments
+
+
+@benchmark("geometry.ps_dist")
+def bench_ps_dist(generated):
+    game_map = generated.map()
+    segments = _segments(game_map)
+    points = [geometry.Point(ship.x, ship.y) for ship, _ in _subjects(game_map)]
+    return lambda: [geometry.ps_dist(point, segment) for point in points for segment in segments], \
+        len(points) * len(segments)
+
+
+@benchmark("geometry.min_dist")
+def bench_min_dist(generated):
+    segments = _segments(generated.map())
+    moves = segments[:SAMPLE]
+    return lambda: [geometry.min_dist(move, segment) for move in moves for segment in segments], \
+        len(moves) * len(segments)
+
+
+@benchmark("feature_collector.collect")
+def bench_collect(generated):
+    fc = FeatureCollector()
+    fc.iterate_turn(generated.map())
+    ships = [ship for ship, _ in _subjects(fc.game_map)]
+    return lambda: [fc.collect(ship) for ship in ships], len(ships)
+
+
+@benchmark("feature_collector.update_assignments")
+def bench_update_assignments(generated):
+    fc = FeatureCollector()
+    fc.iterate_turn(generated.map())
+    # Half of our ships go for their nearest planet, the other half for their nearest enemy
+    for index, ship in enumerate(fc.team_ships):
+        if index % 2 and fc.enemy_ships:
+            enemy = min(fc.enemy_ships, key=ship.calculate_distance_between)
+            fc.assign_ship(ship.id, "enemy")
+            fc.assign_enemy_ship_to_ship(ship.id, enemy)
+            fc.assign_enemy(enemy.id)
+        else:
+            planet = min(fc.game_map.all_planets(), key=ship.calculate_distance_between)
+            fc.assign_ship(ship.id, "planet")
+            fc.assign_planet_to_ship(ship.id, planet)
+            fc.assign_planet(planet.id)
+    return fc.update_assignments, len(fc.team_ships)
+
+
+def run(names, ship_counts, repeat):
+    """
+    Time benchmarks on every frame size.
+
+    :param list[str] names: Benchmarks to run
+    :param list[int] ship_counts: Frame sizes
+    :param int repeat: Timed repetitions, the best one is reported
+    :return: One result dict per (benchmark, frame size)
+    :rtype: list[dict]
+    """
+    results = []
+    for num_ships in ship_counts:
+        generated = _frame(num_ships)
+        for name in names:
+            function, operations = BENCHMARKS[name](generated)
+            timer = timeit.Timer(function)
+            number, _ = timer.autorange()
+            times = [t / number for t in timer.repeat(repeat, number)]
+            best = min(times)
+            results.append({"benchmark": name, "ships": num_ships, "operations": operations, "calls": number,
+                            "best_us": best * 1e6, "median_us": statistics.median(times) * 1e6,
+                            "per_operation_us": best * 1e6 / max(operations, 1)})
+            print("{:<40} {:>6} {:>12.1f} {:>12.2f}".format(name, num_ships, best * 1e6,
+                                                          best * 1e6 / max(operations, 1)), flush=True)
+    return results
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """
+    Print the change of every benchmark between two result lists.
+
+    :param list[dict] baseline: Results of the reference run
+    :param list[dict] current: Results of the new run
+    :param float threshold: Slowdown ratio reported as a regression
+    :return: The (benchmark, ships) keys that regressed
+    :rtype: list[(str, int)]
+    """
+    reference = {(r["benchmark"], r["ships"]): r for r in baseline}
+    regressions = []
+    print("{:<40} {:>6} {:>12} {:>12} {:>8}".format("benchmark", "ships", "before us", "after us", "ratio"))
+    for result in current:
+        key = (result["benchmark"], result["ships"])
+        if key not in reference:
+            continue
+        before, after = reference[key]["best_us"], result["best_us"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print("{:<40} {:>6} {:>12.1f} {:>12.1f} {:>8.2f}{}".format(key[0], key[1], before, after, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", help="comma separated benchmark names (default: all)")
+    parser.add_argument("--ships", help="comma separated frame sizes (default: {})".format(
+        ",".join(map(str, SHIP_COUNTS))))
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="slowdown ratio counted as regression")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks {}, choose from {}".format(unknown, list(BENCHMARKS)))
+    ship_counts = [int(n) for n in args.ships.split(",")] if args.ships else SHIP_COUNTS
+
+    print("{:<40} {:>6} {:>12} {:>12}".format("benchmark", "ships", "us/call", "us/op"))
+    results = run(names, ship_counts, args.repeat)
+    report = {"created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": sys.version.split()[0], "numpy": np.__version__, "machine": platform.platform(),
+              "repeat": args.repeat, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print()
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Turn latency benchmark for bot entry points, driven by recorded games.
+
+The driver impersonates the Halite engine: it starts a bot (bot.py, bot1.py, test_bot.py, ...) as a subprocess,
+feeds it the player tag, the map size and the frames of a replay recorded with hlt.Game(..., record=path), and
+times every round trip from writing a frame to reading the bot's reply. The replies are not interpreted, the
+bot simply plays the recorded frames. Bot/replay pairs run in parallel worker processes.
+
+Usage: python -m benchmarks.replay_driver --bot bot1.py --replay game.hlr [--replay ...] [--workers N]
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from hlt import replay
+
+#: (name, first turn, last turn exclusive) of the reported game phases
+PHASES = (("early", 1, 50), ("mid", 50, 150), ("late", 150, None))
+PERCENTILES = (50, 95, 99)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_game(bot, replay_path, timeout=10.0):
+    """
+    Play one replay against one bot and time every turn.
+
+    :param str bot: Path of the bot entry point
+    :param str replay_path: Path of the replay file
+    :param float timeout: Seconds a single turn may take before the bot is killed
+    :return: Dict with the bot, the replay, the start-up time, the per-turn latencies in seconds and the error
+        that ended the game early, if any
+    :rtype: dict
+    """
+    recording = replay.ReplayReader(replay_path)
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = {"bot": bot, "replay": replay_path, "startup": None, "latencies": [], "error": None}
+
+    # Bots write their log file into the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        process = subprocess.Popen([sys.executable, os.path.abspath(bot)], cwd=workdir, env=env,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            process.stdin.write("{}\n{} {}\n".format(recording.tag, recording.width, recording.height).encode())
+            for turn in range(len(recording)):
+                elapsed = _round_trip(process, recording.frame(turn), timeout)
+                if elapsed is None:
+                    result["error"] = "no reply to frame {} (exit code {})".format(turn, process.poll())
+                    break
+                if turn == 0:
+                    result["startup"] = elapsed
+                else:
+                    result["latencies"].append(elapsed)
+        finally:
+            process.kill()
+            process.wait()
+            recording.close()
+    return result
+
+
+def _round_trip(process, frame, timeout):
+    """
+    Send a frame and wait for the reply line.
+
+    :return: Seconds between writing the frame and reading the reply, None if the bot died or timed out
+    :rtype: float
+    """
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        start = time.perf_counter()
+        process.stdin.write(frame)
+        process.stdin.write(b"\n")
+        process.stdin.flush()
+        reply = process.stdout.readline()
+        elapsed = time.perf_counter() - start
+    except (BrokenPipeError, OSError):
+        return None
+    finally:
+        watchdog.cancel()
+    return elapsed if reply.endswith(b"\n") else None
+
+
+def _run_job(job):
+    return run_game(*job)
+
+
+def phase_report(latencies):
+    """
+    Summarize per-turn latencies for every game phase.
+
+    :param list[float] latencies: Latency of turn 1, 2, ... in seconds
+    :return: Dict of phase name to {"turns", "p50", "p95", "p99", "max"} in milliseconds
+    :rtype: dict
+    """
+    latencies = np.asarray(latencies) * 1e3
+    report = {}
+    for name, first, last in PHASES + (("all", 1, None),):
+        values = latencies[first - 1:None if last is None else last - 1]
+        if not len(values):
+            continue
+        stats = {"turns": int(len(values))}
+        stats.update(("p{}".format(p), float(v)) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)))
+        stats["max"] = float(values.max())
+        report[name] = stats
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bot", action="append", required=True, help="bot entry point (repeatable)")
+    parser.add_argument("--replay", action="append", required=True, help="recorded replay file (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="parallel games")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds allowed per turn")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    jobs = [(bot, path, args.timeout) for bot, path in itertools.product(args.bot, args.replay)]
+    with multiprocessing.Pool(min(args.workers, len(jobs))) as pool:
+        results = pool.map(_run_job, jobs)
+
+    report = []
+    print("{:<16} {:<24} {:<6} {:>6} {:>9} {:>9} {:>9} {:>9}".format(
+        "bot", "replay", "phase", "turns", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    for result in results:
+        phases = phase_report(result["latencies"])
+        report.append(dict(result, phases=phases))
+        for phase, stats in phases.items():
+            print("{:<16} {:<24} {:<6} {:>6} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                os.path.basename(result["bot"]), os.path.basename(result["replay"]), phase, stats["turns"],
+                stats["p50"], stats["p95"], stats["p99"], stats["max"]))
+        if result["error"]:
+            print("  {} on {}: {}".format(result["bot"], result["replay"], result["error"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
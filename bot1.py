@@ -19,12 +19,17 @@ from utils.feature_collector import FeatureCollector
 from utils.rush_detector import RushDetector
 from utils import strategies
 
-game = hlt.Game("bot_v1")
-fc = FeatureCollector()
-rd = RushDetector()
 
-while True:
-    game_map = game.update_map()
+def play_turn(game_map, fc, rd):
+    """
+    Decide the commands of one turn.
+
+    :param game_map: hlt.game_map of the turn
+    :param fc: Feature collector class instance, kept for the whole game
+    :param rd: Rush detector class instance, kept for the whole game
+    :return: The command queue of the turn
+    :rtype: list[str]
+    """
     fc.iterate_turn(game_map)
     logging.info(f"\n\n########### Turn number: {fc.turn}")
 
@@ -43,6 +48,16 @@ while True:
         else:
             strategies.standard_strategy(ship, fc)
 
-    game.send_command_queue(fc.command_queue)
-    # TURN END
-# GAME END
+    return fc.command_queue
+
+
+if __name__ == "__main__":
+    game = hlt.Game("bot_v1")
+    fc = FeatureCollector()
+    rd = RushDetector()
+
+    while True:
+        game_map = game.update_map()
+        game.send_command_queue(play_turn(game_map, fc, rd))
+        # TURN END
+    # GAME END
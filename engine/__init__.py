@@ -0,0 +1,14 @@
+"""
+Headless Python stand-in for the Halite II engine.
+
+The game state is a set of NumPy arrays with a leading game axis (see state.GameState), advanced by the
+vectorized rules in rules.py. server.py runs matches between unmodified bots over the same stdin/stdout
+protocol as halite.exe:
+
+    python -m engine.server "python bot1.py" "python test_bot.py" --width 240 --height 160
+
+env.py wraps the same rules into a batched self-play environment for training.
+"""
+
+from . import env, mapgen, protocol, rules, scenario, state
+from .state import GameState
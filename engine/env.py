@@ -0,0 +1,319 @@
+"""
+Batched Halite II environment for self-play training: N independent games in one GameState, advanced together
+by one vectorized rules.step per turn. ShardedEnv spreads a larger batch over worker processes, one BatchEnv each.
+
+Observations are per ship slot, with the features FeatureCollector computes for a ship (closest enemy ship,
+closest empty / own / enemy planet) as distance, angle and id columns, plus per-planet rows. Actions are per ship
+slot as well, one row (command, magnitude, angle, planet) per slot, the arguments of Ship.thrust, Ship.dock and
+Ship.undock. A batch plays every player of its games: the owner column tells which player controls a slot.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from . import mapgen, rules
+from .state import NO_ID
+
+#: Values of the command column of an action
+NOOP, THRUST, DOCK, UNDOCK = 0, 1, 2, 3
+#: Columns of an action row
+ACTION_FIELDS = ("command", "magnitude", "angle", "planet")
+#: Columns of a ship observation row. The closest_* columns follow the FeatureCollector lists of the same name;
+#: angles are in degrees as returned by Entity.calculate_angle_between.
+SHIP_FEATURES = (
+    "alive", "owner", "x", "y", "health", "docking_status", "planet", "cooldown",
+    "closest_enemy_ship_distance", "closest_enemy_ship_angle", "closest_enemy_ship_id",
+    "closest_empty_planet_distance", "closest_empty_planet_angle", "closest_empty_planet_id",
+    "closest_my_planet_distance", "closest_my_planet_angle", "closest_my_planet_id",
+    "closest_enemy_planet_distance", "closest_enemy_planet_angle", "closest_enemy_planet_id",
+)
+#: Columns of a planet observation row
+PLANET_FEATURES = ("alive", "owner", "x", "y", "radius", "health", "num_docking_spots", "num_docked",
+                   "current_production", "remaining_resources")
+#: Distance and id reported when there is no entity of the kind, or for empty slots
+MISSING = -1.0
+#: Upper bound of the number of (ship, ship) distances computed at once by observe()
+OBSERVE_CHUNK = 1 << 21
+
+
+class BatchEnv:
+    """
+    A batch of games stepped together. Finished games are replaced by a new map right away, so every step
+    returns observations of running games.
+
+    :ivar num_games: Number of games in the batch
+    :ivar num_players: Players per game (2 or 4)
+    :ivar state: The engine state of the batch
+    """
+
+    def __init__(self, num_games, num_players=2, width=240, height=160, seed=None, max_turns=300,
+                 planets_per_player=4):
+        """
+        :param int num_games: Number of games in the batch
+        :param int num_players: Players per game, 2 or 4
+        :param int width: Map width
+        :param int height: Map height
+        :param int seed: Seed of the sequence of maps
+        :param int max_turns: Turn limit of a game
+        :param int planets_per_player: Planets in every sector of a map; fixed so all games have as many planets
+        """
+        self.num_games = num_games
+        self.num_players = num_players
+        self.width = width
+        self.height = height
+        self.max_turns = max_turns
+        self.planets_per_player = planets_per_player
+        self._rng = np.random.default_rng(seed)
+        self.state = None
+
+    def _new_map(self, num_games):
+        return mapgen.generate(self.num_players, self.width, self.height, int(self._rng.integers(2 ** 63)),
+                               num_games, self.planets_per_player)
+
+    def reset(self):
+        """
+        Start new games in every slot of the batch.
+
+        :return: The observation of the first turn
+        :rtype: dict
+        """
+        self.state = self._new_map(self.num_games)
+        return observe(self.state)
+
+    def step(self, actions):
+        """
+        Play one turn of every game.
+
+        :param numpy.ndarray actions: (games, slots, len(ACTION_FIELDS)) action rows. Slots past the end of the
+            array, and rows of slots that are empty or not allowed to act, do nothing.
+        :return: Observation, (games, players) rewards, (games,) done flags and a dict with the final
+            (games, players) ship counts of the games that just ended
+        :rtype: (dict, numpy.ndarray, numpy.ndarray, dict)
+        """
+        state = self.state
+        before = state.player_ship_counts()
+        to_commands(actions, state).apply(state)
+        rules.step(state)
+        counts = state.player_ship_counts()
+        rewards = counts - before
+        done = rules.finished(state, self.max_turns)
+
+        final = np.where(done[:, None], counts, 0)
+        for game in np.flatnonzero(done):
+            state.load_game(game, self._new_map(1))
+        return observe(state), rewards, done, {"final_ships": final}
+
+
+def to_commands(actions, state):
+    """
+    Translate action rows into engine commands.
+
+    :param numpy.ndarray actions: (games, slots, len(ACTION_FIELDS)) action rows
+    :param GameState state: The state the actions are for
+    :rtype: rules.Commands
+    """
+    commands = rules.Commands(state)
+    width = min(actions.shape[1], state.ship_capacity)
+    actions = actions[:, :width]
+    command = actions[..., 0]
+    commands.thrust[:, :width] = command == THRUST
+    commands.magnitude[:, :width] = actions[..., 1]
+    commands.angle[:, :width] = actions[..., 2]
+    planet = actions[..., 3].astype(np.int64)
+    valid = (command == DOCK) & (planet >= 0) & (planet < state.num_planets)
+    commands.dock[:, :width] = np.where(valid, planet, NO_ID)
+    commands.undock[:, :width] = command == UNDOCK
+    return commands
+
+
+def observe(state):
+    """
+    Build the observation of every game of a batch.
+
+    :param GameState state: The state
+    :return: Dict with "ships", a (games, slots, len(SHIP_FEATURES)) float32 array, "planets", a
+        (games, planets, len(PLANET_FEATURES)) float32 array, and "turn", the (games,) turn numbers
+    :rtype: dict
+    """
+    games, capacity = state.ship_alive.shape
+    alive = state.ship_alive
+    ships = np.full((games, capacity, len(SHIP_FEATURES)), MISSING, dtype=np.float32)
+    ships[..., 0] = alive
+    for column, values in enumerate((state.ship_owner, state.ship_x, state.ship_y, state.ship_health,
+                                     state.ship_status, state.ship_planet, state.ship_cooldown), 1):
+        ships[..., column] = np.where(alive, values, MISSING)
+
+    used = np.flatnonzero(alive.any(axis=0))
+    width = used[-1] + 1 if len(used) else 0
+    chunk = max(OBSERVE_CHUNK // max(width * max(width, state.num_planets), 1), 1)
+    for start in range(0, games, chunk):
+        rows = slice(start, start + chunk)
+        _closest_features(state, rows, width, ships[rows, :width])
+
+    docked = np.zeros(state.planet_alive.shape, dtype=np.int64)
+    attached = alive & (state.ship_planet != NO_ID)
+    np.add.at(docked, (np.nonzero(attached)[0], state.ship_planet[attached]), 1)
+    planets = np.stack([state.planet_alive, state.planet_owner, state.planet_x, state.planet_y,
+                        state.planet_radius, state.planet_health, state.planet_spots, docked,
+                        state.planet_production, state.planet_remaining], axis=-1).astype(np.float32)
+    return {"ships": ships, "planets": planets, "turn": state.turn.copy()}
+
+
+def _closest_features(state, rows, width, out):
+    """
+    Fill the closest_* columns of the ships of some games.
+
+    :param slice rows: The games
+    :param int width: Number of ship slots in use
+    :param numpy.ndarray out: (games, width, len(SHIP_FEATURES)) rows to fill
+    :return: nothing
+    """
+    alive = state.ship_alive[rows, :width]
+    owner = state.ship_owner[rows, :width]
+    x, y = state.ship_x[rows, :width], state.ship_y[rows, :width]
+
+    dx = x[:, None, :] - x[:, :, None]
+    dy = y[:, None, :] - y[:, :, None]
+    enemy = alive[:, :, None] & alive[:, None, :] & (owner[:, :, None] != owner[:, None, :])
+    _write_closest(out, SHIP_FEATURES.index("closest_enemy_ship_distance"), dx, dy, enemy,
+                   state.ship_id[rows, :width])
+
+    pdx = state.planet_x[rows][:, None, :] - x[:, :, None]
+    pdy = state.planet_y[rows][:, None, :] - y[:, :, None]
+    planet_owner = state.planet_owner[rows][:, None, :]
+    planet_alive = alive[:, :, None] & state.planet_alive[rows][:, None, :]
+    planet_ids = np.broadcast_to(np.arange(state.num_planets), state.planet_alive[rows].shape)
+    for name, mask in (("empty", planet_owner == NO_ID),
+                       ("my", planet_owner == owner[:, :, None]),
+                       ("enemy", (planet_owner != NO_ID) & (planet_owner != owner[:, :, None]))):
+        _write_closest(out, SHIP_FEATURES.index("closest_{}_planet_distance".format(name)), pdx, pdy,
+                       planet_alive & mask, planet_ids)
+
+
+def _write_closest(out, column, dx, dy, mask, ids):
+    """
+    Write distance, angle and id of the closest candidate of every ship into three consecutive columns.
+
+    :param numpy.ndarray dx: (games, ships, candidates) x-offsets from the ship to the candidates
+    :param numpy.ndarray dy: (games, ships, candidates) y-offsets
+    :param numpy.ndarray mask: (games, ships, candidates) bool, the allowed candidates
+    :param numpy.ndarray ids: (games, candidates) ids of the candidates
+    :return: nothing
+    """
+    if not dx.shape[2]:
+        return
+    distance = np.where(mask, np.sqrt(dx * dx + dy * dy), np.inf)
+    closest = distance.argmin(axis=2)[:, :, None]
+    found = np.isfinite(np.take_along_axis(distance, closest, axis=2)[:, :, 0])
+    angle = np.degrees(np.arctan2(np.take_along_axis(dy, closest, axis=2),
+                                  np.take_along_axis(dx, closest, axis=2))[:, :, 0]) % 360
+    out[..., column] = np.where(found, np.take_along_axis(distance, closest, axis=2)[:, :, 0], MISSING)
+    out[..., column + 1] = np.where(found, angle, MISSING)
+    out[..., column + 2] = np.where(found, np.take_along_axis(ids, closest[:, :, 0], axis=1), MISSING)
+
+
+class ShardedEnv:
+    """
+    A BatchEnv split into shards of games, each stepped by its own worker process. Observations and rewards are
+    concatenated along the game axis; the ship axis is padded to the widest shard.
+
+    :ivar num_games: Total number of games
+    """
+
+    def __init__(self, num_games, num_workers=None, seed=None, **kwargs):
+        """
+        :param int num_games: Total number of games
+        :param int num_workers: Worker processes, one per CPU by default
+        :param int seed: Seed of the whole batch; every shard gets its own stream derived from it
+        :param kwargs: Other BatchEnv arguments
+        """
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_games)
+        self.num_games = num_games
+        self._bounds = np.linspace(0, num_games, num_workers + 1).astype(int)
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        self._pipes = []
+        self._workers = []
+        for worker, shard_seed in enumerate(seeds):
+            ours, theirs = multiprocessing.Pipe()
+            size = int(self._bounds[worker + 1] - self._bounds[worker])
+            process = multiprocessing.Process(target=_serve, args=(theirs, size, shard_seed, kwargs), daemon=True)
+            process.start()
+            theirs.close()
+            self._pipes.append(ours)
+            self._workers.append(process)
+
+    def reset(self):
+        """
+        :return: The observation of the first turn of every game
+        :rtype: dict
+        """
+        for pipe in self._pipes:
+            pipe.send(("reset", None))
+        return _merge_observations([pipe.recv() for pipe in self._pipes])
+
+    def step(self, actions):
+        """
+        Same as BatchEnv.step, over all shards.
+
+        :param numpy.ndarray actions: (games, slots, len(ACTION_FIELDS)) action rows
+        :rtype: (dict, numpy.ndarray, numpy.ndarray, dict)
+        """
+        for pipe, start, end in zip(self._pipes, self._bounds[:-1], self._bounds[1:]):
+            pipe.send(("step", actions[start:end]))
+        results = [pipe.recv() for pipe in self._pipes]
+        observation = _merge_observations([result[0] for result in results])
+        rewards = np.concatenate([result[1] for result in results])
+        done = np.concatenate([result[2] for result in results])
+        info = {"final_ships": np.concatenate([result[3]["final_ships"] for result in results])}
+        return observation, rewards, done, info
+
+    def close(self):
+        """
+        Stop the workers.
+
+        :return: nothing
+        """
+        for pipe in self._pipes:
+            try:
+                pipe.send(("close", None))
+            except OSError:
+                pass
+        for process in self._workers:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _serve(pipe, num_games, seed, kwargs):
+    """
+    Worker loop of ShardedEnv.
+    """
+    env = BatchEnv(num_games, seed=seed, **kwargs)
+    while True:
+        command, data = pipe.recv()
+        if command == "reset":
+            pipe.send(env.reset())
+        elif command == "step":
+            pipe.send(env.step(data))
+        else:
+            pipe.close()
+            return
+
+
+def _merge_observations(observations):
+    """
+    Concatenate shard observations, padding the ship axis with MISSING.
+
+    :rtype: dict
+    """
+    width = max(observation["ships"].shape[1] for observation in observations)
+    ships = [np.pad(o["ships"], ((0, 0), (0, width - o["ships"].shape[1]), (0, 0)), constant_values=MISSING)
+             for o in observations]
+    return {"ships": np.concatenate(ships),
+            "planets": np.concatenate([o["planets"] for o in observations]),
+            "turn": np.concatenate([o["turn"] for o in observations])}
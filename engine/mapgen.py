@@ -0,0 +1,98 @@
+"""
+Seeded, symmetric map generation. Planets and starting ships are laid out in one sector of the map and mirrored
+into the other players' sectors, so no player starts with a positional advantage.
+"""
+
+import numpy as np
+
+from .state import GameState, INITIAL_SHIPS, SHIP_COST
+
+MIN_PLANET_RADIUS = 3.0
+MAX_PLANET_RADIUS = 8.0
+#: Free space kept between two planets, and between a planet and the map border or the mirror lines
+PLANET_MARGIN = 4.0
+#: Free space kept between a planet and a starting fleet
+SPAWN_MARGIN = 10.0
+#: Production capacity of a planet per unit of radius
+RESOURCES_PER_RADIUS = 2 * SHIP_COST
+#: Rejection sampling attempts per planet before giving up on it
+PLACEMENT_ATTEMPTS = 200
+
+
+def sector_mirrors(num_players, width, height):
+    """
+    :return: One function per player mapping a point of the first player's sector to the same point in that
+        player's sector, and the (width, height) of a sector
+    :rtype: (list, (float, float))
+    """
+    if num_players == 2:
+        return [lambda x, y: (x, y), lambda x, y: (width - x, height - y)], (width / 2, height)
+    if num_players == 4:
+        return [lambda x, y: (x, y), lambda x, y: (width - x, y),
+                lambda x, y: (x, height - y), lambda x, y: (width - x, height - y)], (width / 2, height / 2)
+    raise ValueError("Only 2 and 4 player maps are supported, got {}".format(num_players))
+
+
+def generate(num_players, width, height, seed=None, num_games=1, planets_per_player=None):
+    """
+    Create the initial state of a batch of games. Every game gets its own map, and every map has the same
+    number of planets so they fit in one GameState.
+
+    :param int num_players: 2 or 4
+    :param int width: Map width
+    :param int height: Map height
+    :param int seed: Random seed, the same seed always gives the same maps
+    :param int num_games: Number of games in the batch
+    :param int planets_per_player: Planets in every sector, random by default
+    :return: The initial state
+    :rtype: GameState
+    """
+    rng = np.random.default_rng(seed)
+    mirrors, (sector_width, sector_height) = sector_mirrors(num_players, width, height)
+    if planets_per_player is None:
+        planets_per_player = int(rng.integers(3, 7)) if num_players == 4 else int(rng.integers(5, 11))
+
+    state = GameState(num_games, num_players, width, height, planets_per_player * num_players)
+    spawn = (sector_width * 0.4, sector_height * 0.5)
+    for game in range(num_games):
+        for player, mirror in enumerate(mirrors):
+            for i in range(INITIAL_SHIPS):
+                state.add_ship(game, player, *mirror(spawn[0], spawn[1] + 2 * (i - (INITIAL_SHIPS - 1) / 2)))
+
+        placed = []
+        for _ in range(planets_per_player):
+            planet = _place_planet(rng, mirrors, sector_width, sector_height, spawn, placed)
+            if planet is None:
+                planet = _place_planet(rng, mirrors, sector_width, sector_height, spawn, placed, MIN_PLANET_RADIUS)
+            placed.append(planet)
+
+        for index, (x, y, radius) in enumerate(placed):
+            spots = int(np.clip(round(radius / 1.5), 2, 6))
+            for player, mirror in enumerate(mirrors):
+                state.set_planet(game, index * num_players + player, *mirror(x, y), radius, spots,
+                                 int(radius * RESOURCES_PER_RADIUS))
+    return state
+
+
+def _place_planet(rng, mirrors, sector_width, sector_height, spawn, placed, max_radius=MAX_PLANET_RADIUS):
+    """
+    Rejection-sample a planet of the first sector that, mirrored into every sector, overlaps nothing.
+
+    :return: (x, y, radius) in the first sector
+    :rtype: (float, float, float)
+    """
+    for _ in range(PLACEMENT_ATTEMPTS):
+        radius = float(rng.uniform(MIN_PLANET_RADIUS, max_radius))
+        border = radius + PLANET_MARGIN
+        if 2 * border >= min(sector_width, sector_height):
+            continue
+        x = float(rng.uniform(border, sector_width - border))
+        y = float(rng.uniform(border, sector_height - border))
+        if np.hypot(x - spawn[0], y - spawn[1]) < radius + SPAWN_MARGIN:
+            continue
+        # Comparing inside the first sector is enough: the mirrors preserve distances
+        if all(np.hypot(x - ox, y - oy) >= radius + other + PLANET_MARGIN for ox, oy, other in placed):
+            return x, y, radius
+    if max_radius > MIN_PLANET_RADIUS:
+        return None
+    raise ValueError("Map of {}x{} is too small for this many planets".format(2 * sector_width, sector_height))
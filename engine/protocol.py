@@ -0,0 +1,107 @@
+"""
+The text protocol spoken by halite.exe, as parsed by hlt.networking.Game and hlt.game_map.Map.
+"""
+
+import re
+
+import numpy as np
+
+from .state import UNDOCKED, NO_ID
+
+#: One command of a command queue. hlt.networking.Game sends the commands of a turn without separator,
+#: e.g. "t 0 3 90t 1 3 90d 2 5", so every command is matched by its leading letter and arity.
+COMMAND = re.compile(r"t\s+(\d+)\s+(-?\d+)\s+(-?\d+)|d\s+(\d+)\s+(\d+)|u\s+(\d+)")
+
+
+def encode_frame(state, game=0):
+    """
+    Serialize one game of the state into a frame, players and planets in id order. Ship velocities are always
+    reported as 0, as the real engine does: thrust only lasts for the turn it was issued.
+
+    :param GameState state: The state
+    :param int game: Game index in the batch
+    :return: The frame, without trailing newline
+    :rtype: str
+    """
+    alive = state.ship_alive[game]
+    owners = state.ship_owner[game]
+    ids = state.ship_id[game]
+    parts = [str(state.num_players)]
+    for player in range(state.num_players):
+        slots = np.flatnonzero(alive & (owners == player))
+        slots = slots[np.argsort(ids[slots], kind="stable")]
+        parts.append("{} {}".format(player, len(slots)))
+        for ship_id, x, y, health, status, planet, progress, cooldown in zip(
+                ids[slots].tolist(), state.ship_x[game, slots].tolist(), state.ship_y[game, slots].tolist(),
+                state.ship_health[game, slots].tolist(), state.ship_status[game, slots].tolist(),
+                state.ship_planet[game, slots].tolist(), state.ship_progress[game, slots].tolist(),
+                state.ship_cooldown[game, slots].tolist()):
+            parts.append("{} {:.4f} {:.4f} {} 0.0 0.0 {} {} {} {}".format(
+                ship_id, x, y, health, status, 0 if status == UNDOCKED else planet, progress, cooldown))
+
+    planets = np.flatnonzero(state.planet_alive[game])
+    docked = {}
+    attached = alive & (state.ship_status[game] != UNDOCKED)
+    for planet, ship_id in sorted(zip(state.ship_planet[game, attached].tolist(), ids[attached].tolist())):
+        docked.setdefault(planet, []).append(ship_id)
+    parts.append(str(len(planets)))
+    for planet in planets.tolist():
+        owner = int(state.planet_owner[game, planet])
+        ships = docked.get(planet, [])
+        parts.append("{} {:.4f} {:.4f} {} {:.4f} {} {} {} {} {} {}".format(
+            planet, state.planet_x[game, planet], state.planet_y[game, planet], state.planet_health[game, planet],
+            state.planet_radius[game, planet], state.planet_spots[game, planet],
+            state.planet_production[game, planet], state.planet_remaining[game, planet],
+            int(owner != NO_ID), max(owner, 0), len(ships)))
+        if ships:
+            parts.append(" ".join(map(str, ships)))
+    return " ".join(parts)
+
+
+def ship_slots(state, game=0):
+    """
+    :param GameState state: The state
+    :param int game: Game index in the batch
+    :return: Slot of every living ship of the game, keyed by ship id
+    :rtype: dict[int, int]
+    """
+    slots = np.flatnonzero(state.ship_alive[game])
+    return dict(zip(state.ship_id[game, slots].tolist(), slots.tolist()))
+
+
+def parse_commands(line, state, game, player, commands, slots=None):
+    """
+    Parse a command queue into the command arrays. Commands for ships the player does not own, and any command
+    after the first one for the same ship, are ignored.
+
+    :param str line: The command queue sent by the bot
+    :param GameState state: The state the commands apply to
+    :param int game: Game index in the batch
+    :param int player: The player who sent the commands
+    :param Commands commands: The arrays to fill
+    :param dict[int, int] slots: Result of ship_slots(state, game), computed if not given
+    :return: Number of commands accepted
+    :rtype: int
+    """
+    if slots is None:
+        slots = ship_slots(state, game)
+    owners = state.ship_owner[game]
+    issued = set()
+    for match in COMMAND.finditer(line):
+        thrust_id, magnitude, angle, dock_id, planet, undock_id = match.groups()
+        ship_id = int(thrust_id or dock_id or undock_id)
+        slot = slots.get(ship_id)
+        if slot is None or owners[slot] != player or slot in issued:
+            continue
+        issued.add(slot)
+        if thrust_id is not None:
+            commands.thrust[game, slot] = True
+            commands.magnitude[game, slot] = int(magnitude)
+            commands.angle[game, slot] = int(angle)
+        elif dock_id is not None:
+            if 0 <= int(planet) < state.num_planets:
+                commands.dock[game, slot] = int(planet)
+        else:
+            commands.undock[game, slot] = True
+    return len(issued)
+
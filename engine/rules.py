@@ -0,0 +1,326 @@
+"""
+Halite II rules on GameState arrays, vectorized over ships and over the games of a batch.
+
+A turn is: commands (thrust / dock / undock) are applied, then step() moves every ship along its velocity with
+continuous collision detection, resolves combat, planet explosions, docking progress, production and spawning.
+Movement, collisions and combat run the kernels of hlt.physics, which the bot-side forward model shares.
+"""
+
+from collections import namedtuple
+import math
+
+import numpy as np
+
+from hlt import constants, physics
+from hlt.physics import SHIP_COLLISION_RADIUS
+from .state import UNDOCKED, DOCKING, DOCKED, UNDOCKING, NO_ID, SHIP_COST
+
+#: Angular step, in degrees, between spawn positions tried around a planet
+SPAWN_ANGLE_STEP = 15
+
+#: Outcome of one step: per-slot masks / amounts of shape (games, ship slots), and a (games, planets) mask
+StepEvents = namedtuple("StepEvents", ["destroyed", "collided", "damage", "fired", "spawned", "exploded"])
+
+
+class Commands:
+    """
+    The commands of one turn for every ship slot of a batch. A slot holds at most one command; slots left
+    untouched do nothing.
+
+    :ivar thrust: (games, slots) bool, ships thrusting
+    :ivar magnitude: (games, slots) thrust magnitude
+    :ivar angle: (games, slots) thrust angle in degrees
+    :ivar dock: (games, slots) planet to dock to, NO_ID for none
+    :ivar undock: (games, slots) bool, ships undocking
+    """
+
+    def __init__(self, state):
+        """
+        :param GameState state: The state the commands are for
+        """
+        shape = state.ship_alive.shape
+        self.thrust = np.zeros(shape, dtype=np.bool_)
+        self.magnitude = np.zeros(shape, dtype=np.float64)
+        self.angle = np.zeros(shape, dtype=np.float64)
+        self.dock = np.full(shape, NO_ID, dtype=np.int64)
+        self.undock = np.zeros(shape, dtype=np.bool_)
+
+    def issued(self):
+        """
+        :return: (games, slots) bool, slots that already have a command
+        :rtype: numpy.ndarray
+        """
+        return self.thrust | (self.dock != NO_ID) | self.undock
+
+    def apply(self, state):
+        """
+        Apply the commands to the state, before step().
+
+        :param GameState state: The state to update
+        :return: nothing
+        """
+        undock(state, self.undock)
+        dock(state, self.dock)
+        thrust(state, self.thrust, self.magnitude, self.angle)
+
+
+def thrust(state, mask, magnitude, angle):
+    """
+    Set the velocity of the selected ships for the coming step. Ships that are not alive and undocked ignore
+    the command, as the engine does.
+
+    :param GameState state: The state to update
+    :param numpy.ndarray mask: (games, slots) bool, ships receiving a thrust command
+    :param numpy.ndarray magnitude: (games, slots) thrust magnitude, clipped to [0, MAX_SPEED]
+    :param numpy.ndarray angle: (games, slots) angle in degrees
+    :return: nothing
+    """
+    ok = mask & state.ship_alive & (state.ship_status == UNDOCKED)
+    magnitude = np.clip(np.trunc(magnitude), 0, constants.MAX_SPEED)
+    radians = np.radians(np.round(angle))
+    state.ship_vx = np.where(ok, magnitude * np.cos(radians), state.ship_vx)
+    state.ship_vy = np.where(ok, magnitude * np.sin(radians), state.ship_vy)
+
+
+def undock(state, mask):
+    """
+    Start undocking the selected docked ships.
+
+    :param GameState state: The state to update
+    :param numpy.ndarray mask: (games, slots) bool, ships receiving an undock command
+    :return: nothing
+    """
+    ok = mask & state.ship_alive & (state.ship_status == DOCKED)
+    state.ship_status[ok] = UNDOCKING
+    state.ship_progress[ok] = constants.DOCK_TURNS
+
+
+def dock(state, target):
+    """
+    Start docking the selected ships. A dock succeeds if the ship is alive and undocked, within DOCK_RADIUS of
+    the planet surface, the planet has a free spot and is either unowned or owned by the ship's owner. Requests
+    for one planet are served in slot order; when players race for the same unowned planet in the same turn,
+    none of them gets it.
+
+    :param GameState state: The state to update
+    :param numpy.ndarray target: (games, slots) planet id to dock to, NO_ID for ships not docking
+    :return: nothing
+    """
+    games, slots = np.nonzero((target != NO_ID) & state.ship_alive & (state.ship_status == UNDOCKED))
+    if not len(games):
+        return
+    planets = target[games, slots]
+    dx = state.ship_x[games, slots] - state.planet_x[games, planets]
+    dy = state.ship_y[games, slots] - state.planet_y[games, planets]
+    reach = state.planet_radius[games, planets] + constants.DOCK_RADIUS + constants.SHIP_RADIUS
+    ok = state.planet_alive[games, planets] & (dx * dx + dy * dy <= reach * reach)
+    owners = state.ship_owner[games, slots]
+    planet_owners = state.planet_owner[games, planets]
+    ok &= (planet_owners == NO_ID) | (planet_owners == owners)
+
+    occupied = _docked_counts(state, state.ship_status != UNDOCKED)
+    requests = {}
+    for game, slot, planet, owner in zip(games[ok].tolist(), slots[ok].tolist(),
+                                         planets[ok].tolist(), owners[ok].tolist()):
+        requests.setdefault((game, planet), []).append((slot, owner))
+
+    for (game, planet), ships in requests.items():
+        if state.planet_owner[game, planet] == NO_ID and len({owner for _, owner in ships}) > 1:
+            continue
+        free = state.planet_spots[game, planet] - occupied[game, planet]
+        for slot, owner in ships[:max(free, 0)]:
+            state.ship_status[game, slot] = DOCKING
+            state.ship_planet[game, slot] = planet
+            state.ship_progress[game, slot] = constants.DOCK_TURNS
+            state.ship_vx[game, slot] = state.ship_vy[game, slot] = 0.0
+            state.planet_owner[game, planet] = owner
+
+
+def step(state):
+    """
+    Advance every game of the batch by one turn, using the velocities set by thrust().
+
+    :param GameState state: The state to update in place
+    :return: What happened during the turn
+    :rtype: StepEvents
+    """
+    # Work on compact arrays of the living ships of all games; ship pairs are only formed between ships close
+    # enough to meet during the turn, so the cost grows with the number of ships, not its square
+    games, slots = np.nonzero(state.ship_alive)
+    x, y = state.ship_x[games, slots], state.ship_y[games, slots]
+    vx, vy = state.ship_vx[games, slots], state.ship_vy[games, slots]
+    owner = state.ship_owner[games, slots]
+    health = state.ship_health[games, slots]
+    cooldown = np.maximum(state.ship_cooldown[games, slots] - 1, 0)
+    can_fire = (state.ship_status[games, slots] == UNDOCKED) & (cooldown == 0)
+
+    first, second = physics.nearby_pairs(games, x, y, state.width, physics.INTERACTION_RADIUS)
+    dx, dy = x[first] - x[second], y[first] - y[second]
+    dvx, dvy = vx[first] - vx[second], vy[first] - vy[second]
+    speed2, dot, distance2 = dvx * dvx + dvy * dvy, dx * dvx + dy * dvy, dx * dx + dy * dy
+
+    dead_at, planet_damage = physics.resolve_collisions(
+        state.planet_x, state.planet_y, state.planet_radius, state.planet_alive, state.width, state.height,
+        games, x, y, vx, vy, health, first, second,
+        physics.solve_contact(speed2, dot, distance2, SHIP_COLLISION_RADIUS))
+    fired, attack_damage = physics.resolve_attacks(
+        owner, can_fire, dead_at, first, second, dx, dy, dvx, dvy,
+        physics.solve_contact(speed2, dot, distance2, physics.ATTACK_RADIUS))
+
+    collided = np.isfinite(dead_at)
+    damage = np.where(collided, health, np.minimum(attack_damage, health))
+    move = np.where(collided, dead_at, 1.0)
+    x += vx * move
+    y += vy * move
+    cooldown[fired] = constants.WEAPON_COOLDOWN
+
+    state.ship_x[games, slots] = x
+    state.ship_y[games, slots] = y
+    state.ship_vx[games, slots] = 0.0
+    state.ship_vy[games, slots] = 0.0
+    state.ship_cooldown[games, slots] = cooldown
+    remaining = health - damage
+    exploded = _resolve_explosions(state, planet_damage, games, slots, remaining, damage)
+    state.ship_health[games, slots] = remaining
+    destroyed = remaining <= 0
+    state.ship_alive[games[destroyed], slots[destroyed]] = False
+
+    _progress_docking(state)
+    spawned = _produce(state)
+    state.turn += 1
+
+    shape = state.ship_alive.shape
+    return StepEvents(_scatter(shape, games, slots, destroyed), _scatter(shape, games, slots, collided),
+                      _scatter(shape, games, slots, damage), _scatter(shape, games, slots, fired), spawned, exploded)
+
+
+def finished(state, max_turns):
+    """
+    :param GameState state: The state
+    :param int max_turns: Turn limit
+    :return: (games,) bool, games that reached the turn limit or have at most one player left with ships
+    :rtype: numpy.ndarray
+    """
+    return (state.turn >= max_turns) | (np.count_nonzero(state.player_ship_counts(), axis=1) <= 1)
+
+
+def _scatter(shape, games, slots, values):
+    """
+    :return: Array of the given (games, slots) shape holding the compact per-ship values, zero elsewhere
+    :rtype: numpy.ndarray
+    """
+    full = np.zeros(shape, dtype=values.dtype)
+    full[games, slots] = values
+    return full
+
+
+def _resolve_explosions(state, planet_damage, games, slots, health, damage):
+    """
+    Apply collision damage to planets. A destroyed planet explodes, see physics.explosion_damage.
+
+    :param numpy.ndarray health: Health of the living ships after the other damage of the turn, updated
+    :param numpy.ndarray damage: Damage taken by the living ships this turn, updated
+    :return: (games, planets) mask of the planets that exploded
+    :rtype: numpy.ndarray
+    """
+    state.planet_health -= planet_damage
+    exploded = state.planet_alive & (state.planet_health <= 0)
+    for game, planet in zip(*np.nonzero(exploded)):
+        ships = np.flatnonzero((games == game) & (health > 0))
+        dx = state.ship_x[game, slots[ships]] - state.planet_x[game, planet]
+        dy = state.ship_y[game, slots[ships]] - state.planet_y[game, planet]
+        surface = np.sqrt(dx * dx + dy * dy) - state.planet_radius[game, planet]
+        docked = (state.ship_planet[game, slots[ships]] == planet) & \
+            (state.ship_status[game, slots[ships]] != UNDOCKED)
+        blast = np.minimum(physics.explosion_damage(surface, docked), health[ships])
+        health[ships] -= blast
+        damage[ships] += blast
+
+    state.planet_alive &= ~exploded
+    state.planet_owner[exploded] = NO_ID
+    return exploded
+
+
+def _docked_counts(state, mask):
+    """
+    :param numpy.ndarray mask: (games, slots) bool, the ships to count
+    :return: Number of living ships in mask attached to every planet, shape (games, planets)
+    :rtype: numpy.ndarray
+    """
+    games, slots = np.nonzero(mask & state.ship_alive & (state.ship_planet != NO_ID))
+    counts = np.bincount(games * state.num_planets + state.ship_planet[games, slots],
+                         minlength=state.num_games * state.num_planets)
+    return counts.reshape(state.num_games, state.num_planets)
+
+
+def _progress_docking(state):
+    """
+    Count down docking and undocking ships, and release planets that no ship is attached to anymore.
+
+    :return: nothing
+    """
+    for status, done in ((DOCKING, DOCKED), (UNDOCKING, UNDOCKED)):
+        moving = state.ship_alive & (state.ship_status == status)
+        state.ship_progress[moving] -= 1
+        finished = moving & (state.ship_progress <= 0)
+        state.ship_status[finished] = done
+        state.ship_progress[finished] = 0
+    released = state.ship_status == UNDOCKED
+    state.ship_planet[released] = NO_ID
+
+    attached = _docked_counts(state, state.ship_status != UNDOCKED)
+    state.planet_owner[attached == 0] = NO_ID
+
+
+def _produce(state):
+    """
+    Owned planets produce BASE_PRODUCTIVITY per fully docked ship until their resources run out, and spawn a
+    ship for their owner whenever SHIP_COST has been produced.
+
+    :return: (games, slots) mask of the spawned ships
+    :rtype: numpy.ndarray
+    """
+    docked = _docked_counts(state, state.ship_status == DOCKED)
+    produced = np.minimum(docked * constants.BASE_PRODUCTIVITY, state.planet_remaining)
+    produced[state.planet_owner == NO_ID] = 0
+    state.planet_production += produced
+    state.planet_remaining -= produced
+
+    spawned = []
+    for game, planet in zip(*np.nonzero(state.planet_alive & (state.planet_production >= SHIP_COST))):
+        while state.planet_production[game, planet] >= SHIP_COST:
+            position = _spawn_position(state, game, planet)
+            if position is None:
+                break
+            spawned.append((game, state.add_ship(game, state.planet_owner[game, planet], *position)))
+            state.planet_production[game, planet] -= SHIP_COST
+
+    mask = np.zeros(state.ship_alive.shape, dtype=np.bool_)
+    for game, slot in spawned:
+        mask[game, slot] = True
+    return mask
+
+
+def _spawn_position(state, game, planet):
+    """
+    Find a free spot SPAWN_RADIUS from the planet surface, preferring the side facing the map center.
+
+    :return: (x, y) of the spot, or None if every candidate is taken
+    :rtype: (float, float)
+    """
+    px, py = state.planet_x[game, planet], state.planet_y[game, planet]
+    distance = state.planet_radius[game, planet] + constants.SPAWN_RADIUS
+    toward_center = math.degrees(math.atan2(state.height / 2 - py, state.width / 2 - px))
+    alive = state.ship_alive[game]
+    ships_x, ships_y = state.ship_x[game, alive], state.ship_y[game, alive]
+    for offset in range(0, 360, SPAWN_ANGLE_STEP):
+        for sign in ((1, -1) if 0 < offset < 180 else (1,)):
+            angle = math.radians(toward_center + sign * offset)
+            x = px + distance * math.cos(angle)
+            y = py + distance * math.sin(angle)
+            if not (0 <= x <= state.width and 0 <= y <= state.height):
+                continue
+            if np.any((ships_x - x) ** 2 + (ships_y - y) ** 2 <= SHIP_COLLISION_RADIUS ** 2):
+                continue
+            return x, y
+    return None
@@ -0,0 +1,195 @@
+"""
+Seeded, symmetric game situations for benchmarks and tests of Map, FeatureCollector and navigation, without a
+running engine. A scenario is a single frame at any stage of a game: planets with docked ships in every docking
+status, owned and free planets, and undocked ships spread over the map, all mirrored between the players.
+
+Usage: python -m engine.scenario stress-4p-600 [--seed N] > frame.txt
+"""
+
+import argparse
+
+import numpy as np
+
+from hlt import constants, game_map
+from . import mapgen, protocol
+from .state import GameState, PLANET_FIELDS, DOCKING, DOCKED, UNDOCKING, SHIP_COST
+
+#: Name of a preset -> arguments of generate()
+PRESETS = {
+    "opening-2p": dict(num_players=2, num_ships=6, num_planets=12, docked_fraction=0.0),
+    "opening-4p": dict(num_players=4, num_ships=12, num_planets=20, docked_fraction=0.0),
+    "midgame-2p": dict(num_players=2, num_ships=80, num_planets=14),
+    "midgame-4p": dict(num_players=4, num_ships=160, num_planets=24),
+    "stress-4p-600": dict(num_players=4, num_ships=600, num_planets=28, width=384, height=256),
+    "stress-4p-1600": dict(num_players=4, num_ships=1600, num_planets=28, width=384, height=256),
+}
+#: Share of docked ships in each docking status (DOCKING, DOCKED, UNDOCKING)
+DOCKED_STATUSES = ((DOCKING, 0.2), (DOCKED, 0.6), (UNDOCKING, 0.2))
+#: Gap between a docked ship and the surface of its planet
+DOCKED_GAP = 1.0
+#: Free space kept between an undocked ship and the planets, the mirror lines and other ships
+SHIP_MARGIN = 1.0
+#: Rejection sampling attempts per undocked ship
+PLACEMENT_ATTEMPTS = 1000
+
+
+class Scenario:
+    """
+    A generated frame.
+
+    :ivar seed: The seed it was generated from
+    :ivar state: The frame as a (single game) GameState
+    :ivar frame: The raw frame, as the engine would send it
+    :ivar width: Map width
+    :ivar height: Map height
+    """
+
+    def __init__(self, state, seed):
+        self.seed = seed
+        self.state = state
+        self.width = state.width
+        self.height = state.height
+        self.frame = protocol.encode_frame(state)
+
+    def map(self, my_id=0, incremental=False):
+        """
+        Parse the frame as seen by one player.
+
+        :param int my_id: The player
+        :param bool incremental: Passed on to the created map
+        :rtype: game_map.Map
+        """
+        parsed = game_map.Map(my_id, self.width, self.height, incremental)
+        parsed._parse(self.frame)
+        return parsed
+
+
+def generate(seed=0, num_players=4, num_ships=60, num_planets=24, width=240, height=160, docked_fraction=0.3):
+    """
+    Generate a scenario. The same arguments always give the same frame.
+
+    :param int seed: Random seed
+    :param int num_players: 2 or 4
+    :param int num_ships: Total number of ships, rounded down to a multiple of num_players
+    :param int num_planets: Number of planets, rounded up to a multiple of num_players
+    :param int width: Map width
+    :param int height: Map height
+    :param float docked_fraction: Share of every player's ships attached to its planets, as far as the docking
+        spots allow. The planets a player has ships on are owned by it, the others are free.
+    :rtype: Scenario
+    """
+    rng = np.random.default_rng(seed)
+    per_player = num_ships // num_players
+    planets_per_player = -(-num_planets // num_players)
+    layout = mapgen.generate(num_players, width, height, rng.integers(2 ** 63), planets_per_player=planets_per_player)
+    state = GameState(1, num_players, width, height, layout.num_planets, max(per_player * num_players, 1))
+    for name, _, _ in PLANET_FIELDS:
+        getattr(state, name)[:] = getattr(layout, name)
+
+    mirrors, sector = mapgen.sector_mirrors(num_players, width, height)
+    # Planet index * num_players + player is the copy of a first sector planet in that player's sector
+    sector_planets = np.arange(planets_per_player) * num_players
+    docked = _dock_ships(rng, state, sector_planets, int(per_player * docked_fraction))
+    free = _place_ships(rng, state, sector_planets, sector, per_player - len(docked))
+
+    for player, mirror in enumerate(mirrors):
+        for planet, x, y, status, progress, health in docked:
+            slot = state.add_ship(0, player, *mirror(x, y), health)
+            state.ship_status[0, slot] = status
+            state.ship_planet[0, slot] = planet + player
+            state.ship_progress[0, slot] = progress
+        for x, y, health, cooldown in free:
+            slot = state.add_ship(0, player, *mirror(x, y), health)
+            state.ship_cooldown[0, slot] = cooldown
+    return Scenario(state, seed)
+
+
+def _dock_ships(rng, state, sector_planets, count):
+    """
+    Attach ships to the planets of the first sector, filling randomly chosen planets one after the other, and
+    give those planets an owner, production and spent resources.
+
+    :return: (planet, x, y, status, progress, health) of every docked ship of the first sector
+    :rtype: list
+    """
+    docked = []
+    for planet in rng.permutation(sector_planets):
+        if len(docked) >= count:
+            break
+        spots = min(int(state.planet_spots[0, planet]), count - len(docked))
+        start = rng.uniform(0, 2 * np.pi)
+        distance = state.planet_radius[0, planet] + constants.SHIP_RADIUS + DOCKED_GAP
+        statuses, weights = zip(*DOCKED_STATUSES)
+        for spot, status in enumerate(rng.choice(statuses, size=spots, p=weights)):
+            angle = start + 2 * np.pi * spot / state.planet_spots[0, planet]
+            progress = 0 if status == DOCKED else int(rng.integers(1, constants.DOCK_TURNS + 1))
+            docked.append((int(planet), state.planet_x[0, planet] + distance * np.cos(angle),
+                           state.planet_y[0, planet] + distance * np.sin(angle), int(status), progress,
+                           int(rng.integers(1, constants.MAX_SHIP_HEALTH + 1))))
+
+    # Make sure every docking status shows up when there are enough docked ships
+    for index, (status, _) in enumerate(DOCKED_STATUSES[:len(docked)]):
+        planet, x, y, _, _, health = docked[index]
+        docked[index] = (planet, x, y, status, 0 if status == DOCKED else 1, health)
+
+    owned = {planet for planet, *_ in docked}
+    for planet in sector_planets:
+        if planet in owned:
+            for copy in range(state.num_players):
+                state.planet_owner[0, planet + copy] = copy
+        produced = int(rng.integers(0, SHIP_COST)) if planet in owned else 0
+        spent = int(rng.integers(0, state.planet_remaining[0, planet] // 2 + 1)) if planet in owned else 0
+        state.planet_production[0, planet:planet + state.num_players] = produced
+        state.planet_remaining[0, planet:planet + state.num_players] -= spent
+    return docked
+
+
+def _place_ships(rng, state, sector_planets, sector, count):
+    """
+    Rejection-sample undocked ships in the first sector, clear of the planets, of the sector borders and of
+    each other.
+
+    :return: (x, y, health, cooldown) of every undocked ship of the first sector
+    :rtype: list
+    """
+    planet_x = state.planet_x[0, sector_planets]
+    planet_y = state.planet_y[0, sector_planets]
+    reach = state.planet_radius[0, sector_planets] + constants.SHIP_RADIUS + SHIP_MARGIN + DOCKED_GAP
+    border = constants.SHIP_RADIUS + SHIP_MARGIN
+    ships_x, ships_y = [], []
+    placed = []
+    for _ in range(PLACEMENT_ATTEMPTS * count):
+        if len(placed) >= count:
+            break
+        x, y = rng.uniform(border, sector[0] - border), rng.uniform(border, sector[1] - border)
+        if np.any((planet_x - x) ** 2 + (planet_y - y) ** 2 < reach ** 2):
+            continue
+        if ships_x and np.min((np.array(ships_x) - x) ** 2 + (np.array(ships_y) - y) ** 2) < (2 * border) ** 2:
+            continue
+        ships_x.append(x)
+        ships_y.append(y)
+        placed.append((x, y, int(rng.integers(1, constants.MAX_SHIP_HEALTH + 1)), int(rng.integers(0, 2))))
+    if len(placed) < count:
+        raise ValueError("No room for {} ships per player on a {}x{} map".format(count, state.width, state.height))
+    return placed
+
+
+def preset(name, seed=0):
+    """
+    :param str name: Key of PRESETS
+    :param int seed: Random seed
+    :rtype: Scenario
+    """
+    return generate(seed, **PRESETS[name])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("preset", choices=sorted(PRESETS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(preset(args.preset, args.seed).frame)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Run a local match between bot processes, speaking the halite.exe protocol over their stdin/stdout.
+
+Usage: python -m engine.server "python bot1.py" "python test_bot.py" [--width 240 --height 160] [--seed N]
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import threading
+
+import numpy as np
+
+from hlt import replay
+from . import mapgen, protocol, rules
+
+DEFAULT_TURNS = 300
+
+
+class Bot:
+    """
+    A bot process. A bot that crashes, sends garbage or misses a deadline is eliminated.
+
+    :ivar player: Player id
+    :ivar name: Name sent by the bot, the command line until it is received
+    :ivar alive: Whether the bot is still playing
+    :ivar error: Why the bot was eliminated, if it was
+    """
+
+    def __init__(self, player, command, cwd=None):
+        """
+        :param int player: Player id
+        :param str command: Command line starting the bot
+        :param str cwd: Working directory of the bot, the current one by default
+        """
+        self.player = player
+        self.name = command
+        self.alive = True
+        self.error = None
+        self._process = subprocess.Popen(shlex.split(command), cwd=cwd, stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._watchdog = None
+
+    def send(self, line, timeout):
+        """
+        Send a line and start the reply deadline.
+
+        :param str line: The line, without trailing newline
+        :param float timeout: Seconds the bot has to reply
+        :return: nothing
+        """
+        if not self.alive:
+            return
+        self._watchdog = threading.Timer(timeout, self._process.kill)
+        self._watchdog.start()
+        try:
+            self._process.stdin.write(line.encode("ascii") + b"\n")
+            self._process.stdin.flush()
+        except OSError:
+            self.eliminate("could not write to the bot")
+
+    def receive(self):
+        """
+        Wait for the reply to the last line sent.
+
+        :return: The reply, without trailing newline, or None if the bot was eliminated
+        :rtype: str
+        """
+        if not self.alive:
+            return None
+        try:
+            reply = self._process.stdout.readline()
+        except OSError:
+            reply = b""
+        finally:
+            self._watchdog.cancel()
+        if not reply.endswith(b"\n"):
+            self.eliminate("timed out or exited with code {}".format(self._process.poll()))
+            return None
+        return reply.decode("ascii", "replace").rstrip("\r\n")
+
+    def eliminate(self, error):
+        """
+        Remove the bot from the game and stop its process.
+
+        :param str error: The reason
+        :return: nothing
+        """
+        self.alive = False
+        self.error = error
+        self.close()
+
+    def close(self):
+        """
+        Stop the process.
+
+        :return: nothing
+        """
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+        self._process.kill()
+        self._process.wait()
+        for pipe in (self._process.stdin, self._process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+def play(commands, width=240, height=160, seed=None, max_turns=DEFAULT_TURNS, timeout=2.0, init_timeout=60.0,
+         cwd=None, record=None):
+    """
+    Play one game to the end.
+
+    :param list[str] commands: Command line of every bot, 2 or 4 of them
+    :param int width: Map width
+    :param int height: Map height
+    :param int seed: Map seed
+    :param int max_turns: Turn limit
+    :param float timeout: Seconds a bot has to answer a frame
+    :param float init_timeout: Seconds a bot has to answer the initial map
+    :param str cwd: Working directory of the bots
+    :param str record: Directory to write the conversation with every bot to, as hlt.replay files named
+        player<id>.hlr, created if missing (optional)
+    :return: Dict with the number of turns played and, for every player, its name, rank, last turn alive, ships,
+        total ship health and elimination reason
+    :rtype: dict
+    """
+    state = mapgen.generate(len(commands), width, height, seed)
+    bots = [Bot(player, command, cwd) for player, command in enumerate(commands)]
+    last_alive = np.zeros(len(bots), dtype=np.int64)
+    if record is not None:
+        os.makedirs(record, exist_ok=True)
+    recorders = [replay.ReplayWriter(os.path.join(record, "player{}.hlr".format(bot.player))) for bot in bots] \
+        if record is not None else []
+    try:
+        frame = protocol.encode_frame(state)
+        for bot in bots:
+            bot.send("{}\n{} {}\n{}".format(bot.player, width, height, frame), init_timeout)
+        for recorder, bot in zip(recorders, bots):
+            for line in (str(bot.player), "{} {}".format(width, height), frame):
+                recorder.write_engine(line.encode("ascii"))
+        for bot in bots:
+            name = bot.receive()
+            if name is not None:
+                bot.name = name
+        for recorder, bot in zip(recorders, bots):
+            recorder.write_bot(bot.name.encode("ascii", "replace"))
+
+        while True:
+            _eliminate(state, bots)
+            last_alive[state.player_ship_counts()[0] > 0] = state.turn[0]
+            if rules.finished(state, max_turns)[0]:
+                break
+
+            frame = protocol.encode_frame(state)
+            for bot in bots:
+                bot.send(frame, timeout)
+            orders = rules.Commands(state)
+            slots = protocol.ship_slots(state)
+            replies = [bot.receive() for bot in bots]
+            for bot, reply in zip(bots, replies):
+                if reply is not None:
+                    protocol.parse_commands(reply, state, 0, bot.player, orders, slots)
+            for recorder, bot, reply in zip(recorders, bots, replies):
+                if bot.alive:
+                    recorder.write_engine(frame.encode("ascii"))
+                    recorder.write_bot(reply.encode("ascii", "replace"))
+            orders.apply(state)
+            rules.step(state)
+    finally:
+        for bot in bots:
+            bot.close()
+        for recorder in recorders:
+            recorder.close()
+    return _results(state, bots, last_alive)
+
+
+def _eliminate(state, bots):
+    """
+    Destroy the ships of eliminated bots.
+
+    :return: nothing
+    """
+    for bot in bots:
+        if not bot.alive:
+            state.ship_alive[0, state.ship_owner[0] == bot.player] = False
+
+
+def _results(state, bots, last_alive):
+    """
+    Rank the players by last turn alive, then number of ships, then total ship health.
+
+    :rtype: dict
+    """
+    alive = state.ship_alive[0]
+    players = []
+    for bot in bots:
+        owned = alive & (state.ship_owner[0] == bot.player)
+        players.append({"player": bot.player, "name": bot.name, "last_turn_alive": int(last_alive[bot.player]),
+                        "ships": int(owned.sum()), "health": int(state.ship_health[0, owned].sum()),
+                        "error": bot.error})
+    order = sorted(players, key=lambda p: (p["last_turn_alive"], p["ships"], p["health"]), reverse=True)
+    for rank, player in enumerate(order, 1):
+        player["rank"] = rank
+    return {"turns": int(state.turn[0]), "players": players}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("bots", nargs="+", help="bot command lines, 2 or 4 of them")
+    parser.add_argument("--width", type=int, default=240)
+    parser.add_argument("--height", type=int, default=160)
+    parser.add_argument("--seed", type=int, help="map seed, random by default")
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="turn limit")
+    parser.add_argument("--timeout", type=float, default=2.0, help="seconds allowed per turn")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--record", help="directory to write a replay of every bot's conversation to")
+    args = parser.parse_args()
+
+    results = play(args.bots, args.width, args.height, args.seed, args.turns, args.timeout, record=args.record)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("Game over after {} turns".format(results["turns"]))
+    for player in sorted(results["players"], key=lambda p: p["rank"]):
+        print("#{rank} player {player} {name}: {ships} ships, last alive on turn {last_turn_alive}".format(**player)
+              + (" ({})".format(player["error"]) if player["error"] else ""))
+
+
+if __name__ == "__main__":
+    main()
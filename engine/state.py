@@ -0,0 +1,182 @@
+import numpy as np
+
+from hlt import constants
+
+#: Docking status values, matching hlt.entity.Ship.DockingStatus
+UNDOCKED, DOCKING, DOCKED, UNDOCKING = 0, 1, 2, 3
+#: Owner / planet value meaning "none"
+NO_ID = -1
+#: Production needed to spawn a ship
+SHIP_COST = 72
+#: Ships every player starts with
+INITIAL_SHIPS = 3
+
+#: (name, dtype, fill value of an empty slot) of the per-ship arrays
+SHIP_FIELDS = (
+    ("ship_alive", np.bool_, False),
+    ("ship_id", np.int64, NO_ID),
+    ("ship_owner", np.int64, NO_ID),
+    ("ship_x", np.float64, 0.0),
+    ("ship_y", np.float64, 0.0),
+    ("ship_vx", np.float64, 0.0),
+    ("ship_vy", np.float64, 0.0),
+    ("ship_health", np.int64, 0),
+    ("ship_status", np.int64, UNDOCKED),
+    ("ship_planet", np.int64, NO_ID),
+    ("ship_progress", np.int64, 0),
+    ("ship_cooldown", np.int64, 0),
+)
+
+#: (name, dtype, fill value) of the per-planet arrays. The planet id is its column.
+PLANET_FIELDS = (
+    ("planet_alive", np.bool_, False),
+    ("planet_x", np.float64, 0.0),
+    ("planet_y", np.float64, 0.0),
+    ("planet_radius", np.float64, 0.0),
+    ("planet_health", np.int64, 0),
+    ("planet_spots", np.int64, 0),
+    ("planet_production", np.int64, 0),
+    ("planet_remaining", np.int64, 0),
+    ("planet_owner", np.int64, NO_ID),
+)
+
+
+class GameState:
+    """
+    Array-backed state of a batch of Halite II games sharing the map size, the number of players and the
+    number of planets. Every per-ship array has shape (games, ship_capacity) and every per-planet array has
+    shape (games, planets). Ships live in slots: a dead ship's slot is reused by later spawns, and the ship
+    arrays grow when a game runs out of free slots. A single game is a batch of one.
+
+    :ivar num_games: Number of games in the batch
+    :ivar num_players: Players per game
+    :ivar width: Map width
+    :ivar height: Map height
+    :ivar turn: Current turn of every game
+    :ivar next_ship_id: Id given to the next ship spawned in every game
+    """
+
+    def __init__(self, num_games, num_players, width, height, num_planets, ship_capacity=64):
+        self.num_games = num_games
+        self.num_players = num_players
+        self.width = width
+        self.height = height
+        self.turn = np.zeros(num_games, dtype=np.int64)
+        self.next_ship_id = np.zeros(num_games, dtype=np.int64)
+        for name, dtype, fill in SHIP_FIELDS:
+            setattr(self, name, np.full((num_games, ship_capacity), fill, dtype=dtype))
+        for name, dtype, fill in PLANET_FIELDS:
+            setattr(self, name, np.full((num_games, num_planets), fill, dtype=dtype))
+
+    @property
+    def ship_capacity(self):
+        return self.ship_alive.shape[1]
+
+    @property
+    def num_planets(self):
+        return self.planet_alive.shape[1]
+
+    def copy(self):
+        """
+        :return: A deep copy of the state
+        :rtype: GameState
+        """
+        other = GameState.__new__(GameState)
+        other.__dict__.update({name: value.copy() if isinstance(value, np.ndarray) else value
+                               for name, value in self.__dict__.items()})
+        return other
+
+    def grow_ships(self, capacity):
+        """
+        Enlarge the ship arrays of every game to the given number of slots.
+
+        :param int capacity: New number of ship slots, at least the current one
+        :return: nothing
+        """
+        extra = capacity - self.ship_capacity
+        if extra <= 0:
+            return
+        for name, dtype, fill in SHIP_FIELDS:
+            pad = np.full((self.num_games, extra), fill, dtype=dtype)
+            setattr(self, name, np.concatenate([getattr(self, name), pad], axis=1))
+
+    def load_game(self, game, other, other_game=0):
+        """
+        Replace one game of the batch with a game of another state of the same size, e.g. a new map.
+
+        :param int game: Game index to overwrite
+        :param GameState other: The state to copy from
+        :param int other_game: Game index in other
+        :return: nothing
+        """
+        self.grow_ships(other.ship_capacity)
+        for name, _, fill in SHIP_FIELDS:
+            target = getattr(self, name)
+            target[game] = fill
+            target[game, :other.ship_capacity] = getattr(other, name)[other_game]
+        for name, _, _ in PLANET_FIELDS:
+            getattr(self, name)[game] = getattr(other, name)[other_game]
+        self.turn[game] = other.turn[other_game]
+        self.next_ship_id[game] = other.next_ship_id[other_game]
+
+    def add_ship(self, game, owner, x, y, health=constants.BASE_SHIP_HEALTH):
+        """
+        Spawn a ship in the first free slot of a game, growing the arrays if needed.
+
+        :param int game: Game index
+        :param int owner: Owning player
+        :param float x: x-coordinate
+        :param float y: y-coordinate
+        :param int health: Initial health
+        :return: The slot of the new ship
+        :rtype: int
+        """
+        free = np.flatnonzero(~self.ship_alive[game])
+        if not len(free):
+            self.grow_ships(2 * self.ship_capacity)
+            free = np.flatnonzero(~self.ship_alive[game])
+        slot = free[0]
+        for name, _, fill in SHIP_FIELDS:
+            getattr(self, name)[game, slot] = fill
+        self.ship_alive[game, slot] = True
+        self.ship_id[game, slot] = self.next_ship_id[game]
+        self.ship_owner[game, slot] = owner
+        self.ship_x[game, slot] = x
+        self.ship_y[game, slot] = y
+        self.ship_health[game, slot] = health
+        self.next_ship_id[game] += 1
+        return slot
+
+    def set_planet(self, game, planet, x, y, radius, spots, remaining, health=None):
+        """
+        Place a planet in a game.
+
+        :param int game: Game index
+        :param int planet: Planet id (column)
+        :param float x: x-coordinate
+        :param float y: y-coordinate
+        :param float radius: Radius
+        :param int spots: Number of docking spots
+        :param int remaining: Production capacity
+        :param int health: Health, by default proportional to the radius
+        :return: nothing
+        """
+        self.planet_alive[game, planet] = True
+        self.planet_x[game, planet] = x
+        self.planet_y[game, planet] = y
+        self.planet_radius[game, planet] = radius
+        self.planet_health[game, planet] = health if health is not None else int(radius * constants.MAX_SHIP_HEALTH)
+        self.planet_spots[game, planet] = spots
+        self.planet_production[game, planet] = 0
+        self.planet_remaining[game, planet] = remaining
+        self.planet_owner[game, planet] = NO_ID
+
+    def player_ship_counts(self):
+        """
+        :return: Number of living ships of every player, shape (games, players)
+        :rtype: numpy.ndarray
+        """
+        owners = np.where(self.ship_alive, self.ship_owner, self.num_players)
+        counts = np.zeros((self.num_games, self.num_players + 1), dtype=np.int64)
+        np.add.at(counts, (np.arange(self.num_games)[:, None], owners), 1)
+        return counts[:, :self.num_players]
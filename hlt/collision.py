@@ -1,3 +1,5 @@
+import numpy as np
+
 from .entity import Position, Entity
 
 
@@ -38,3 +40,72 @@ def intersect_segment_circle(start, end, circle, *, fudge=0.5):
     closest_distance = Position(closest_x, closest_y).calculate_distance_between(circle)
 
     return closest_distance <= circle.radius + fudge
+
+
+def intersect_segment_circles(start, end, x, y, radius, *, fudge=0.5):
+    """
+    Test one line segment against many circles at once. Same results as intersect_segment_circle for each circle.
+
+    :param Entity start: The start of the line segment. (Needs x, y attributes)
+    :param Entity end: The end of the line segment. (Needs x, y attributes)
+    :param numpy.ndarray x: x-coordinates of the circles
+    :param numpy.ndarray y: y-coordinates of the circles
+    :param numpy.ndarray radius: Radii of the circles
+    :param float fudge: Additional distance to leave between the segment and circles
+    :return: Boolean array, True where the circle intersects, and the time along the segment (0 to 1) when closest
+        to each circle
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    return _intersect(start.x, start.y, end.x, end.y, np.asarray(x, dtype=np.float64),
+                      np.asarray(y, dtype=np.float64), np.asarray(radius, dtype=np.float64), fudge)
+
+
+def intersect_segments_circles(start_x, start_y, end_x, end_y, x, y, radius, *, fudge=0.5):
+    """
+    Test many line segments against many circles at once. Same results as intersect_segment_circle for each pair.
+
+    :param numpy.ndarray start_x: x-coordinates of the segment starts (or one float shared by all segments)
+    :param numpy.ndarray start_y: y-coordinates of the segment starts (or one float shared by all segments)
+    :param numpy.ndarray end_x: x-coordinates of the segment ends
+    :param numpy.ndarray end_y: y-coordinates of the segment ends
+    :param numpy.ndarray x: x-coordinates of the circles
+    :param numpy.ndarray y: y-coordinates of the circles
+    :param numpy.ndarray radius: Radii of the circles
+    :param float fudge: Additional distance to leave between the segments and circles
+    :return: Boolean matrix with one row per segment and one column per circle, True where they intersect, and
+        the matrix of the times along the segments (0 to 1) when closest to the circles
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    def column(values):
+        values = np.asarray(values, dtype=np.float64)
+        return values[:, None] if values.ndim else values
+
+    return _intersect(column(start_x), column(start_y), column(end_x), column(end_y),
+                      np.asarray(x, dtype=np.float64)[None, :], np.asarray(y, dtype=np.float64)[None, :],
+                      np.asarray(radius, dtype=np.float64)[None, :], fudge)
+
+
+def _intersect(start_x, start_y, end_x, end_y, x, y, radius, fudge):
+    """
+    Broadcasting version of intersect_segment_circle, in the same order of operations so the results are
+    bit-identical to it. Squares go through np.float_power, which calls the C pow like the ** operator of the
+    scalar version; x * x and np.power may round differently.
+
+    :return: Intersection mask and closest approach times
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    dx = end_x - start_x
+    dy = end_y - start_y
+    a = np.float_power(dx, 2) + np.float_power(dy, 2)
+    b = -2 * (np.float_power(start_x, 2) - start_x * end_x - start_x * x + end_x * x +
+              np.float_power(start_y, 2) - start_y * end_y - start_y * y + end_y * y)
+    # A degenerate segment is its start point, at time 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(a == 0.0, 0.0, np.minimum(-b / (2 * a), 1.0))
+    ahead = t >= 0
+    t = np.maximum(t, 0.0)
+
+    distance_x = x - (start_x + dx * t)
+    distance_y = y - (start_y + dy * t)
+    closest_distance = np.sqrt(np.float_power(distance_x, 2) + np.float_power(distance_y, 2))
+    return ahead & (closest_distance <= radius + fudge), t
@@ -0,0 +1,178 @@
+import numpy as np
+
+from . import entity
+
+#: Owner / planet value used in the integer columns when the entity has none
+NO_ID = -1
+
+
+class EntityColumns:
+    """
+    Base class of the columnar (structure of arrays) views of a frame. Every attribute is a contiguous NumPy
+    array with one row per entity, in the same order as the entity list the view was built from.
+
+    :ivar entities: The entity objects, in row order
+    :ivar rows: Dict mapping entity id to its row
+    :ivar id: Entity ids
+    :ivar x: x-coordinates
+    :ivar y: y-coordinates
+    :ivar radius: Radii
+    :ivar health: Health
+    :ivar owner: Owner player id, NO_ID if not owned
+    """
+
+    def __init__(self, entities):
+        self.entities = entities
+        self.rows = {entity.id: row for row, entity in enumerate(entities)}
+        self.id = self._column(lambda e: e.id, np.int64)
+        self.x = self._column(lambda e: e.x, np.float64)
+        self.y = self._column(lambda e: e.y, np.float64)
+        self.radius = self._column(lambda e: e.radius, np.float64)
+        self.health = self._column(lambda e: e.health, np.int64)
+        self.owner = self._column(lambda e: e.owner.id if e.owner is not None else NO_ID, np.int64)
+
+    def _column(self, getter, dtype):
+        return np.fromiter((getter(e) for e in self.entities), dtype=dtype, count=len(self.entities))
+
+    def __len__(self):
+        return len(self.entities)
+
+    def row_of(self, entity_id):
+        """
+        :param int entity_id: Id of the entity
+        :return: The row of the entity, or None if it is not part of this view
+        :rtype: int
+        """
+        return self.rows.get(entity_id)
+
+    def distances_from(self, target):
+        """
+        Distance from the target to every entity of the view. Computed in the same order of operations as
+        Entity.calculate_distance_between, so the values are bit-identical to it: np.float_power squares like
+        the ** operator, where x * x and np.power may round differently.
+
+        :param entity.Entity target: The entity or position to measure from (needs x, y attributes)
+        :return: Array of distances, one per row
+        :rtype: numpy.ndarray
+        """
+        return np.sqrt(np.float_power(target.x - self.x, 2) + np.float_power(target.y - self.y, 2))
+
+    def owned_by(self, player_id):
+        """
+        :param int player_id: The owner to filter on
+        :return: Boolean mask of the rows owned by player_id
+        :rtype: numpy.ndarray
+        """
+        return self.owner == player_id
+
+
+class ShipColumns(EntityColumns):
+    """
+    Columnar view of all ships of a frame.
+
+    :ivar docking_status: DockingStatus value of every ship
+    :ivar planet: Id of the planet the ship is (un)docking or docked to, NO_ID if undocked
+    :ivar docking_progress: Docking progress in turns
+    :ivar cooldown: Weapon cooldown
+    :ivar vel_x: x-component of the velocity
+    :ivar vel_y: y-component of the velocity
+    """
+
+    def __init__(self, ships):
+        """
+        :param list[entity.Ship] ships: The linked ships of a frame
+        """
+        super().__init__(ships)
+        self.docking_status = self._column(lambda s: s.docking_status.value, np.int64)
+        self.planet = self._column(lambda s: s.planet.id if s.planet is not None else NO_ID, np.int64)
+        self.docking_progress = self._column(lambda s: s._docking_progress, np.int64)
+        self.cooldown = self._column(lambda s: s._weapon_cooldown, np.int64)
+        self.vel_x = self._column(lambda s: s._vel_x, np.float64)
+        self.vel_y = self._column(lambda s: s._vel_y, np.float64)
+
+
+class PlanetColumns(EntityColumns):
+    """
+    Columnar view of all planets of a frame.
+
+    :ivar num_docking_spots: Max number of ships that can dock
+    :ivar num_docked: Number of ships currently (un)docking or docked
+    :ivar current_production: Production generated towards the next ship
+    :ivar remaining_resources: Remaining production capacity
+    """
+
+    def __init__(self, planets):
+        """
+        :param list[entity.Planet] planets: The linked planets of a frame
+        """
+        super().__init__(planets)
+        self.num_docking_spots = self._column(lambda p: p.num_docking_spots, np.int64)
+        self.num_docked = self._column(lambda p: len(p._docked_ship_ids), np.int64)
+        self.current_production = self._column(lambda p: p.current_production, np.int64)
+        self.remaining_resources = self._column(lambda p: p.remaining_resources, np.int64)
+
+
+class DistanceMatrix:
+    """
+    Distances between all entities of a frame, computed in one broadcast. Rows and columns hold the ships in the
+    order of their ShipColumns, then the planets in the order of their PlanetColumns. Computed in the same order
+    of operations as Entity.calculate_distance_between, squares with np.float_power like the ** operator, so the
+    values are bit-identical to it.
+
+    :ivar ships: The ship columns the matrix was built from
+    :ivar planets: The planet columns the matrix was built from
+    :ivar entities: Entity of every row
+    :ivar owner: Owner player id of every row, NO_ID if not owned
+    :ivar values: The (entities x entities) distance array
+    """
+
+    def __init__(self, ships, planets):
+        """
+        :param ShipColumns ships: Ships of the frame
+        :param PlanetColumns planets: Planets of the frame
+        """
+        self.ships = ships
+        self.planets = planets
+        self.entities = ships.entities + planets.entities
+        self.owner = np.concatenate([ships.owner, planets.owner])
+        x = np.concatenate([ships.x, planets.x])
+        y = np.concatenate([ships.y, planets.y])
+        self.values = np.sqrt(np.float_power(x[None, :] - x[:, None], 2) + np.float_power(y[None, :] - y[:, None], 2))
+
+    def __len__(self):
+        return len(self.entities)
+
+    def row_of(self, target):
+        """
+        :param entity.Entity target: A ship or planet
+        :return: The row of the entity, or None if that object is not part of the frame
+        :rtype: int
+        """
+        if isinstance(target, entity.Planet):
+            row = self.planets.rows.get(target.id)
+            row = None if row is None else len(self.ships) + row
+        else:
+            row = self.ships.rows.get(target.id)
+        return row if row is not None and self.entities[row] is target else None
+
+    def from_entity(self, source):
+        """
+        :param entity.Entity source: A ship or planet of the frame
+        :return: Distances from the entity to every row, or None if it is not part of the frame
+        :rtype: numpy.ndarray
+        """
+        row = self.row_of(source)
+        return None if row is None else self.values[row]
+
+    def between(self, source, target):
+        """
+        :param entity.Entity source: An entity or position
+        :param entity.Entity target: An entity or position
+        :return: Distance between the two, computed directly if one is not part of the frame
+        :rtype: float
+        """
+        source_row = self.row_of(source)
+        target_row = self.row_of(target)
+        if source_row is None or target_row is None:
+            return source.calculate_distance_between(target)
+        return float(self.values[source_row, target_row])
@@ -0,0 +1,104 @@
+"""
+Signed distance field of the planets. Planets never move and are never created, so a field sampled once on a
+grid over the map bounds the distance to the planets of every later frame from below: planets destroyed since
+only make the true clearance larger.
+"""
+
+import math
+
+import numpy as np
+
+#: Spacing of the samples of the field
+RESOLUTION = 1.0
+#: Margin kept by the clearance tests, against rounding in the field and in the exact tests it stands in for
+_SLACK = 1e-6
+
+
+class PlanetDistanceField:
+    """
+    Distance from the sample points of the map to the surface of the nearest planet, negative inside planets.
+    Queries between samples use the nearest one: the distance field changes by at most the distance moved, so the
+    value of the sample minus the distance to it is a lower bound of the clearance at the query point.
+
+    :ivar width: Map width
+    :ivar height: Map height
+    :ivar resolution: Spacing of the samples
+    :ivar values: Clearance at the samples, one row per y step and one column per x step
+    """
+
+    def __init__(self, planets, width, height, resolution=RESOLUTION):
+        """
+        :param list[entity.Planet] planets: Planets to measure from (needs x, y, radius attributes)
+        :param int width: Map width
+        :param int height: Map height
+        :param float resolution: Spacing of the samples; finer gives tighter bounds but costs memory and build time
+        """
+        self.width = width
+        self.height = height
+        self.resolution = resolution
+        xs = np.arange(int(math.ceil(width / resolution)) + 1) * resolution
+        ys = np.arange(int(math.ceil(height / resolution)) + 1) * resolution
+        self.values = np.full((len(ys), len(xs)), np.inf)
+        for planet in planets:
+            dx = xs[None, :] - planet.x
+            dy = ys[:, None] - planet.y
+            np.minimum(self.values, np.sqrt(dx * dx + dy * dy) - planet.radius, out=self.values)
+        # On the map a point is at most half a diagonal from its nearest sample: the sample values lowered by that
+        # much are lower bounds for every point around them. Plain lists are faster to index one at a time.
+        self._half_diagonal = resolution * math.sqrt(2) / 2
+        self._rows = (self.values - self._half_diagonal).tolist()
+        self._last_column = len(xs) - 1
+        self._last_row = len(ys) - 1
+
+    def clearance(self, x, y):
+        """
+        :param float x: x-coordinate of the point
+        :param float y: y-coordinate of the point
+        :return: A lower bound of the distance from the point to the surface of the nearest planet, within
+            resolution * sqrt(2) of it on the map; negative inside a planet, inf if there are no planets
+        :rtype: float
+        """
+        if 0 <= x <= self.width and 0 <= y <= self.height:
+            return self._rows[int(y / self.resolution + 0.5)][int(x / self.resolution + 0.5)]
+        column = min(max(int(round(x / self.resolution)), 0), self._last_column)
+        row = min(max(int(round(y / self.resolution)), 0), self._last_row)
+        dx = x - column * self.resolution
+        dy = y - row * self.resolution
+        return self._rows[row][column] + self._half_diagonal - math.sqrt(dx * dx + dy * dy)
+
+    def segment_clear(self, x0, y0, x1, y1, fudge):
+        """
+        Conservative test of a segment against all planets. The segment is walked from sample to sample, each step
+        as long as the clearance found there allows (sphere tracing), so open space is crossed in a few steps and
+        the walk gives up once the steps shrink below a quarter of the resolution near a planet.
+
+        :param float x0: Start of the segment
+        :param float y0: Start of the segment
+        :param float x1: End of the segment
+        :param float y1: End of the segment
+        :param float fudge: Distance to keep from the planet surfaces
+        :return: True if no point of the segment comes within fudge of a planet; False if one may, for the
+            caller to test exactly
+        :rtype: bool
+        """
+        dx = x1 - x0
+        dy = y1 - y0
+        length = math.sqrt(dx * dx + dy * dy)
+        margin = fudge + _SLACK
+        if self.clearance(x1, y1) <= margin:
+            return False
+        if not length:
+            return True
+        dx /= length
+        dy /= length
+        shortest = self.resolution / 4
+        travelled = 0.0
+        while True:
+            step = self.clearance(x0 + dx * travelled, y0 + dy * travelled) - margin
+            if step <= 0:
+                return False
+            if travelled >= length:
+                return True
+            if step < shortest and travelled + step < length:
+                return False
+            travelled = min(travelled + step, length)
@@ -4,6 +4,9 @@ import math
 from enum import Enum
 from . import constants
 
+#: Course corrections of Ship.navigate tested at once
+CORRECTION_BATCH = 10
+
 
 class Entity:
     """
@@ -157,50 +160,61 @@ class Planet(Entity):
                 self._docked_ships[ship] = self.owner.get_ship(ship)
 
     @staticmethod
-    def _parse_single(tokens):
+    def _parse_single(tokens, cursor, existing=None):
         """
         Parse a single planet given tokenized input from the game environment.
 
-        :return: The planet ID, planet object, and unused tokens.
-        :rtype: (int, Planet, list[str])
+        :param list[str] tokens: The tokenized input
+        :param int cursor: Index of the first token describing the planet
+        :param dict[int, Planet] existing: Planets from the previous frame keyed by id. If the planet is found
+            there, that object is updated in place instead of creating a new one.
+        :return: The planet ID, planet object, and the index of the first unused token.
+        :rtype: (int, Planet, int)
         """
         (plid, x, y, hp, r, docking, current, remaining,
-         owned, owner, num_docked_ships, *remainder) = tokens
+         owned, owner, num_docked_ships) = tokens[cursor:cursor + 11]
+        cursor += 11
 
         plid = int(plid)
-        docked_ships = []
+        num_docked_ships = int(num_docked_ships)
+        docked_ships = [int(ship_id) for ship_id in tokens[cursor:cursor + num_docked_ships]]
+        cursor += num_docked_ships
 
-        for _ in range(int(num_docked_ships)):
-            ship_id, *remainder = remainder
-            docked_ships.append(int(ship_id))
+        args = (plid,
+                float(x), float(y),
+                int(hp), float(r), int(docking),
+                int(current), int(remaining),
+                bool(int(owned)), int(owner),
+                docked_ships)
 
-        planet = Planet(int(plid),
-                        float(x), float(y),
-                        int(hp), float(r), int(docking),
-                        int(current), int(remaining),
-                        bool(int(owned)), int(owner),
-                        docked_ships)
+        planet = existing.get(plid) if existing else None
+        if planet is None:
+            planet = Planet(*args)
+        else:
+            planet.__init__(*args)
 
-        return plid, planet, remainder
+        return plid, planet, cursor
 
     @staticmethod
-    def _parse(tokens):
+    def _parse(tokens, cursor, existing=None):
         """
         Parse planet data given a tokenized input.
 
         :param list[str] tokens: The tokenized input
-        :return: the populated planet dict and the unused tokens.
-        :rtype: (dict, list[str])
+        :param int cursor: Index of the token holding the number of planets
+        :param dict[int, Planet] existing: Planets from the previous frame to update in place (optional)
+        :return: the populated planet dict and the index of the first unused token.
+        :rtype: (dict, int)
         """
-        num_planets, *remainder = tokens
-        num_planets = int(num_planets)
+        num_planets = int(tokens[cursor])
+        cursor += 1
         planets = {}
 
         for _ in range(num_planets):
-            plid, planet, remainder = Planet._parse_single(remainder)
+            plid, planet, cursor = Planet._parse_single(tokens, cursor, existing)
             planets[plid] = planet
 
-        return planets, remainder
+        return planets, cursor
 
 
 class Ship(Entity):
@@ -235,6 +249,8 @@ class Ship(Entity):
         self.planet = planet if (docking_status is not Ship.DockingStatus.UNDOCKED) else None
         self._docking_progress = progress
         self._weapon_cooldown = cooldown
+        self._vel_x = vel_x
+        self._vel_y = vel_y
 
     def thrust(self, magnitude, angle):
         """
@@ -300,13 +316,36 @@ class Ship(Entity):
             else Planet if (ignore_planets and not ignore_ships) \
             else Entity
         if avoid_obstacles and game_map.obstacles_between(self, target, ignore):
-            new_target_dx = math.cos(math.radians(angle + angular_step)) * distance
-            new_target_dy = math.sin(math.radians(angle + angular_step)) * distance
-            new_target = Position(self.x + new_target_dx, self.y + new_target_dy)
-            return self.navigate(new_target, game_map, speed, True, max_corrections - 1, angular_step)
+            return self._correct_course(distance, angle, game_map, speed, max_corrections - 1, angular_step)
         speed = speed if (distance >= speed) else distance
         return self.thrust(speed, angle)
 
+    def _correct_course(self, distance, angle, game_map, speed, max_corrections, angular_step):
+        """
+        Turn a blocked course by angular_step degrees at a time until a straight path is free, like navigate calling
+        itself on the turned target would, with obstacles no longer ignored. The corrections are tested
+        CORRECTION_BATCH at a time with Map.paths_blocked.
+
+        :return string: The thrust command of the first free course, or None if there is none within max_corrections
+        :rtype: str
+        """
+        while max_corrections > 0:
+            targets = []
+            courses = []
+            for _ in range(min(CORRECTION_BATCH, max_corrections)):
+                new_target_dx = math.cos(math.radians(angle + angular_step)) * distance
+                new_target_dy = math.sin(math.radians(angle + angular_step)) * distance
+                new_target = Position(self.x + new_target_dx, self.y + new_target_dy)
+                distance = self.calculate_distance_between(new_target)
+                angle = self.calculate_angle_between(new_target)
+                targets.append(new_target)
+                courses.append((distance, angle))
+            for blocked, (distance, angle) in zip(game_map.paths_blocked(self, targets), courses):
+                if not blocked:
+                    return self.thrust(speed if (distance >= speed) else distance, angle)
+            max_corrections -= len(targets)
+        return None
+
     def can_dock(self, planet):
         """
         Determine whether a ship can dock to a planet
@@ -330,46 +369,58 @@ class Ship(Entity):
         self.planet = planets.get(self.planet)  # If not will just reset to none
 
     @staticmethod
-    def _parse_single(player_id, tokens):
+    def _parse_single(player_id, tokens, cursor, existing=None):
         """
         Parse a single ship given tokenized input from the game environment.
 
         :param int player_id: The id of the player who controls the ships
-        :param list[tokens]: The remaining tokens
-        :return: The ship ID, ship object, and unused tokens.
-        :rtype: int, Ship, list[str]
+        :param list[str] tokens: The tokenized input
+        :param int cursor: Index of the first token describing the ship
+        :param dict[int, Ship] existing: Ships from the previous frame keyed by id. If the ship is found there,
+            that object is updated in place instead of creating a new one.
+        :return: The ship ID, ship object, and the index of the first unused token.
+        :rtype: int, Ship, int
         """
         (sid, x, y, hp, vel_x, vel_y,
-         docked, docked_planet, progress, cooldown, *remainder) = tokens
+         docked, docked_planet, progress, cooldown) = tokens[cursor:cursor + 10]
 
         sid = int(sid)
         docked = Ship.DockingStatus(int(docked))
 
-        ship = Ship(player_id,
-                    sid,
-                    float(x), float(y),
-                    int(hp),
-                    float(vel_x), float(vel_y),
-                    docked, int(docked_planet),
-                    int(progress), int(cooldown))
+        args = (player_id,
+                sid,
+                float(x), float(y),
+                int(hp),
+                float(vel_x), float(vel_y),
+                docked, int(docked_planet),
+                int(progress), int(cooldown))
+
+        ship = existing.get(sid) if existing else None
+        if ship is None:
+            ship = Ship(*args)
+        else:
+            ship.__init__(*args)
 
-        return sid, ship, remainder
+        return sid, ship, cursor + 10
 
     @staticmethod
-    def _parse(player_id, tokens):
+    def _parse(player_id, tokens, cursor, existing=None):
         """
         Parse ship data given a tokenized input.
 
         :param int player_id: The id of the player who owns the ships
         :param list[str] tokens: The tokenized input
-        :return: The dict of Players and unused tokens.
-        :rtype: (dict, list[str])
+        :param int cursor: Index of the token holding the number of ships
+        :param dict[int, Ship] existing: Ships from the previous frame to update in place (optional)
+        :return: The dict of Ships and the index of the first unused token.
+        :rtype: (dict, int)
         """
         ships = {}
-        num_ships, *remainder = tokens
-        for _ in range(int(num_ships)):
-            ship_id, ships[ship_id], remainder = Ship._parse_single(player_id, remainder)
-        return ships, remainder
+        num_ships = int(tokens[cursor])
+        cursor += 1
+        for _ in range(num_ships):
+            ship_id, ships[ship_id], cursor = Ship._parse_single(player_id, tokens, cursor, existing)
+        return ships, cursor
 
 
 class Position(Entity):
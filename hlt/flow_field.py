@@ -0,0 +1,200 @@
+"""
+Flow fields toward planets. For one target planet, the length of the shortest way to its dock ring is computed for
+every cell of a grid over the map, going around the other planets, together with the heading to fly from each cell.
+A field is computed once per target and cached, so every ship going to a planet reads its heading in O(1).
+"""
+
+import collections
+import math
+
+import numpy as np
+
+from . import constants
+
+#: Spacing of the cells of the fields: half a turn of flight
+CELL_SIZE = constants.MAX_SPEED / 2
+#: Cells whose sample keeps a ship and half a cell diagonal from the other planets are free to fly through
+CLEARANCE = constants.SHIP_RADIUS + CELL_SIZE * math.sqrt(2) / 2
+#: Fields kept by FlowFields, least recently used ones are dropped first
+CACHE_SIZE = 8
+#: Moves between cells: the 8 neighbors and the 8 knight moves, for headings every 22.5 degrees or so
+_STEPS = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3)
+          if (dx, dy) != (0, 0) and (max(abs(dx), abs(dy)) == 1 or abs(dx * dy) == 2)]
+
+
+def _crossed(dx, dy):
+    """
+    :return: The cells, relative to the start, that a move runs between besides its ends: none for the 8 neighbors,
+        the two cells beside its middle for a knight move
+    :rtype: list[(int, int)]
+    """
+    if abs(dx) == 2:
+        return [(dx // 2, 0), (dx // 2, dy)]
+    if abs(dy) == 2:
+        return [(0, dy // 2), (dx, dy // 2)]
+    return []
+
+
+class FlowField:
+    """
+    Shortest ways from every cell to the dock ring of a planet, computed by relaxing all cells at once until
+    nothing changes (a vectorized Bellman-Ford over the grid). A move is only taken if every point of it stays
+    within half a cell diagonal of a free cell, so ways keep clear of the planets: the neighbor moves always do,
+    knight moves when both cells beside their middle are free.
+
+    :ivar planet_id: Id of the target planet
+    :ivar owner: Owner id of the planet when the field was computed, None if not owned
+    :ivar cell_size: Spacing of the cells
+    :ivar distance: Length of the way to the dock ring from every cell, inf where there is none
+    :ivar headings: Heading in degrees to fly from every cell, NaN on the dock ring, inside planets and where
+        there is no way
+    """
+
+    def __init__(self, planet, planets, width, height, cell_size=CELL_SIZE):
+        """
+        :param entity.Planet planet: The target planet
+        :param list[entity.Planet] planets: All planets of the map, the target included
+        :param int width: Map width
+        :param int height: Map height
+        :param float cell_size: Spacing of the cells
+        """
+        self.planet_id = planet.id
+        self.owner = planet.owner.id if planet.owner is not None else None
+        self.cell_size = cell_size
+        xs = np.arange(int(math.ceil(width / cell_size)) + 1) * cell_size
+        ys = np.arange(int(math.ceil(height / cell_size)) + 1) * cell_size
+
+        def surface_distance(other):
+            dx = xs[None, :] - other.x
+            dy = ys[:, None] - other.y
+            return np.sqrt(dx * dx + dy * dy) - other.radius
+
+        free = np.ones((len(ys), len(xs)), dtype=bool)
+        solid = np.zeros((len(ys), len(xs)), dtype=bool)
+        for other in planets:
+            if other.id != planet.id:
+                to_other = surface_distance(other)
+                free &= to_other > CLEARANCE
+                solid |= to_other < 0
+        to_target = surface_distance(planet)
+        solid |= to_target < 0
+        free &= ~solid
+        ring = free & (to_target <= constants.DOCK_RADIUS)
+
+        distance = np.where(ring, 0.0, np.inf)
+        lengths = []
+        for dx, dy in _STEPS:
+            length = math.hypot(dx, dy) * cell_size
+            for cx, cy in _crossed(dx, dy):
+                length = np.where(self._shift(free, cx, cy, False), length, np.inf)
+            lengths.append(length)
+        while True:
+            relaxed = distance.copy()
+            for (dx, dy), length in zip(_STEPS, lengths):
+                np.minimum(relaxed, self._shift(distance, dx, dy) + length, out=relaxed)
+            relaxed[~free] = np.inf
+            if np.array_equal(relaxed, distance):
+                break
+            distance = relaxed
+        self.distance = distance
+
+        # Cells too close to a planet to fly through still point to their best free neighbor, to lead ships out
+        through = np.stack([self._shift(distance, dx, dy) + length for (dx, dy), length in zip(_STEPS, lengths)])
+        best = np.argmin(through, axis=0)
+        angles = np.array([math.degrees(math.atan2(dy, dx)) % 360 for dx, dy in _STEPS])
+        heading = ~solid & ~ring & np.isfinite(np.take_along_axis(through, best[None], axis=0)[0])
+        self.headings = np.where(heading, angles[best], np.nan)
+        # Plain lists are faster to index one value at a time than the arrays
+        self._headings = self.headings.tolist()
+        self._last_column = len(xs) - 1
+        self._last_row = len(ys) - 1
+
+    @staticmethod
+    def _shift(values, dx, dy, fill=np.inf):
+        """
+        :return: For every cell, the value of the cell (dx, dy) away from it, fill beyond the grid
+        :rtype: numpy.ndarray
+        """
+        shifted = np.full_like(values, fill)
+        rows, columns = values.shape
+        shifted[max(-dy, 0):rows - max(dy, 0), max(-dx, 0):columns - max(dx, 0)] = \
+            values[max(dy, 0):rows + min(dy, 0), max(dx, 0):columns + min(dx, 0)]
+        return shifted
+
+    def heading(self, x, y):
+        """
+        :param float x: x-coordinate of the point
+        :param float y: y-coordinate of the point
+        :return: Heading in degrees to fly from the cell of the point, None on the dock ring, inside a planet or
+            where the ring cannot be reached
+        :rtype: float
+        """
+        column = min(max(int(round(x / self.cell_size)), 0), self._last_column)
+        row = min(max(int(round(y / self.cell_size)), 0), self._last_row)
+        heading = self._headings[row][column]
+        return None if heading != heading else heading
+
+
+class FlowFields:
+    """
+    Size-bounded cache of the flow fields of a game, by target planet. The field of a planet is dropped when the
+    planet is destroyed, depleted or changes owner: it is not worth flying to the same way anymore.
+
+    :ivar size: Fields kept at most
+    :ivar computed: Number of fields computed so far
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        """
+        :param int size: Fields kept at most
+        """
+        self.size = size
+        self.computed = 0
+        self._fields = collections.OrderedDict()
+        self._game_map = None
+
+    def __contains__(self, planet_id):
+        return planet_id in self._fields
+
+    def __len__(self):
+        return len(self._fields)
+
+    def update(self, game_map):
+        """
+        Drop the fields of the planets that were destroyed, depleted or captured. Frames may be skipped.
+
+        :param game_map.Map game_map: The parsed frame
+        :return: nothing
+        """
+        self._game_map = game_map
+        for planet_id, field in list(self._fields.items()):
+            planet = game_map.get_planet(planet_id)
+            if planet is None or planet.remaining_resources <= 0 or \
+                    (planet.owner.id if planet.owner is not None else None) != field.owner:
+                del self._fields[planet_id]
+
+    def field(self, planet):
+        """
+        :param entity.Planet planet: Planet of the current frame
+        :return: The flow field toward the planet, computed on first use
+        :rtype: FlowField
+        """
+        field = self._fields.get(planet.id)
+        if field is not None:
+            self._fields.move_to_end(planet.id)
+            return field
+        field = FlowField(planet, self._game_map.all_planets(), self._game_map.width, self._game_map.height)
+        self.computed += 1
+        self._fields[planet.id] = field
+        if len(self._fields) > self.size:
+            self._fields.popitem(last=False)
+        return field
+
+    def heading(self, planet, position):
+        """
+        :param entity.Planet planet: Target planet of the current frame
+        :param entity.Entity position: Where the ship is (needs x, y attributes)
+        :return: Heading in degrees toward the dock ring of the planet, or None, see FlowField.heading
+        :rtype: float
+        """
+        return self.field(planet).heading(position.x, position.y)
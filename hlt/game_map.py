@@ -1,4 +1,12 @@
-from . import collision, entity
+import math
+
+import numpy as np
+
+from . import collision, columns, distance_field, entity, flow_field, neighbor_list, pathfinding, snapshot, \
+    spatial
+
+#: Entities sorted by the first step of Map.entities_by_distance, each further step sorts four times more
+NEAREST_CHUNK = 8
 
 
 class Map:
@@ -8,19 +16,44 @@ class Map:
     :ivar my_id: Current player id associated with the map
     :ivar width: Map width
     :ivar height: Map height
+    :ivar incremental: Whether players, ships and planets are updated in place across frames
+    :ivar spawned_ships: Ships that appeared in the last parsed frame
+    :ivar destroyed_ships: Ships that disappeared in the last parsed frame, as last seen
+    :ivar docking_changed_ships: Surviving ships whose docking status changed in the last parsed frame
+    :ivar owner_changed_planets: Surviving planets whose owner changed in the last parsed frame
+    :ivar destroyed_planets: Planets that disappeared in the last parsed frame, as last seen
     """
 
-    def __init__(self, my_id, width, height):
+    def __init__(self, my_id, width, height, incremental=False):
         """
         :param my_id: User's id (tag)
         :param width: Map width
         :param height: Map height
+        :param bool incremental: Keep the Player, Ship and Planet objects of entities that survive a frame and
+            update them in place, instead of building new objects for every frame.
         """
         self.my_id = my_id
         self.width = width
         self.height = height
+        self.incremental = incremental
         self._players = {}
         self._planets = {}
+        self._ships = {}
+        self._ship_columns = None
+        self._planet_columns = None
+        self._ship_grid = None
+        self._planet_grid = None
+        self._distance_matrix = None
+        self._neighbor_list = None
+        self._neighbor_list_stale = True
+        self._planet_field = None
+        self._visibility_graph = None
+        self._flow_fields = None
+        self._flow_fields_stale = True
+        self._snapshot = None
+        self._previous_snapshot = None
+        self._changes = ([], [], [], [], [])
+        self._changes_from = None
 
     def get_me(self):
         """
@@ -37,6 +70,14 @@ class Map:
         """
         return self._players.get(player_id)
 
+    def get_ship(self, ship_id):
+        """
+        :param int ship_id: The id of the desired ship, owned by any player
+        :return: The ship associated with ship_id
+        :rtype: entity.Ship
+        """
+        return self._ships.get(ship_id)
+
     def all_players(self):
         """
         :return: List of all players
@@ -59,6 +100,194 @@ class Map:
         """
         return list(self._planets.values())
 
+    def ship_columns(self):
+        """
+        Columnar view of all ships of the current frame, built on first use and cached until the next frame.
+
+        :return: Ship arrays in the order of _all_ships()
+        :rtype: columns.ShipColumns
+        """
+        if self._ship_columns is None:
+            self._ship_columns = columns.ShipColumns(self._all_ships())
+        return self._ship_columns
+
+    def planet_columns(self):
+        """
+        Columnar view of all planets of the current frame, built on first use and cached until the next frame.
+
+        :return: Planet arrays in the order of all_planets()
+        :rtype: columns.PlanetColumns
+        """
+        if self._planet_columns is None:
+            self._planet_columns = columns.PlanetColumns(self.all_planets())
+        return self._planet_columns
+
+    def ship_grid(self):
+        """
+        Spatial hash of all ships of the current frame, built on first use and cached until the next frame.
+
+        :return: Grid over the ships in the order of _all_ships()
+        :rtype: spatial.SpatialGrid
+        """
+        if self._ship_grid is None:
+            self._ship_grid = spatial.SpatialGrid(self._all_ships())
+        return self._ship_grid
+
+    def planet_grid(self):
+        """
+        Spatial hash of all planets of the current frame, built on first use and cached until the next frame.
+
+        :return: Grid over the planets in the order of all_planets()
+        :rtype: spatial.SpatialGrid
+        """
+        if self._planet_grid is None:
+            self._planet_grid = spatial.SpatialGrid(self.all_planets())
+        return self._planet_grid
+
+    def distance_matrix(self):
+        """
+        Distances between all ships and planets of the current frame, built on first use and cached until the
+        next frame. Once built, the distance queries of the map read from it.
+
+        :return: The distance matrix of the frame
+        :rtype: columns.DistanceMatrix
+        """
+        if self._distance_matrix is None:
+            self._distance_matrix = columns.DistanceMatrix(self.ship_columns(), self.planet_columns())
+        return self._distance_matrix
+
+    def distance(self, source, target):
+        """
+        Same value as source.calculate_distance_between(target), read from the distance matrix of the frame.
+
+        :param entity.Entity source: An entity or position
+        :param entity.Entity target: An entity or position
+        :return: The distance between the two
+        :rtype: float
+        """
+        return self.distance_matrix().between(source, target)
+
+    def _distances_from(self, source):
+        """
+        :param entity.Entity source: The entity or position to measure from
+        :return: Distances from the source to every ship and to every planet, from the distance matrix if it was
+            built in this frame
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        ships, planets = self.ship_columns(), self.planet_columns()
+        row = self._distance_matrix.from_entity(source) if self._distance_matrix is not None else None
+        if row is None:
+            return ships.distances_from(source), planets.distances_from(source)
+        return row[:len(ships)], row[len(ships):]
+
+    def neighbor_list(self):
+        """
+        Neighbor lists of the ships. Unlike the other views they are kept across the frames parsed into this map
+        and only patched where ships moved, spawned or died; they are brought up to date on first use in a frame.
+
+        :return: The neighbor lists of the current frame
+        :rtype: neighbor_list.NeighborList
+        """
+        if self._neighbor_list is None:
+            self._neighbor_list = neighbor_list.NeighborList()
+        if self._neighbor_list_stale:
+            self._neighbor_list.update(self)
+            self._neighbor_list_stale = False
+        return self._neighbor_list
+
+    def flow_fields(self):
+        """
+        Flow fields toward the planets. Like the neighbor lists they are kept across frames; on first use in a
+        frame the fields of the planets destroyed, depleted or captured since are dropped.
+
+        :return: The flow fields of the current frame
+        :rtype: flow_field.FlowFields
+        """
+        if self._flow_fields is None:
+            self._flow_fields = flow_field.FlowFields()
+        if self._flow_fields_stale:
+            self._flow_fields.update(self)
+            self._flow_fields_stale = False
+        return self._flow_fields
+
+    def planet_field(self):
+        """
+        Signed distance field of the planets. It is built on first use from the planets of that frame and kept for
+        the rest of the game: planets never move and never appear, so it stays a valid lower bound of the
+        clearance. Only opt-in navigation (utils.navigation.flow_nav) uses it, so bots that never call it do not
+        pay for building it.
+
+        :return: The distance field of the planets
+        :rtype: distance_field.PlanetDistanceField
+        """
+        if self._planet_field is None:
+            self._planet_field = distance_field.PlanetDistanceField(self.all_planets(), self.width, self.height)
+        return self._planet_field
+
+    def visibility_graph(self):
+        """
+        Waypoint graph around the planets, with its cache of routes. Like the planet distance field it is built on
+        first use from the planets of that frame and kept for the rest of the game. Only opt-in navigation
+        (utils.navigation.route_nav) uses it, so the first call of a bot that does pays for building it.
+
+        :return: The visibility graph of the planets
+        :rtype: pathfinding.VisibilityGraph
+        """
+        if self._visibility_graph is None:
+            self._visibility_graph = pathfinding.VisibilityGraph(self.all_planets(), self.width, self.height)
+        return self._visibility_graph
+
+    def _grids(self, kind):
+        """
+        :param type kind: entity.Ship, entity.Planet, or None for both
+        :return: The grids holding entities of that kind, ships first
+        :rtype: list[spatial.SpatialGrid]
+        """
+        if kind is None:
+            return [self.ship_grid(), self.planet_grid()]
+        return [self.ship_grid()] if issubclass(kind, entity.Ship) else [self.planet_grid()]
+
+    def entities_within(self, position, radius, kind=None, owner=None):
+        """
+        :param entity.Entity position: Center of the query
+        :param float radius: Reach of the query, from the center to the surface of the entities
+        :param type kind: Only return entity.Ship or entity.Planet (optional)
+        :param int owner: Only return entities of this player id, or spatial.UNOWNED ones (optional)
+        :return: Entities whose circle comes within radius of the position, ships first, the position excluded
+        :rtype: list[entity.Entity]
+        """
+        return [e for grid in self._grids(kind) for e in grid.within(position.x, position.y, radius, owner)
+                if e is not position]
+
+    def nearest_entity(self, position, kind=None, owner=None, max_distance=math.inf):
+        """
+        :param entity.Entity position: Center of the query
+        :param type kind: Only consider entity.Ship or entity.Planet (optional)
+        :param int owner: Only consider entities of this player id, or spatial.UNOWNED ones (optional)
+        :param float max_distance: Ignore entities whose center is farther than this
+        :return: The entity whose center is closest to the position, other than the position itself, or None
+        :rtype: entity.Entity
+        """
+        best, best_distance = None, math.inf
+        for grid in self._grids(kind):
+            found, distance = grid.nearest(position.x, position.y, owner, position, max_distance)
+            if distance < best_distance:
+                best, best_distance = found, distance
+        return best
+
+    def snapshot(self):
+        """
+        Capture an immutable copy of the current frame. Repeated calls within a frame return the same object.
+        If a snapshot was taken of the frame parsed just before, the records the change sets show unchanged are
+        taken from it instead of built again, so snapshotting every turn only builds records for what changed.
+
+        :return: Frozen copy of the current frame
+        :rtype: snapshot.MapSnapshot
+        """
+        if self._snapshot is None:
+            self._snapshot = snapshot.MapSnapshot.capture(self, self._previous_snapshot)
+        return self._snapshot
+
     def nearby_entities_by_distance(self, entity):
         """
         :param entity: The source entity to find distances from
@@ -66,12 +295,77 @@ class Map:
         :rtype: dict
         """
         result = {}
-        for foreign_entity in self._all_ships() + self.all_planets():
-            if entity == foreign_entity:
-                continue
-            result.setdefault(entity.calculate_distance_between(foreign_entity), []).append(foreign_entity)
+        for view, distances in zip((self.ship_columns(), self.planet_columns()), self._distances_from(entity)):
+            for foreign_entity, distance in zip(view.entities, distances.tolist()):
+                if entity == foreign_entity:
+                    continue
+                result.setdefault(distance, []).append(foreign_entity)
         return result
 
+    def entities_by_distance(self, source, kind=None, owner=None, docking_status=None, predicate=None,
+                             exclude_owner=None):
+        """
+        Iterate over the entities from the closest to the farthest. The distances are computed for the whole frame
+        at once, but the entities are only ordered as far as the caller iterates: the nearest ones are selected
+        and sorted in chunks that grow as the iteration goes on. Entities at the same distance are all yielded,
+        ships first, then in the order of _all_ships() and all_planets().
+
+        :param entity.Entity source: The entity or position to measure from, never yielded itself
+        :param type kind: Only yield entity.Ship or entity.Planet (optional)
+        :param int owner: Only yield entities of this player id, or spatial.UNOWNED ones (optional)
+        :param docking_status: Only yield ships in this entity.Ship.DockingStatus, or in one of a tuple of them
+            (optional, implies ships)
+        :param predicate: Only yield entities for which predicate(entity) is true, tested lazily (optional)
+        :param int exclude_owner: Skip the entities of this player id, e.g. to only get enemies (optional)
+        :return: Generator of (distance, entity)
+        :rtype: generator
+        """
+        views = []
+        ship_distances, planet_distances = self._distances_from(source)
+        if kind is None or issubclass(kind, entity.Ship):
+            views.append((self.ship_columns(), ship_distances))
+        if (kind is None or issubclass(kind, entity.Planet)) and docking_status is None:
+            views.append((self.planet_columns(), planet_distances))
+
+        lists, view_ids, rows, distances = [], [], [], []
+        for view, view_distances in views:
+            keep = np.ones(len(view), dtype=bool)
+            if owner is not None:
+                keep &= view.owned_by(owner)
+            if exclude_owner is not None:
+                keep &= ~view.owned_by(exclude_owner)
+            if docking_status is not None:
+                statuses = docking_status if isinstance(docking_status, tuple) else (docking_status,)
+                keep &= np.isin(view.docking_status, [status.value for status in statuses])
+            selected = np.flatnonzero(keep)
+            view_ids.append(np.full(len(selected), len(lists)))
+            lists.append(view.entities)
+            rows.append(selected)
+            distances.append(view_distances[selected])
+        if not lists:
+            return
+        view_ids, rows, distances = np.concatenate(view_ids), np.concatenate(rows), np.concatenate(distances)
+
+        remaining = np.arange(len(distances))
+        chunk = NEAREST_CHUNK
+        while len(remaining):
+            if len(remaining) > chunk:
+                # Everything up to the chunk-th smallest distance, ties included, so no tie is split between chunks
+                threshold = np.partition(distances[remaining], chunk - 1)[chunk - 1]
+                near = distances[remaining] <= threshold
+                batch, remaining = remaining[near], remaining[~near]
+            else:
+                batch, remaining = remaining, remaining[:0]
+            # The batch is in index order, which the stable sort keeps for equal distances
+            batch = batch[np.argsort(distances[batch], kind="stable")]
+            for view, row, distance in zip(view_ids[batch].tolist(), rows[batch].tolist(),
+                                           distances[batch].tolist()):
+                foreign_entity = lists[view][row]
+                if foreign_entity is source or (predicate is not None and not predicate(foreign_entity)):
+                    continue
+                yield distance, foreign_entity
+            chunk *= 4
+
     def _link(self):
         """
         Updates all the entities with the correct ship and planet objects
@@ -85,28 +379,117 @@ class Map:
         """
         Parse the map description from the game.
 
-        :param map_string: The string which the Halite engine outputs
+        :param str|bytes map_string: The string which the Halite engine outputs
         :return: nothing
         """
         tokens = map_string.split()
 
-        self._players, tokens = Player._parse(tokens)
-        self._planets, tokens = entity.Planet._parse(tokens)
-
-        assert(len(tokens) == 0)  # There should be no remaining tokens at this point
+        previous_ships = self._ships
+        previous_planets = self._planets
+        if self.incremental:
+            # Entities are updated in place, so remember the state the change sets compare against first
+            docking_statuses = {ship_id: ship.docking_status for ship_id, ship in previous_ships.items()}
+            planet_owners = {planet_id: planet.owner.id if planet.owner else None
+                             for planet_id, planet in previous_planets.items()}
+        else:
+            # The entities of the previous frame are left as they were: the change sets read them when asked for
+            docking_statuses = planet_owners = None
+
+        self._players, cursor = Player._parse(tokens, 0, self._players if self.incremental else None)
+        self._planets, cursor = entity.Planet._parse(tokens, cursor, previous_planets if self.incremental else None)
+
+        assert(cursor == len(tokens))  # There should be no remaining tokens at this point
+        self._ships = {ship.id: ship for player in self._players.values() for ship in player.all_ships()}
+        self._ship_columns = None
+        self._planet_columns = None
+        self._ship_grid = None
+        self._planet_grid = None
+        self._distance_matrix = None
+        self._neighbor_list_stale = True
+        self._flow_fields_stale = True
+        # Only the snapshot of the frame just before can share records through the change sets
+        self._previous_snapshot = self._snapshot
+        self._snapshot = None
+        self._changes = None
+        self._changes_from = (previous_ships, previous_planets, docking_statuses, planet_owners)
         self._link()
 
+    @property
+    def spawned_ships(self):
+        return self._change_sets()[0]
+
+    @property
+    def destroyed_ships(self):
+        return self._change_sets()[1]
+
+    @property
+    def docking_changed_ships(self):
+        return self._change_sets()[2]
+
+    @property
+    def owner_changed_planets(self):
+        return self._change_sets()[3]
+
+    @property
+    def destroyed_planets(self):
+        return self._change_sets()[4]
+
+    def _change_sets(self):
+        """
+        The change sets of the last parsed frame. They are collected on first use, so frames whose change sets
+        nobody reads do not pay for them.
+
+        :return: Spawned ships, destroyed ships, docking changed ships, owner changed planets, destroyed planets
+        :rtype: (list[entity.Ship], list[entity.Ship], list[entity.Ship], list[entity.Planet], list[entity.Planet])
+        """
+        if self._changes is None:
+            self._changes = self._collect_changes(*self._changes_from)
+            self._changes_from = None
+        return self._changes
+
+    def _collect_changes(self, previous_ships, previous_planets, docking_statuses=None, planet_owners=None):
+        """
+        Compare the current entities with the previous frame.
+
+        :param dict[int, entity.Ship] previous_ships: Ships of the previous frame keyed by id
+        :param dict[int, entity.Planet] previous_planets: Planets of the previous frame keyed by id
+        :param dict[int, entity.Ship.DockingStatus] docking_statuses: Previous docking status of every ship, read
+            from previous_ships if not given
+        :param dict[int, int] planet_owners: Previous owner id (or None) of every planet, read from
+            previous_planets if not given
+        :return: The change sets, see _change_sets
+        :rtype: tuple
+        """
+        if docking_statuses is None:
+            docking_statuses = {ship_id: ship.docking_status for ship_id, ship in previous_ships.items()}
+        if planet_owners is None:
+            planet_owners = {planet_id: planet.owner.id if planet.owner else None
+                             for planet_id, planet in previous_planets.items()}
+
+        spawned_ships = []
+        docking_changed_ships = []
+        for ship_id, ship in self._ships.items():
+            if ship_id not in docking_statuses:
+                spawned_ships.append(ship)
+            elif docking_statuses[ship_id] is not ship.docking_status:
+                docking_changed_ships.append(ship)
+        destroyed_ships = [ship for ship_id, ship in previous_ships.items() if ship_id not in self._ships]
+
+        owner_changed_planets = [planet for planet_id, planet in self._planets.items()
+                                 if planet_id in planet_owners and
+                                 planet_owners[planet_id] != (planet.owner.id if planet.owner else None)]
+        destroyed_planets = [planet for planet_id, planet in previous_planets.items()
+                             if planet_id not in self._planets]
+        return spawned_ships, destroyed_ships, docking_changed_ships, owner_changed_planets, destroyed_planets
+
     def _all_ships(self):
         """
         Helper function to extract all ships from all players
 
-        :return: List of ships
+        :return: List of ships, player by player
         :rtype: List[Ship]
         """
-        all_ships = []
-        for player in self.all_players():
-            all_ships.extend(player.all_ships())
-        return all_ships
+        return list(self._ships.values())
 
     def _intersects_entity(self, target):
         """
@@ -116,12 +499,15 @@ class Map:
         :return: The colliding entity if so, else None.
         :rtype: entity.Entity
         """
-        for celestial_object in self._all_ships() + self.all_planets():
-            if celestial_object is target:
-                continue
-            d = celestial_object.calculate_distance_between(target)
-            if d <= celestial_object.radius + target.radius + 0.1:
-                return celestial_object
+        for grid in (self.ship_grid(), self.planet_grid()):
+            reach = grid.max_radius + target.radius + 0.1
+            for index in grid.candidates(target.x - reach, target.y - reach, target.x + reach, target.y + reach):
+                celestial_object = grid.entities[index]
+                if celestial_object is target:
+                    continue
+                d = celestial_object.calculate_distance_between(target)
+                if d <= celestial_object.radius + target.radius + 0.1:
+                    return celestial_object
         return None
 
     def obstacles_between(self, ship, target, ignore=()):
@@ -135,15 +521,57 @@ class Map:
         :rtype: list[entity.Entity]
         """
         obstacles = []
-        entities = ([] if issubclass(entity.Planet, ignore) else self.all_planets()) \
-            + ([] if issubclass(entity.Ship, ignore) else self._all_ships())
-        for foreign_entity in entities:
-            if foreign_entity == ship or foreign_entity == target:
+        fudge = ship.radius + 0.1
+        for kind, grid in ((entity.Planet, self.planet_grid()), (entity.Ship, self.ship_grid())):
+            if issubclass(kind, ignore):
                 continue
-            if collision.intersect_segment_circle(ship, target, foreign_entity, fudge=ship.radius + 0.1):
-                obstacles.append(foreign_entity)
+            for index in grid.segment_candidates(ship.x, ship.y, target.x, target.y, fudge):
+                foreign_entity = grid.entities[index]
+                if foreign_entity == ship or foreign_entity == target:
+                    continue
+                if collision.intersect_segment_circle(ship, target, foreign_entity, fudge=fudge):
+                    obstacles.append(foreign_entity)
         return obstacles
 
+    def paths_blocked(self, ship, targets, ignore=()):
+        """
+        Check many straight-line paths of a ship at once, in a single batched intersection test.
+
+        :param entity.Ship ship: Source entity
+        :param list[entity.Entity] targets: Target entities
+        :param entity.Entity ignore: Which entity type to ignore
+        :return: For every target, whether obstacles_between(ship, target, ignore) would return any obstacle
+        :rtype: numpy.ndarray
+        """
+        fudge = ship.radius + 0.1
+        end_x = np.array([target.x for target in targets], dtype=np.float64)
+        end_y = np.array([target.y for target in targets], dtype=np.float64)
+        blocked = np.zeros(len(targets), dtype=bool)
+        if not targets:
+            return blocked
+        for kind, grid, view in ((entity.Planet, self.planet_grid(), self.planet_columns()),
+                                 (entity.Ship, self.ship_grid(), self.ship_columns())):
+            if issubclass(kind, ignore):
+                continue
+            reach = grid.max_radius + fudge
+            rows = [index for index in grid.candidates(min(ship.x, end_x.min()) - reach,
+                                                       min(ship.y, end_y.min()) - reach,
+                                                       max(ship.x, end_x.max()) + reach,
+                                                       max(ship.y, end_y.max()) + reach)
+                    if grid.entities[index] is not ship]
+            if not rows:
+                continue
+            hits, _ = collision.intersect_segments_circles(ship.x, ship.y, end_x, end_y, view.x[rows], view.y[rows],
+                                                           view.radius[rows], fudge=fudge)
+            # A target is never an obstacle of its own path
+            columns_of = {id(grid.entities[index]): column for column, index in enumerate(rows)}
+            for row, target in enumerate(targets):
+                column = columns_of.get(id(target))
+                if column is not None:
+                    hits[row, column] = False
+            blocked |= hits.any(axis=1)
+        return blocked
+
 
 class Player:
     """
@@ -173,37 +601,45 @@ class Player:
         return self._ships.get(ship_id)
 
     @staticmethod
-    def _parse_single(tokens):
+    def _parse_single(tokens, cursor, existing=None):
         """
         Parse one user given an input string from the Halite engine.
 
         :param list[str] tokens: The input string as a list of str from the Halite engine.
-        :return: The parsed player id, player object, and remaining tokens
-        :rtype: (int, Player, list[str])
-        """
-        player_id, *remainder = tokens
-        player_id = int(player_id)
-        ships, remainder = entity.Ship._parse(player_id, remainder)
-        player = Player(player_id, ships)
-        return player_id, player, remainder
+        :param int cursor: Index of the token holding the player id
+        :param dict[int, Player] existing: Players from the previous frame keyed by id. If the player is found
+            there, that object and its ships are updated in place.
+        :return: The parsed player id, player object, and the index of the first unused token
+        :rtype: (int, Player, int)
+        """
+        player_id = int(tokens[cursor])
+        player = existing.get(player_id) if existing else None
+        ships, cursor = entity.Ship._parse(player_id, tokens, cursor + 1, player._ships if player else None)
+        if player is None:
+            player = Player(player_id, ships)
+        else:
+            player._ships = ships
+        return player_id, player, cursor
 
     @staticmethod
-    def _parse(tokens):
+    def _parse(tokens, cursor, existing=None):
         """
         Parse an entire user input string from the Halite engine for all users.
 
         :param list[str] tokens: The input string as a list of str from the Halite engine.
-        :return: The parsed players in the form of player dict, and remaining tokens
-        :rtype: (dict, list[str])
+        :param int cursor: Index of the token holding the number of players
+        :param dict[int, Player] existing: Players from the previous frame to update in place (optional)
+        :return: The parsed players in the form of player dict, and the index of the first unused token
+        :rtype: (dict, int)
         """
-        num_players, *remainder = tokens
-        num_players = int(num_players)
+        num_players = int(tokens[cursor])
+        cursor += 1
         players = {}
 
         for _ in range(num_players):
-            player, players[player], remainder = Player._parse_single(remainder)
+            player, players[player], cursor = Player._parse_single(tokens, cursor, existing)
 
-        return players, remainder
+        return players, cursor
 
     def __str__(self):
         return "Player {} with ships {}".format(self.id, self.all_ships())
@@ -0,0 +1,194 @@
+"""
+Neighbor lists of the ships kept across frames (Verlet lists). Ships move at most MAX_SPEED per turn and planets
+never move, so the entities around a ship change slowly: every ship keeps the ships and planets within the cutoff
+plus a skin margin, and its lists are only recomputed once it has moved far enough for the skin to be used up.
+Spawned ships get their lists on arrival, destroyed ones are dropped from every list.
+"""
+
+import numpy as np
+
+from . import constants
+
+#: Largest surface-to-surface distance the lists answer for: the reach of a ship and an enemy over one turn
+CUTOFF = 2 * constants.MAX_SPEED + constants.WEAPON_RADIUS
+#: Extra distance kept in the lists
+SKIN = 2 * constants.MAX_SPEED
+#: Rows of the distance block computed at once when lists are recomputed
+_BLOCK = 256
+
+
+class NeighborList:
+    """
+    The lists hold ship and planet ids and are symmetric: a ship is in the list of every ship and planet of its
+    own lists. Distances are between surfaces (center distance minus both radii).
+
+    A ship's lists are recomputed when it moved more than a quarter of the skin since they last were. Two entities
+    whose pair was last evaluated at distance d then are still more than d - skin apart, so the lists always hold
+    every pair within the cutoff.
+
+    :ivar cutoff: Largest distance the lists are complete for
+    :ivar skin: Extra distance kept in the lists
+    :ivar refreshed: Number of ships whose lists were recomputed by the last update
+    """
+
+    def __init__(self, cutoff=CUTOFF, skin=SKIN):
+        """
+        :param float cutoff: Largest distance the lists must be complete for
+        :param float skin: Extra distance kept in the lists; larger means fewer but bigger recomputations
+        """
+        self.cutoff = cutoff
+        self.skin = skin
+        self.refreshed = 0
+        self._game_map = None
+        self._ship_ships = {}
+        self._ship_planets = {}
+        self._planet_ships = {}
+        # Position of every ship when its lists were last computed, indexed by ship id, NaN if never
+        self._ref_x = np.full(0, np.nan)
+        self._ref_y = np.full(0, np.nan)
+
+    def __contains__(self, ship_id):
+        return ship_id in self._ship_ships
+
+    def update(self, game_map):
+        """
+        Bring the lists up to date with a frame. Frames may be skipped.
+
+        :param game_map.Map game_map: The parsed frame
+        :return: nothing
+        """
+        self._game_map = game_map
+        ships = game_map.ship_columns()
+        planets = game_map.planet_columns()
+        ids = ships.id
+        self._drop_destroyed(set(ids.tolist()), set(planets.id.tolist()))
+
+        if len(ids) and ids.max() >= len(self._ref_x):
+            size = max(2 * len(self._ref_x), int(ids.max()) + 1)
+            self._ref_x = np.concatenate([self._ref_x, np.full(size - len(self._ref_x), np.nan)])
+            self._ref_y = np.concatenate([self._ref_y, np.full(size - len(self._ref_y), np.nan)])
+        dx = ships.x - self._ref_x[ids]
+        dy = ships.y - self._ref_y[ids]
+        limit = self.skin / 4
+        # New ships have a NaN reference, which fails the comparison too
+        stale = np.flatnonzero(~(dx * dx + dy * dy <= limit * limit))
+        self.refreshed = len(stale)
+        for ship_id in ids[stale].tolist():
+            self._ship_ships.setdefault(ship_id, set())
+            self._ship_planets.setdefault(ship_id, set())
+        for planet_id in planets.id.tolist():
+            self._planet_ships.setdefault(planet_id, set())
+
+        reach = self.cutoff + self.skin
+        for start in range(0, len(stale), _BLOCK):
+            rows = stale[start:start + _BLOCK]
+            near_ships = self._within(ships, rows, ships, reach)
+            near_ships[np.arange(len(rows)), rows] = False
+            near_planets = self._within(ships, rows, planets, reach)
+            for ship_id, ship_row, planet_row in zip(ids[rows].tolist(), near_ships, near_planets):
+                self._relink(ship_id, set(ids[ship_row].tolist()), self._ship_ships, self._ship_ships)
+                self._relink(ship_id, set(planets.id[planet_row].tolist()), self._ship_planets, self._planet_ships)
+        self._ref_x[ids[stale]] = ships.x[stale]
+        self._ref_y[ids[stale]] = ships.y[stale]
+
+    @staticmethod
+    def _within(ships, rows, others, reach):
+        """
+        :return: Boolean matrix of the given ship rows against every row of others, True within reach
+        :rtype: numpy.ndarray
+        """
+        dx = others.x[None, :] - ships.x[rows, None]
+        dy = others.y[None, :] - ships.y[rows, None]
+        return np.sqrt(dx * dx + dy * dy) - ships.radius[rows, None] - others.radius[None, :] <= reach
+
+    @staticmethod
+    def _relink(ship_id, current, lists, reverse):
+        """
+        Replace the list of a ship and patch the lists pointing back at it.
+
+        :return: nothing
+        """
+        previous = lists[ship_id]
+        for other in previous - current:
+            reverse[other].discard(ship_id)
+        for other in current - previous:
+            reverse[other].add(ship_id)
+        lists[ship_id] = current
+
+    def _drop_destroyed(self, ship_ids, planet_ids):
+        """
+        Remove the ships and planets that are not part of the frame anymore.
+
+        :return: nothing
+        """
+        for ship_id in self._ship_ships.keys() - ship_ids:
+            for other in self._ship_ships.pop(ship_id):
+                self._ship_ships[other].discard(ship_id)
+            for planet_id in self._ship_planets.pop(ship_id):
+                self._planet_ships[planet_id].discard(ship_id)
+            self._ref_x[ship_id] = self._ref_y[ship_id] = np.nan
+        for planet_id in self._planet_ships.keys() - planet_ids:
+            for ship_id in self._planet_ships.pop(planet_id):
+                self._ship_planets[ship_id].discard(planet_id)
+
+    def _ships(self, ship_ids, source, gap, owner):
+        """
+        :return: The ships of the current frame among ship_ids, in the order of Map._all_ships(), filtered
+        :rtype: list[entity.Ship]
+        """
+        if gap is not None and gap > self.cutoff:
+            raise ValueError("Neighbor lists only cover a distance of {}, got {}".format(self.cutoff, gap))
+        rows = self._game_map.ship_columns().rows
+        ships = [self._game_map.get_ship(ship_id) for ship_id in sorted(ship_ids, key=rows.__getitem__)]
+        if owner is not None:
+            ships = [ship for ship in ships if ship.owner.id == owner]
+        if gap is not None:
+            ships = [ship for ship in ships
+                     if ship.calculate_distance_between(source) - ship.radius - source.radius <= gap]
+        return ships
+
+    def ships_near(self, ship, gap=None, owner=None):
+        """
+        :param entity.Ship ship: Ship of the current frame
+        :param float gap: Only return ships whose surface is within gap of the ship's (at most cutoff). By default
+            the whole list is returned: a superset of the ships within cutoff.
+        :param int owner: Only return ships of this player id (optional)
+        :return: The neighbor ships in the order of Map._all_ships(), or None if the ship is unknown
+        :rtype: list[entity.Ship]
+        """
+        if ship.id not in self._ship_ships:
+            return None
+        return self._ships(self._ship_ships[ship.id], ship, gap, owner)
+
+    def planets_near(self, ship, gap=None):
+        """
+        :param entity.Ship ship: Ship of the current frame
+        :param float gap: Only return planets whose surface is within gap of the ship's (at most cutoff). By
+            default the whole list is returned: a superset of the planets within cutoff.
+        :return: The neighbor planets in the order of Map.all_planets(), or None if the ship is unknown
+        :rtype: list[entity.Planet]
+        """
+        if ship.id not in self._ship_planets:
+            return None
+        if gap is not None and gap > self.cutoff:
+            raise ValueError("Neighbor lists only cover a distance of {}, got {}".format(self.cutoff, gap))
+        rows = self._game_map.planet_columns().rows
+        planets = [self._game_map.get_planet(planet_id)
+                   for planet_id in sorted(self._ship_planets[ship.id], key=rows.__getitem__)]
+        if gap is not None:
+            planets = [planet for planet in planets
+                       if planet.calculate_distance_between(ship) - planet.radius - ship.radius <= gap]
+        return planets
+
+    def ships_near_planet(self, planet, gap=None, owner=None):
+        """
+        :param entity.Planet planet: Planet of the current frame
+        :param float gap: Only return ships whose surface is within gap of the planet's (at most cutoff). By
+            default the whole list is returned: a superset of the ships within cutoff.
+        :param int owner: Only return ships of this player id (optional)
+        :return: The ships around the planet in the order of Map._all_ships(), or None if the planet is unknown
+        :rtype: list[entity.Ship]
+        """
+        if planet.id not in self._planet_ships:
+            return None
+        return self._ships(self._planet_ships[planet.id], planet, gap, owner)
@@ -1,14 +1,15 @@
 import sys
 import logging
-import copy
 
-from . import game_map
+from . import game_map, replay
 
 
 class Game:
     """
     :ivar map: Current map representation
     :ivar initial_map: The initial version of the map before game starts
+    :ivar initial_snapshot: Frozen snapshot of the initial map, see :class:`snapshot.MapSnapshot`
+    :ivar binary: Whether frames are read and commands written as raw bytes
     """
     @staticmethod
     def _send_string(s):
@@ -42,13 +43,57 @@ class Game:
         return result
 
     @staticmethod
-    def send_command_queue(command_queue):
+    def _send_bytes(data):
         """
-        Issue the given list of commands.
+        Send a complete, newline terminated message to the game with a single write and flush it.
+
+        :param bytes data: Bytes to send
+        :return: nothing
+        """
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    @staticmethod
+    def _get_bytes():
+        """
+        Read input from the game without decoding it. The tokens of the returned line can be fed to the
+        parser directly, int() and float() accept bytes.
+
+        :return: The input read from the Halite engine
+        :rtype: bytes
+        """
+        return sys.stdin.buffer.readline().rstrip(b'\n')
+
+    def _read(self):
+        """
+        Read one line from the game using the transport chosen at construction.
+
+        :return: The input read from the Halite engine
+        :rtype: str or bytes
+        """
+        line = Game._get_bytes() if self.binary else Game._get_string()
+        if self._recorder is not None and line:  # An empty line means the engine closed the pipe
+            self._recorder.write_engine(line if self.binary else line.encode("ascii"))
+        return line
+
+    def send_command_queue(self, command_queue):
+        """
+        Issue the given list of commands. Unlike in the starter kit this is an instance method, not a static one:
+        the transport is chosen per Game, so call it on the instance, game.send_command_queue(...).
 
         :param list[str] command_queue: List of commands to send the Halite engine
         :return: nothing
         """
+        if self.binary:
+            # Encode the whole turn into one exactly sized buffer and hand it to the OS in one call
+            data = "".join(command_queue).encode("ascii")
+            if self._recorder is not None:
+                self._recorder.write_bot(data)
+            Game._send_bytes(data + b'\n')
+            return
+
+        if self._recorder is not None:
+            self._recorder.write_bot("".join(command_queue).encode("ascii"))
         for command in command_queue:
             Game._send_string(command)
 
@@ -67,20 +112,34 @@ class Game:
         logging.basicConfig(filename=log_file, level=logging.DEBUG, filemode='w')
         logging.info("Initialized bot {}".format(name))
 
-    def __init__(self, name):
+    def __init__(self, name, binary=False, incremental=False, record=None):
         """
         Initialize the bot with the given name.
 
         :param name: The name of the bot.
+        :param bool binary: Read frames from and write commands to the raw byte streams of stdin/stdout,
+            skipping str decoding and issuing a single write per turn.
+        :param bool incremental: Keep entity objects alive across turns and update them in place,
+            see :class:`game_map.Map`.
+        :param str record: If set, path of a replay file receiving every frame read and every command queue
+            sent, see :class:`replay.ReplayWriter`.
         """
         self._name = name
         self._send_name = False
-        tag = int(self._get_string())
+        self.binary = binary
+        self._recorder = replay.ReplayWriter(record) if record else None
+        tag = int(self._read())
         Game._set_up_logging(tag, name)
-        width, height = [int(x) for x in self._get_string().strip().split()]
-        self.map = game_map.Map(tag, width, height)
-        self.update_map()
-        self.initial_map = copy.deepcopy(self.map)
+        width, height = [int(x) for x in self._read().strip().split()]
+        self.map = game_map.Map(tag, width, height, incremental)
+        logging.info("---NEW TURN---")
+        frame = self._read()
+        self.map._parse(frame)
+        # The initial frame is parsed a second time into a map of its own, which later turns do not update: this is
+        # much cheaper than a deepcopy of the linked object graph
+        self.initial_map = game_map.Map(tag, width, height)
+        self.initial_map._parse(frame)
+        self.initial_snapshot = self.map.snapshot()
         self._send_name = True
 
     def update_map(self):
@@ -91,9 +150,8 @@ class Game:
         :rtype: game_map.Map
         """
         if self._send_name:
-            self._send_string(self._name)
-            self._done_sending()
+            self.send_command_queue([self._name])
             self._send_name = False
         logging.info("---NEW TURN---")
-        self.map._parse(self._get_string())
+        self.map._parse(self._read())
         return self.map
@@ -0,0 +1,197 @@
+"""
+Routes around the planets. Planets never move, so a visibility graph over waypoints placed around them is built
+once per game; a route from a ship to a target is then a shortest path in that graph, found with A*. Only the
+first leg of a route is meant to be flown with the local collision avoidance of the navigation functions.
+"""
+
+import collections
+import heapq
+import math
+
+import numpy as np
+
+from . import collision, constants, entity
+
+#: Distance kept from the planet surfaces by the routes: a ship plus the margin rush_nav keeps from planets
+CLEARANCE = constants.SHIP_RADIUS + 2
+#: Waypoints placed evenly around every planet
+WAYPOINTS_PER_PLANET = 12
+#: Side of the regions of the map routes are cached for: ships in one region share the routes to a target
+REGION_SIZE = 2 * constants.MAX_SPEED
+#: Routes kept in the cache, least recently used ones are dropped first
+CACHE_SIZE = 1024
+
+
+class VisibilityGraph:
+    """
+    Waypoints around the planets, linked when the straight line between them keeps clearance from every planet.
+    The waypoints of a planet form a polygon whose sides stay out of its inflated circle, so a route following
+    them goes around the planet.
+
+    :ivar clearance: Distance kept from the planet surfaces
+    :ivar x: x-coordinates of the waypoints
+    :ivar y: y-coordinates of the waypoints
+    :ivar neighbors: For every waypoint, the (waypoint, distance) pairs it is linked to
+    """
+
+    def __init__(self, planets, width, height, clearance=CLEARANCE, waypoints_per_planet=WAYPOINTS_PER_PLANET):
+        """
+        :param list[entity.Planet] planets: Planets to route around (needs x, y, radius attributes)
+        :param int width: Map width
+        :param int height: Map height
+        :param float clearance: Distance to keep from the planet surfaces
+        :param int waypoints_per_planet: Waypoints placed around every planet
+        """
+        self.clearance = clearance
+        self._planet_x = np.array([planet.x for planet in planets], dtype=np.float64)
+        self._planet_y = np.array([planet.y for planet in planets], dtype=np.float64)
+        self._planet_radius = np.array([planet.radius for planet in planets], dtype=np.float64)
+        self._routes = collections.OrderedDict()
+
+        # Vertices of a polygon whose sides are tangent to a circle slightly larger than the inflated planet
+        stretch = 1 / math.cos(math.pi / waypoints_per_planet)
+        angles = np.arange(waypoints_per_planet) * (2 * math.pi / waypoints_per_planet)
+        reach = (self._planet_radius + clearance) * stretch + 1e-3
+        x = (self._planet_x[:, None] + reach[:, None] * np.cos(angles)[None, :]).ravel()
+        y = (self._planet_y[:, None] + reach[:, None] * np.sin(angles)[None, :]).ravel()
+        usable = (x >= 0) & (x <= width) & (y >= 0) & (y <= height) & ~self._inside(x, y).any(axis=1)
+        self.x, self.y = x[usable], y[usable]
+
+        self.neighbors = [[] for _ in range(len(self.x))]
+        visible = self._visible(self.x, self.y, self.x, self.y)
+        np.fill_diagonal(visible, False)
+        lengths = np.hypot(self.x[:, None] - self.x[None, :], self.y[:, None] - self.y[None, :])
+        for source, destination in zip(*np.nonzero(visible)):
+            self.neighbors[source].append((int(destination), float(lengths[source, destination])))
+
+    def __len__(self):
+        return len(self.x)
+
+    def _inside(self, x, y):
+        """
+        :return: Boolean matrix of the points against the planets, True where the point is within clearance
+        :rtype: numpy.ndarray
+        """
+        dx = x[:, None] - self._planet_x[None, :]
+        dy = y[:, None] - self._planet_y[None, :]
+        return np.sqrt(dx * dx + dy * dy) <= self._planet_radius[None, :] + self.clearance
+
+    def _visible(self, start_x, start_y, end_x, end_y, skip=None):
+        """
+        :param numpy.ndarray skip: Planets to leave out of the test, per start point (optional)
+        :return: Boolean matrix of the start points against the end points, True where the segment between them
+            keeps clearance from the planets
+        :rtype: numpy.ndarray
+        """
+        visible = np.empty((len(start_x), len(end_x)), dtype=bool)
+        for row in range(len(start_x)):
+            hits, _ = collision.intersect_segments_circles(start_x[row], start_y[row], end_x, end_y,
+                                                           self._planet_x, self._planet_y, self._planet_radius,
+                                                           fudge=self.clearance)
+            if skip is not None:
+                hits &= ~skip[row][None, :]
+            visible[row] = ~hits.any(axis=1)
+        return visible
+
+    def route(self, start, target):
+        """
+        Shortest route from start to target that keeps clearance from the planets. Planets whose inflated circle
+        holds the start or the target are ignored for the legs from or to it, so a docked ship can leave and a
+        ship can reach a target close to a planet.
+
+        :param entity.Entity start: Where the route starts (needs x, y attributes)
+        :param entity.Entity target: Where the route goes (needs x, y attributes)
+        :return: The waypoints to fly through, ending with the target; None if the target cannot be reached
+        :rtype: list[entity.Position]
+        """
+        key = (int(start.x // REGION_SIZE), int(start.y // REGION_SIZE), round(target.x, 3), round(target.y, 3))
+        waypoints = self._routes.get(key)
+        if waypoints is not None:
+            self._routes.move_to_end(key)
+            # The route of another ship of the region only fits if its first leg is open from here too
+            if self._first_leg_open(start, waypoints, target):
+                return self._positions(waypoints, target)
+
+        waypoints = self._search(start, target)
+        if waypoints is None:
+            return None
+        self._routes[key] = waypoints
+        if len(self._routes) > CACHE_SIZE:
+            self._routes.popitem(last=False)
+        return self._positions(waypoints, target)
+
+    def _positions(self, waypoints, target):
+        return [entity.Position(float(self.x[node]), float(self.y[node])) for node in waypoints] + \
+            [entity.Position(target.x, target.y)]
+
+    def _first_leg_open(self, start, waypoints, target):
+        """
+        :return: Whether the straight line from start to the first waypoint of a route, or to the target if the
+            route has none, keeps clearance from the planets
+        :rtype: bool
+        """
+        start_x, start_y = np.array([start.x]), np.array([start.y])
+        skip = self._inside(start_x, start_y)
+        if waypoints:
+            end_x, end_y = self.x[waypoints[0]:waypoints[0] + 1], self.y[waypoints[0]:waypoints[0] + 1]
+        else:
+            end_x, end_y = np.array([target.x]), np.array([target.y])
+            skip = skip | self._inside(end_x, end_y)
+        return bool(self._visible(start_x, start_y, end_x, end_y, skip)[0, 0])
+
+    def _search(self, start, target):
+        """
+        A* over the waypoints, with the straight-line distance to the target as heuristic.
+
+        :return: The waypoints of the route, not including the target; None if there is no route
+        :rtype: list[int]
+        """
+        start_point = (np.array([start.x]), np.array([start.y]))
+        target_point = (np.array([target.x]), np.array([target.y]))
+        start_skip = self._inside(*start_point)
+        target_skip = self._inside(*target_point)
+        # Ignoring the planets around both ends for the direct leg
+        direct_skip = start_skip | target_skip
+        if self._visible(*start_point, *target_point, skip=direct_skip)[0, 0]:
+            return []
+        if not len(self.x):
+            return None
+
+        from_start = self._visible(*start_point, self.x, self.y, skip=start_skip)[0]
+        to_target = self._visible(*target_point, self.x, self.y, skip=target_skip)[0]
+        goal_cost = np.hypot(self.x - target.x, self.y - target.y)
+        heuristic = goal_cost.tolist()
+        to_target = to_target.tolist()
+
+        best = {}
+        previous = {}
+        frontier = []
+        for node in np.flatnonzero(from_start).tolist():
+            cost = math.hypot(self.x[node] - start.x, self.y[node] - start.y)
+            best[node] = cost
+            previous[node] = None
+            heapq.heappush(frontier, (cost + heuristic[node], cost, node))
+        best_total, best_last = math.inf, None
+        while frontier:
+            estimate, cost, node = heapq.heappop(frontier)
+            if estimate >= best_total:
+                break
+            if cost > best[node]:
+                continue
+            if to_target[node] and cost + heuristic[node] < best_total:
+                best_total, best_last = cost + heuristic[node], node
+            for neighbor, length in self.neighbors[node]:
+                candidate = cost + length
+                if candidate < best.get(neighbor, math.inf):
+                    best[neighbor] = candidate
+                    previous[neighbor] = node
+                    heapq.heappush(frontier, (candidate + heuristic[neighbor], candidate, neighbor))
+        if best_last is None:
+            return None
+        waypoints = []
+        node = best_last
+        while node is not None:
+            waypoints.append(node)
+            node = previous[node]
+        waypoints.reverse()
+        return waypoints
@@ -0,0 +1,209 @@
+"""
+Movement, collisions and combat of one Halite II turn, on compact arrays with one entry per living ship.
+
+These are the parts of the rules the local engine (engine.rules) and the bot-side forward model
+(utils.forward_model) share. Ships may belong to several games: every ship carries its game index, and the planet
+arrays have shape (games, planets). A single game is a batch of one.
+"""
+
+import numpy as np
+
+from . import constants
+
+#: Distance between ship centers at which two ships collide
+SHIP_COLLISION_RADIUS = 2 * constants.SHIP_RADIUS
+#: Distance between ship centers at which a ship can shoot another one
+ATTACK_RADIUS = constants.WEAPON_RADIUS + 2 * constants.SHIP_RADIUS
+#: Distance beyond which two ships cannot collide or fight during a turn, however they move
+INTERACTION_RADIUS = ATTACK_RADIUS + 2 * constants.MAX_SPEED
+
+
+def nearby_pairs(games, x, y, width, radius):
+    """
+    All pairs of ships of the same game closer than radius along both axes, by sweeping the ships sorted on x.
+    Games are laid side by side on the x-axis, far enough apart that ships of different games never pair.
+
+    :param numpy.ndarray games: Game index of every ship
+    :param numpy.ndarray x: x-coordinate of every ship
+    :param numpy.ndarray y: y-coordinate of every ship
+    :param int width: Map width
+    :param float radius: Reach of the pairs
+    :return: Two index arrays, first[k] < second[k] never being the same ship
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    count = len(x)
+    if count < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    key = x + games * (width + 2 * radius)
+    order = np.argsort(key, kind="stable")
+    ends = np.searchsorted(key[order], key[order] + radius, side="right")
+    counts = ends - np.arange(count) - 1
+    total = int(counts.sum())
+    starts = np.repeat(np.arange(count), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    first, second = order[starts], order[starts + 1 + offsets]
+    keep = np.abs(y[first] - y[second]) <= radius
+    return first[keep], second[keep]
+
+
+def contact_time(dx, dy, dvx, dvy, radius):
+    """
+    Earliest time t in [0, 1] at which two circles with relative position (dx, dy) and relative velocity
+    (dvx, dvy) are within radius of each other.
+
+    :return: Array of times, inf where they never get that close during the turn
+    :rtype: numpy.ndarray
+    """
+    return solve_contact(dvx * dvx + dvy * dvy, dx * dvx + dy * dvy, dx * dx + dy * dy, radius)
+
+
+def solve_contact(speed2, dot, distance2, radius):
+    """
+    Smallest root in [0, 1] of speed2 t^2 + 2 dot t + distance2 - radius^2 = 0, 0 if already within radius.
+    Split from contact_time so the terms can be shared between several radii.
+
+    :rtype: numpy.ndarray
+    """
+    c = distance2 - radius * radius
+    discriminant = dot * dot - speed2 * c
+    moving = speed2 > 0
+    t = (-dot - np.sqrt(np.maximum(discriminant, 0))) / np.where(moving, speed2, 1)
+    approaching = moving & (discriminant >= 0) & (t >= 0) & (t <= 1)
+    return np.where(c <= 0, 0.0, np.where(approaching, t, np.inf))
+
+
+def edge_time(position, velocity, size):
+    """
+    :return: Time at which a ship leaves the map along one axis, inf if it stays inside this turn
+    :rtype: numpy.ndarray
+    """
+    moving = velocity != 0
+    t = np.where(velocity > 0, size - position, -position) / np.where(moving, velocity, 1)
+    return np.where(moving & (t >= 0) & (t <= 1), t, np.inf)
+
+
+def resolve_collisions(planet_x, planet_y, planet_radius, planet_alive, width, height, games, x, y, vx, vy, health,
+                       first, second, t_pairs):
+    """
+    Continuous collision detection. Events are resolved in rounds: a ship whose earliest event is a planet or
+    the map edge dies then, and two ships whose earliest events are each other both die. Dead ships are
+    removed from later rounds, so a ship only collides with what is still there.
+
+    :param numpy.ndarray planet_x: (games, planets) planet x-coordinates, and the same for planet_y,
+        planet_radius and planet_alive
+    :param numpy.ndarray t_pairs: Contact time of the pairs (first, second) at SHIP_COLLISION_RADIUS
+    :return: Time of death of every ship (inf for survivors), and the (games, planets) collision damage taken by
+        every planet
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    count = len(x)
+    planet_damage = np.zeros(planet_alive.shape, dtype=np.int64)
+    dead_at = np.full(count, np.inf)
+    # Only moving ships can hit anything: ships of a valid state never overlap
+    moving = np.flatnonzero((vx != 0) | (vy != 0))
+    if not len(moving):
+        return dead_at, planet_damage
+
+    pdx = x[moving, None] - planet_x[games[moving]]
+    pdy = y[moving, None] - planet_y[games[moving]]
+    t_planets = contact_time(pdx, pdy, vx[moving, None], vy[moving, None],
+                             planet_radius[games[moving]] + constants.SHIP_RADIUS)
+    t_planets[~planet_alive[games[moving]]] = np.inf
+    planet = np.full(count, -1, dtype=np.int64)
+    t_planet = np.full(count, np.inf)
+    if t_planets.shape[1]:
+        planet[moving] = t_planets.argmin(axis=1)
+        t_planet[moving] = t_planets[np.arange(len(moving)), planet[moving]]
+    t_edge = np.full(count, np.inf)
+    t_edge[moving] = np.minimum(edge_time(x[moving], vx[moving], width), edge_time(y[moving], vy[moving], height))
+
+    # Directed pair lists of the ships that meet during the turn
+    hits = np.isfinite(t_pairs)
+    if not (hits.any() or np.isfinite(t_planet).any() or np.isfinite(t_edge).any()):
+        return dead_at, planet_damage
+    source = np.concatenate([first[hits], second[hits]])
+    target = np.concatenate([second[hits], first[hits]])
+    t_source = np.concatenate([t_pairs[hits], t_pairs[hits]])
+
+    active = np.ones(count, dtype=np.bool_)
+    while True:
+        live = active[source] & active[target]
+        t_ship = np.full(count, np.inf)
+        np.minimum.at(t_ship, source[live], t_source[live])
+        earliest = np.where(active, np.minimum(np.minimum(t_ship, t_planet), t_edge), np.inf)
+        pending = np.isfinite(earliest)
+        if not pending.any():
+            break
+
+        partner = np.full(count, count, dtype=np.int64)
+        candidates = live & (t_source == t_ship[source])
+        np.minimum.at(partner, source[candidates], target[candidates])
+        crash = pending & (t_planet == earliest)
+        out = pending & ~crash & (t_edge == earliest)
+        paired = np.flatnonzero(pending & ~crash & ~out & (t_ship == earliest))
+        mutual = paired[(partner[partner[paired]] == paired) & (earliest[partner[paired]] == earliest[paired])]
+        resolved = crash | out
+        resolved[mutual] = True
+        if not resolved.any():
+            break
+        dead_at[resolved] = earliest[resolved]
+        crashed = np.flatnonzero(crash)
+        np.add.at(planet_damage, (games[crashed], planet[crashed]), health[crashed])
+        active &= ~resolved
+    return dead_at, planet_damage
+
+
+def resolve_attacks(owner, can_fire, dead_at, first, second, dx, dy, dvx, dvy, t_range):
+    """
+    Every undocked ship without weapon cooldown fires once, at the first moment of the turn an enemy ship is in
+    range, splitting WEAPON_DAMAGE evenly between all enemies in range at that moment. Docked ships can be
+    shot but do not shoot.
+
+    :param numpy.ndarray t_range: Contact time of the pairs (first, second) at ATTACK_RADIUS
+    :return: Mask of the ships that fired, and the attack damage received by every ship
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    count = len(owner)
+    damage = np.zeros(count, dtype=np.int64)
+    fired = np.zeros(count, dtype=np.bool_)
+    enemies = np.flatnonzero(owner[first] != owner[second])
+    meet = (t_range[enemies] < dead_at[first[enemies]]) & (t_range[enemies] < dead_at[second[enemies]])
+    if not meet.any():
+        return fired, damage
+
+    # Directed (shooter, target) pairs of enemies; the relative position flips sign with the direction
+    first, second = first[enemies], second[enemies]
+    shooter = np.concatenate([first, second])
+    target = np.concatenate([second, first])
+    rx0, ry0 = np.concatenate([dx[enemies], -dx[enemies]]), np.concatenate([dy[enemies], -dy[enemies]])
+    rvx, rvy = np.concatenate([dvx[enemies], -dvx[enemies]]), np.concatenate([dvy[enemies], -dvy[enemies]])
+    valid = np.concatenate([meet, meet]) & can_fire[shooter]
+
+    t_fire = np.full(count, np.inf)
+    np.minimum.at(t_fire, shooter[valid], np.concatenate([t_range[enemies], t_range[enemies]])[valid])
+    fired = np.isfinite(t_fire)
+
+    candidates = fired[shooter]
+    t = np.where(candidates, t_fire[shooter], 0.0)
+    rx = rx0 + rvx * t
+    ry = ry0 + rvy * t
+    hit = candidates & (rx * rx + ry * ry <= ATTACK_RADIUS * ATTACK_RADIUS + 1e-9) & (dead_at[target] > t)
+    targets = np.bincount(shooter[hit], minlength=count)
+    per_target = constants.WEAPON_DAMAGE // np.maximum(targets, 1)
+    np.add.at(damage, target[hit], per_target[shooter[hit]])
+    return fired, damage
+
+
+def explosion_damage(surface, attached):
+    """
+    Damage dealt by an exploding planet: ships docked to it are destroyed, every other ship within
+    EXPLOSION_RADIUS of its surface takes damage decreasing linearly with the distance.
+
+    :param numpy.ndarray surface: Distance from every ship to the surface of the planet
+    :param numpy.ndarray attached: Mask of the ships docking, docked or undocking to the planet
+    :return: Damage of every ship, before capping it to the health of the ship
+    :rtype: numpy.ndarray
+    """
+    blast = np.clip(constants.MAX_SHIP_HEALTH * (1 - surface / constants.EXPLOSION_RADIUS),
+                    0, constants.MAX_SHIP_HEALTH).astype(np.int64)
+    return np.where(attached, constants.MAX_SHIP_HEALTH, blast)
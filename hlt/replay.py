@@ -0,0 +1,162 @@
+"""
+Compact binary recording of the raw engine <-> bot conversation.
+
+A replay file starts with MAGIC, followed by an append-only sequence of records. Each record is a 5 byte header
+(kind, payload length) and the payload: the exact bytes of one line read from or written to the engine, without
+its trailing newline. Lines are stored verbatim and uncompressed.
+
+The engine lines are the player tag, the map size and then one frame per turn (the first being the initial
+map). The bot lines are the replies: the bot name, then one command queue per turn. Reply i answers frame i.
+"""
+
+import mmap
+import os
+import struct
+
+from . import game_map
+
+MAGIC = b"HLT2REPLAY1\n"
+#: Record kind of a line sent by the engine
+ENGINE = 0
+#: Record kind of a line sent by the bot
+BOT = 1
+
+_HEADER = struct.Struct("<BI")
+
+
+class ReplayWriter:
+    """
+    Buffered, append-only writer of a replay file. Recording a line costs one small header pack and two writes
+    into the file buffer. The buffer is flushed after every reply of the bot, so a turn costs a single write call
+    and the file is complete up to the last reply sent: engines end bots with SIGKILL, which leaves no chance to
+    flush at exit.
+    """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        """
+        :param str path: Replay file to create (truncated if it exists)
+        :param int buffer_size: Size of the write buffer in bytes, enough for the largest frame and reply
+        """
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._file.write(MAGIC)
+
+    def write_engine(self, line):
+        """
+        Record a line read from the engine.
+
+        :param bytes line: The line, without trailing newline
+        :return: nothing
+        """
+        self._write(ENGINE, line)
+
+    def write_bot(self, line):
+        """
+        Record a line sent to the engine and flush the turn to the file. Call it before sending the line, so
+        the recording holds every reply the engine got.
+
+        :param bytes line: The line, without trailing newline
+        :return: nothing
+        """
+        self._write(BOT, line)
+        self._file.flush()
+
+    def _write(self, kind, line):
+        self._file.write(_HEADER.pack(kind, len(line)))
+        self._file.write(line)
+
+    def close(self):
+        """
+        Flush and close the file. Safe to call more than once.
+
+        :return: nothing
+        """
+        if not self._file.closed:
+            self._file.close()
+
+
+class ReplayReader:
+    """
+    Random access reader of a replay file. The file is memory-mapped and only the 5 byte record headers are
+    visited when it is opened, so reading any turn costs the same no matter how many turns come before it.
+
+    :ivar tag: The recorded player tag, None if the recording stops before it
+    :ivar width: Map width, None if the recording stops before it
+    :ivar height: Map height, None if the recording stops before it
+    """
+
+    def __init__(self, path):
+        """
+        :param str path: Replay file written by ReplayWriter
+        """
+        with open(path, "rb") as f:
+            # mmap refuses empty files. A bot killed before its first reply leaves one: it is an empty replay.
+            empty = os.fstat(f.fileno()).st_size == 0
+            self._buffer = b"" if empty else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not empty and self._buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a replay file".format(path))
+
+        self._lines = ([], [])
+        offset = len(MAGIC)
+        end = len(self._buffer)
+        while offset + _HEADER.size <= end:
+            kind, length = _HEADER.unpack_from(self._buffer, offset)
+            offset += _HEADER.size
+            if offset + length > end:
+                break  # Truncated tail of a recording that was not closed cleanly
+            self._lines[kind].append((offset, length))
+            offset += length
+
+        self.tag = self.width = self.height = None
+        if len(self._lines[ENGINE]) >= 2:
+            self.tag = int(self._line(ENGINE, 0))
+            self.width, self.height = [int(x) for x in self._line(ENGINE, 1).split()]
+
+    def _line(self, kind, index):
+        offset, length = self._lines[kind][index]
+        return self._buffer[offset:offset + length]
+
+    def __len__(self):
+        """
+        :return: Number of recorded frames, including the initial map
+        :rtype: int
+        """
+        return max(len(self._lines[ENGINE]) - 2, 0)
+
+    def frame(self, index):
+        """
+        :param int index: Frame number, 0 being the initial map
+        :return: The raw frame as sent by the engine
+        :rtype: bytes
+        """
+        return self._line(ENGINE, index + 2)
+
+    def reply(self, index):
+        """
+        :param int index: Frame number the reply answers; reply 0 is the bot name
+        :return: The raw line the bot sent back, or None if the recording stops before it
+        :rtype: bytes
+        """
+        if index >= len(self._lines[BOT]):
+            return None
+        return self._line(BOT, index)
+
+    def map(self, index, incremental=False):
+        """
+        Parse a recorded frame.
+
+        :param int index: Frame number, 0 being the initial map
+        :param bool incremental: Passed on to the created map
+        :rtype: game_map.Map
+        """
+        parsed = game_map.Map(self.tag, self.width, self.height, incremental)
+        parsed._parse(self.frame(index))
+        return parsed
+
+    def close(self):
+        """
+        Unmap the file.
+
+        :return: nothing
+        """
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
@@ -0,0 +1,221 @@
+from collections import namedtuple
+
+from . import entity
+
+
+class _RecordMixin:
+    """
+    Read-only geometry helpers shared with entity.Entity, so records can be passed to the geometry methods of the
+    entities. Records are not entities: they hold the ids of their owner and planet instead of the objects.
+    """
+    __slots__ = ()
+
+    calculate_distance_between = entity.Entity.calculate_distance_between
+    calculate_angle_between = entity.Entity.calculate_angle_between
+    closest_point_to = entity.Entity.closest_point_to
+
+
+class PlanetRecord(_RecordMixin, namedtuple("PlanetRecord", [
+        "id", "x", "y", "radius", "health", "owner_id", "num_docking_spots",
+        "current_production", "remaining_resources", "docked_ship_ids"])):
+    """
+    Frozen state of a planet. Unlike entity.Planet it holds the id of its owner, not the player.
+
+    :ivar owner_id: The id of the owning player, None if not owned
+    :ivar tuple[int] docked_ship_ids: Ids of the ships docked to the planet
+    """
+    __slots__ = ()
+
+    @classmethod
+    def capture(cls, planet):
+        """
+        :param entity.Planet planet: A linked planet
+        :rtype: PlanetRecord
+        """
+        return cls(planet.id, planet.x, planet.y, planet.radius, planet.health,
+                   planet.owner.id if planet.owner is not None else None,
+                   planet.num_docking_spots, planet.current_production, planet.remaining_resources,
+                   tuple(planet._docked_ship_ids))
+
+    def is_owned(self):
+        return self.owner_id is not None
+
+    def is_full(self):
+        return len(self.docked_ship_ids) >= self.num_docking_spots
+
+
+class ShipRecord(_RecordMixin, namedtuple("ShipRecord", [
+        "id", "x", "y", "radius", "health", "owner_id", "docking_status", "planet_id",
+        "docking_progress", "weapon_cooldown"])):
+    """
+    Frozen state of a ship. Unlike entity.Ship it holds the ids of its owner and planet, not the objects.
+
+    :ivar owner_id: The id of the owning player
+    :ivar planet_id: The id of the planet the ship is docked to, None if undocked
+    """
+    __slots__ = ()
+
+    DockingStatus = entity.Ship.DockingStatus
+
+    @classmethod
+    def capture(cls, ship):
+        """
+        :param entity.Ship ship: A linked ship
+        :rtype: ShipRecord
+        """
+        return cls(ship.id, ship.x, ship.y, ship.radius, ship.health,
+                   ship.owner.id if ship.owner is not None else None,
+                   ship.docking_status,
+                   ship.planet.id if ship.planet is not None else None,
+                   ship._docking_progress, ship._weapon_cooldown)
+
+
+class PlayerRecord(namedtuple("PlayerRecord", ["id", "ships"])):
+    """
+    Frozen state of a player.
+
+    :ivar tuple[ShipRecord] ships: The player's ships in engine order
+    """
+    __slots__ = ()
+
+    def all_ships(self):
+        return list(self.ships)
+
+    def get_ship(self, ship_id):
+        for ship in self.ships:
+            if ship.id == ship_id:
+                return ship
+        return None
+
+
+class MapSnapshot:
+    """
+    Immutable copy of one frame of a game_map.Map, exposing the same read-only queries. Entities are frozen
+    records referring to each other by id, so a snapshot holds no reference back into the live map, and
+    snapshots of consecutive frames share the records of the entities that did not change.
+
+    :ivar my_id: Current player id associated with the map
+    :ivar width: Map width
+    :ivar height: Map height
+    """
+
+    def __init__(self, my_id, width, height, players, planets):
+        """
+        :param int my_id: User's id (tag)
+        :param int width: Map width
+        :param int height: Map height
+        :param dict[int, PlayerRecord] players: Players keyed by id
+        :param dict[int, PlanetRecord] planets: Planets keyed by id
+        """
+        self.my_id = my_id
+        self.width = width
+        self.height = height
+        self._players = players
+        self._planets = planets
+        self._ships = {ship.id: ship for player in players.values() for ship in player.ships}
+
+    @classmethod
+    def capture(cls, game_map, previous=None):
+        """
+        Snapshot the current frame of a map.
+
+        :param game_map.Map game_map: The live map
+        :param MapSnapshot previous: Snapshot of the frame parsed just before by the same map. The records of the
+            entities that the change sets of the map and the rules show unchanged are taken from it, see
+            _shared_ship and _shared_planet. Every record is built anew without it.
+        :rtype: MapSnapshot
+        """
+        if previous is None:
+            previous_ships, previous_planets, docking_changed, owner_changed = {}, {}, (), ()
+        else:
+            previous_ships, previous_planets = previous._ships, previous._planets
+            docking_changed = {ship.id for ship in game_map.docking_changed_ships}
+            owner_changed = {planet.id for planet in game_map.owner_changed_planets}
+
+        players = {}
+        for player in game_map.all_players():
+            ships = tuple(_shared_ship(ship, previous_ships, docking_changed) or ShipRecord.capture(ship)
+                          for ship in player.all_ships())
+            players[player.id] = PlayerRecord(player.id, ships)
+        planets = {planet.id: _shared_planet(planet, previous_planets, owner_changed) or PlanetRecord.capture(planet)
+                   for planet in game_map.all_planets()}
+        return cls(game_map.my_id, game_map.width, game_map.height, players, planets)
+
+    def get_me(self):
+        """
+        :rtype: PlayerRecord
+        """
+        return self._players.get(self.my_id)
+
+    def get_player(self, player_id):
+        """
+        :rtype: PlayerRecord
+        """
+        return self._players.get(player_id)
+
+    def all_players(self):
+        """
+        :rtype: list[PlayerRecord]
+        """
+        return list(self._players.values())
+
+    def get_planet(self, planet_id):
+        """
+        :rtype: PlanetRecord
+        """
+        return self._planets.get(planet_id)
+
+    def all_planets(self):
+        """
+        :rtype: list[PlanetRecord]
+        """
+        return list(self._planets.values())
+
+    def get_ship(self, ship_id):
+        """
+        :rtype: ShipRecord
+        """
+        return self._ships.get(ship_id)
+
+    def _all_ships(self):
+        """
+        :rtype: list[ShipRecord]
+        """
+        return list(self._ships.values())
+
+
+def _shared_ship(ship, previous, docking_changed):
+    """
+    A ship that stayed docked cannot move, change planet or owner: its record of the previous frame still holds
+    unless its health, docking progress or weapon cooldown changed.
+
+    :param entity.Ship ship: A ship of the current frame
+    :param dict[int, ShipRecord] previous: Ship records of the previous frame keyed by id
+    :param set[int] docking_changed: Ids of the ships whose docking status changed since the previous frame
+    :return: The record of the previous frame if it still holds, else None
+    :rtype: ShipRecord
+    """
+    if ship.docking_status is not entity.Ship.DockingStatus.DOCKED or ship.id in docking_changed:
+        return None
+    old = previous.get(ship.id)
+    if old is not None and old.health == ship.health and old.docking_progress == ship._docking_progress and \
+            old.weapon_cooldown == ship._weapon_cooldown:
+        return old
+    return None
+
+
+def _shared_planet(planet, previous, owner_changed):
+    """
+    A planet that stayed unowned neither produces nor has docked ships: its record of the previous frame still
+    holds unless a ship crashed into it.
+
+    :param entity.Planet planet: A planet of the current frame
+    :param dict[int, PlanetRecord] previous: Planet records of the previous frame keyed by id
+    :param set[int] owner_changed: Ids of the planets whose owner changed since the previous frame
+    :return: The record of the previous frame if it still holds, else None
+    :rtype: PlanetRecord
+    """
+    if planet.owner is not None or planet.id in owner_changed:
+        return None
+    old = previous.get(planet.id)
+    return old if old is not None and old.health == planet.health else None
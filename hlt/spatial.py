@@ -0,0 +1,223 @@
+"""
+Uniform grid hash over the entities of one frame, so that range, nearest and obstacle queries only look at the
+entities around the query instead of scanning every ship and planet of the map.
+"""
+
+import math
+
+from . import constants
+
+#: Side of a grid cell. A ship crosses at most one cell per turn, and its weapon reaches into the cells around it.
+CELL_SIZE = constants.MAX_SPEED
+#: Owner filter value selecting entities without an owner
+UNOWNED = -1
+#: Margin added to the reach of segment queries, against rounding in the row spans and the line test
+_SLACK = 1e-6
+
+
+class SpatialGrid:
+    """
+    Entities bucketed by the grid cell holding their center. A query widens its area by the largest radius of
+    the indexed entities and visits the cells overlapping it; results are returned in the order the entities were
+    given, so they match a linear scan of that list.
+
+    :ivar entities: The indexed entities, in the order they were given
+    :ivar cell_size: Side of a cell
+    :ivar max_radius: Largest radius of an indexed entity
+    """
+
+    def __init__(self, entities, cell_size=CELL_SIZE):
+        """
+        :param list[entity.Entity] entities: Entities of the frame, with their owners linked
+        :param float cell_size: Side of a cell
+        """
+        self.entities = entities
+        self.cell_size = cell_size
+        self.max_radius = max((e.radius for e in entities), default=0.0)
+        self._owners = [UNOWNED if e.owner is None else getattr(e.owner, "id", e.owner) for e in entities]
+        self._cells = {}
+        for index, e in enumerate(entities):
+            self._cells.setdefault((int(e.x // cell_size), int(e.y // cell_size)), []).append(index)
+        columns = [cx for cx, _ in self._cells] or [0]
+        rows = [cy for _, cy in self._cells] or [0]
+        self._bounds = (min(columns), min(rows), max(columns), max(rows))
+
+    def candidates(self, x_min, y_min, x_max, y_max, owner=None):
+        """
+        Entities whose center lies in a cell overlapping the box: a superset of the entities whose center is in
+        the box, for the caller to test exactly.
+
+        :param float x_min: Left of the box
+        :param float y_min: Top of the box
+        :param float x_max: Right of the box
+        :param float y_max: Bottom of the box
+        :param int owner: Only keep entities of this player id, or UNOWNED ones (optional)
+        :return: Indices in entities, ascending
+        :rtype: list[int]
+        """
+        size = self.cell_size
+        first_column, first_row, last_column, last_row = self._bounds
+        first_column, first_row = max(int(x_min // size), first_column), max(int(y_min // size), first_row)
+        last_column, last_row = min(int(x_max // size), last_column), min(int(y_max // size), last_row)
+        found = []
+        if (last_column - first_column + 1) * (last_row - first_row + 1) > len(self._cells):
+            # A box wider than the occupied cells: walk the occupied ones instead
+            for (cx, cy), bucket in self._cells.items():
+                if first_column <= cx <= last_column and first_row <= cy <= last_row:
+                    found.extend(bucket)
+        else:
+            cells = self._cells
+            for cx in range(first_column, last_column + 1):
+                for cy in range(first_row, last_row + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket:
+                        found.extend(bucket)
+        if owner is not None:
+            owners = self._owners
+            found = [index for index in found if owners[index] == owner]
+        found.sort()
+        return found
+
+    def segment_candidates(self, x0, y0, x1, y1, padding, owner=None):
+        """
+        Entities whose circle, grown by padding, may touch a segment: a superset of them, for the caller to test
+        exactly. The capsule of the segment is walked one row of cells at a time, and in every row only the span
+        of cells it covers there is visited, so a long diagonal segment costs the cells along it instead of its
+        whole bounding box. The entities found are then checked against the line of the segment, which is cheap
+        and rejects most of the entities of the crossed cells.
+
+        :param float x0: Start of the segment
+        :param float y0: Start of the segment
+        :param float x1: End of the segment
+        :param float y1: End of the segment
+        :param float padding: Distance added to the radius of every entity
+        :param int owner: Only keep entities of this player id, or UNOWNED ones (optional)
+        :return: Indices in entities, ascending
+        :rtype: list[int]
+        """
+        size = self.cell_size
+        reach = self.max_radius + padding + _SLACK
+        dx, dy = x1 - x0, y1 - y0
+        length2 = dx * dx + dy * dy
+        box = (abs(dx) + 2 * reach + size) * (abs(dy) + 2 * reach + size) / (size * size)
+        capsule = (math.sqrt(length2) / size + 2) * (2 * reach / size + 2)
+        if box <= 2 * capsule or box > len(self._cells):
+            # Short or axis aligned segments fill most of their bounding box, and sparse grids are cheaper to
+            # walk cell by cell: the bounding box query does as well there
+            found = self.candidates(min(x0, x1) - reach, min(y0, y1) - reach, max(x0, x1) + reach,
+                                    max(y0, y1) + reach, owner)
+        else:
+            found = self._capsule_cells(x0, y0, x1, y1, reach, owner)
+        if not length2:
+            return found
+
+        # Distance to the line within reach, and projection within reach of the segment ends
+        length = math.sqrt(length2)
+        entities = self.entities
+        kept = []
+        for index in found:
+            e = entities[index]
+            ex = e.x - x0
+            ey = e.y - y0
+            limit = (e.radius + padding + _SLACK) * length
+            along = ex * dx + ey * dy
+            if abs(ex * dy - ey * dx) <= limit and -limit <= along <= length2 + limit:
+                kept.append(index)
+        return kept
+
+    def _capsule_cells(self, x0, y0, x1, y1, reach, owner):
+        """
+        :return: Indices of the entities in the cells within reach of the segment, ascending
+        :rtype: list[int]
+        """
+        size = self.cell_size
+        first_column, first_row, last_column, last_row = self._bounds
+        dx, dy = x1 - x0, y1 - y0
+        cells = self._cells
+        found = []
+        for cy in range(max(int((min(y0, y1) - reach) // size), first_row),
+                        min(int((max(y0, y1) + reach) // size), last_row) + 1):
+            # Part of the segment that is within reach of the row, vertically
+            start, end = 0.0, 1.0
+            if dy:
+                start, end = sorted(((cy * size - reach - y0) / dy, ((cy + 1) * size + reach - y0) / dy))
+                start, end = max(start, 0.0), min(end, 1.0)
+                if start > end:
+                    continue
+            left, right = sorted((x0 + dx * start, x0 + dx * end))
+            for cx in range(max(int((left - reach) // size), first_column),
+                            min(int((right + reach) // size), last_column) + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        if owner is not None:
+            owners = self._owners
+            found = [index for index in found if owners[index] == owner]
+        found.sort()
+        return found
+
+    def within(self, x, y, radius, owner=None):
+        """
+        :param float x: Center of the query
+        :param float y: Center of the query
+        :param float radius: Reach of the query, from the center to the surface of the entities
+        :param int owner: Only keep entities of this player id, or UNOWNED ones (optional)
+        :return: Entities whose circle comes within radius of (x, y)
+        :rtype: list[entity.Entity]
+        """
+        reach = radius + self.max_radius
+        entities = self.entities
+        result = []
+        for index in self.candidates(x - reach, y - reach, x + reach, y + reach, owner):
+            e = entities[index]
+            dx = e.x - x
+            dy = e.y - y
+            if math.sqrt(dx * dx + dy * dy) <= radius + e.radius:
+                result.append(e)
+        return result
+
+    def nearest(self, x, y, owner=None, exclude=None, max_distance=math.inf):
+        """
+        Closest entity by center distance, searched ring by ring of cells around (x, y). Ties go to the entity
+        given first.
+
+        :param float x: Center of the query
+        :param float y: Center of the query
+        :param int owner: Only consider entities of this player id, or UNOWNED ones (optional)
+        :param entity.Entity exclude: Entity to skip, usually the one the query is made for (optional)
+        :param float max_distance: Ignore entities farther than this
+        :return: The closest entity and its distance, or (None, inf) if there is none
+        :rtype: (entity.Entity, float)
+        """
+        size = self.cell_size
+        column, row = int(x // size), int(y // size)
+        first_column, first_row, last_column, last_row = self._bounds
+        last_ring = max(column - first_column, last_column - column, row - first_row, last_row - row, 0)
+        cells, entities, owners = self._cells, self.entities, self._owners
+        best, best_distance2 = None, max_distance * max_distance
+        for ring in range(last_ring + 1):
+            if ring:
+                ring_cells = [(cx, cy) for cx in range(column - ring, column + ring + 1)
+                              for cy in (row - ring, row + ring)]
+                ring_cells += [(cx, cy) for cx in (column - ring, column + ring)
+                               for cy in range(row - ring + 1, row + ring)]
+            else:
+                ring_cells = [(column, row)]
+            for cell in ring_cells:
+                for index in cells.get(cell, ()):
+                    e = entities[index]
+                    if e is exclude or (owner is not None and owners[index] != owner):
+                        continue
+                    dx = e.x - x
+                    dy = e.y - y
+                    distance2 = dx * dx + dy * dy
+                    if distance2 < best_distance2 or (distance2 == best_distance2 and
+                                                      (best is None or index < best)):
+                        best, best_distance2 = index, distance2
+            # Every cell of the next rings is at least ring * size away from (x, y)
+            reach = ring * size
+            if (best is not None and best_distance2 <= reach * reach) or reach > max_distance:
+                break
+        if best is None:
+            return None, math.inf
+        return entities[best], math.sqrt(best_distance2)
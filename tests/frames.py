@@ -0,0 +1,91 @@
+"""
+Frames in the text protocol of the Halite engine, built from plain tuples, and random layouts of them.
+"""
+
+import math
+
+from hlt import entity, game_map
+
+#: Map size of the generated frames
+WIDTH, HEIGHT = 240, 160
+
+UNDOCKED = entity.Ship.DockingStatus.UNDOCKED.value
+DOCKED = entity.Ship.DockingStatus.DOCKED.value
+
+
+def frame(ships, planets, num_players=2):
+    """
+    :param list[tuple] ships: (id, owner, x, y, health, docking_status, planet id or None, progress, cooldown) of
+        every ship
+    :param list[tuple] planets: (id, x, y, radius, health, docking spots, owner id or None) of every planet
+    :param int num_players: Players of the game
+    :return: The frame as the engine sends it
+    :rtype: str
+    """
+    parts = [str(num_players)]
+    for player in range(num_players):
+        own = [ship for ship in ships if ship[1] == player]
+        parts.append("{} {}".format(player, len(own)))
+        for ship_id, _, x, y, health, status, planet, progress, cooldown in own:
+            parts.append("{} {} {} {} 0.0 0.0 {} {} {} {}".format(
+                ship_id, x, y, health, status, 0 if planet is None else planet, progress, cooldown))
+    parts.append(str(len(planets)))
+    for planet_id, x, y, radius, health, spots, owner in planets:
+        docked = [str(ship[0]) for ship in ships if ship[6] == planet_id and ship[5] != UNDOCKED]
+        parts.append("{} {} {} {} {} {} 0 1000 {} {} {}".format(
+            planet_id, x, y, health, radius, spots, int(owner is not None), owner or 0, len(docked)))
+        parts.extend(docked)
+    return " ".join(parts)
+
+
+def parse(text, my_id=0, incremental=False, into=None):
+    """
+    :param str text: A frame
+    :param int my_id: Player the map is for
+    :param bool incremental: Incremental mode of a new map
+    :param game_map.Map into: Map to parse the frame into instead of a new one
+    :rtype: game_map.Map
+    """
+    parsed = into if into is not None else game_map.Map(my_id, WIDTH, HEIGHT, incremental)
+    parsed._parse(text)
+    return parsed
+
+
+def random_planets(rng, count):
+    """
+    Planets apart from each other and from the map border, unowned and at full health.
+
+    :param random.Random rng: Source of the layout
+    :param int count: Planets wanted; fewer are returned if they do not fit
+    :rtype: list[tuple]
+    """
+    planets = []
+    for _ in range(50 * count):
+        if len(planets) == count:
+            break
+        radius = round(rng.uniform(3, 10), 4)
+        x = round(rng.uniform(radius + 6, WIDTH - radius - 6), 4)
+        y = round(rng.uniform(radius + 6, HEIGHT - radius - 6), 4)
+        if all(math.hypot(x - px, y - py) > radius + pr + 12 for _, px, py, pr, _, _, _ in planets):
+            planets.append((len(planets), x, y, radius, 2000, 3, None))
+    return planets
+
+
+def random_ships(rng, count, planets, first_id=0, num_players=2):
+    """
+    Undocked ships scattered over the free space, owners round robin.
+
+    :param random.Random rng: Source of the layout
+    :param int count: Ships wanted
+    :param list[tuple] planets: Planets to keep out of
+    :param int first_id: Id of the first ship
+    :param int num_players: Players owning the ships
+    :rtype: list[tuple]
+    """
+    ships = []
+    while len(ships) < count:
+        x, y = round(rng.uniform(1, WIDTH - 1), 4), round(rng.uniform(1, HEIGHT - 1), 4)
+        if all(math.hypot(x - px, y - py) > pr + 1 for _, px, py, pr, _, _, _ in planets):
+            ship_id = first_id + len(ships)
+            ships.append((ship_id, ship_id % num_players, x, y, 255, UNDOCKED, None, 0, 0))
+    return ships
@@ -0,0 +1,121 @@
+import heapq
+import math
+import random
+
+import numpy as np
+import pytest
+
+from hlt import constants, entity, flow_field
+from tests import frames
+
+
+def _game_map(seed, count=8):
+    planets = frames.random_planets(random.Random(seed), count)
+    return frames.parse(frames.frame([], planets))
+
+
+def _step(heading):
+    """
+    :return: The move between cells a heading of a field stands for
+    :rtype: (int, int)
+    """
+    return min(flow_field._STEPS, key=lambda step: abs((math.degrees(math.atan2(step[1], step[0])) - heading + 180)
+                                                        % 360 - 180))
+
+
+def _segment_gap(x0, y0, x1, y1, planet):
+    dx, dy = x1 - x0, y1 - y0
+    t = min(max(((planet.x - x0) * dx + (planet.y - y0) * dy) / (dx * dx + dy * dy), 0.0), 1.0)
+    return math.hypot(x0 + t * dx - planet.x, y0 + t * dy - planet.y) - planet.radius
+
+
+def _dijkstra(field, planet, planets):
+    """
+    Shortest ways to the dock ring over the same moves as the field, searched outward from the ring.
+
+    :rtype: numpy.ndarray
+    """
+    rows, columns = field.distance.shape
+    size = field.cell_size
+
+    def surface(other, row, column):
+        return math.hypot(column * size - other.x, row * size - other.y) - other.radius
+
+    def free(row, column):
+        if not (0 <= row < rows and 0 <= column < columns) or surface(planet, row, column) < 0:
+            return False
+        return all(surface(other, row, column) > flow_field.CLEARANCE for other in planets if other is not planet)
+
+    is_free = [[free(row, column) for column in range(columns)] for row in range(rows)]
+    distance = np.full((rows, columns), np.inf)
+    frontier = []
+    for row in range(rows):
+        for column in range(columns):
+            if is_free[row][column] and surface(planet, row, column) <= constants.DOCK_RADIUS:
+                distance[row, column] = 0.0
+                frontier.append((0.0, row, column))
+    heapq.heapify(frontier)
+    while frontier:
+        cost, row, column = heapq.heappop(frontier)
+        if cost > distance[row, column]:
+            continue
+        for dx, dy in flow_field._STEPS:
+            # The cell the move starts from, toward (row, column)
+            start_row, start_column = row - dy, column - dx
+            cells = [(start_row, start_column)]
+            if abs(dx * dy) == 2:
+                # A knight move runs between the two cells beside its middle
+                cells += [(start_row + dy // 2, start_column + dx // 2),
+                          (start_row + dy - dy // 2, start_column + dx - dx // 2)]
+            if not all(0 <= r < rows and 0 <= c < columns and is_free[r][c] for r, c in cells):
+                continue
+            candidate = cost + math.hypot(dx, dy) * size
+            if candidate < distance[start_row, start_column]:
+                distance[start_row, start_column] = candidate
+                heapq.heappush(frontier, (candidate, start_row, start_column))
+    return distance
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_distances_are_shortest_ways(seed):
+    planets = _game_map(seed, 5).all_planets()
+    for planet in planets[:2]:
+        field = flow_field.FlowField(planet, planets, frames.WIDTH, frames.HEIGHT)
+        expected = _dijkstra(field, planet, planets)
+        assert np.array_equal(np.isinf(field.distance), np.isinf(expected))
+        finite = np.isfinite(expected)
+        assert np.allclose(field.distance[finite], expected[finite])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_headings_lead_to_the_ring_around_the_planets(seed):
+    game_map = _game_map(seed)
+    planets = game_map.all_planets()
+    for planet in planets[:3]:
+        field = flow_field.FlowField(planet, planets, frames.WIDTH, frames.HEIGHT)
+        size = field.cell_size
+        rows, columns = np.nonzero(np.isfinite(field.distance) & ~np.isnan(field.headings))
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            dx, dy = _step(field.headings[row, column])
+            # Every move gets closer to the ring by its length
+            assert field.distance[row + dy, column + dx] == pytest.approx(
+                field.distance[row, column] - math.hypot(dx, dy) * size)
+            # ... and keeps a ship off the other planets
+            x0, y0, x1, y1 = column * size, row * size, (column + dx) * size, (row + dy) * size
+            for other in planets:
+                if other is not planet:
+                    assert _segment_gap(x0, y0, x1, y1, other) >= constants.SHIP_RADIUS - 1e-9
+
+
+def test_no_heading_on_the_ring_or_inside_a_planet():
+    game_map = _game_map(0)
+    planet, other = game_map.all_planets()[:2]
+    fields = game_map.flow_fields()
+    field = fields.field(planet)
+    assert fields.field(planet) is field
+    on_ring = planet.radius + constants.DOCK_RADIUS / 2
+    assert field.heading(planet.x + on_ring * math.cos(0.6), planet.y + on_ring * math.sin(0.6)) is None
+    assert fields.heading(planet, planet) is None
+    assert fields.heading(planet, other) is None
+    outside = other.radius + 10
+    assert fields.heading(planet, entity.Position(other.x + outside, other.y)) is not None
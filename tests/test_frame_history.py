@@ -0,0 +1,82 @@
+import logging
+import random
+
+import numpy as np
+
+from tests import frames
+from utils.frame_history import FrameHistory
+
+
+def _turn(ships, planets, turn):
+    """
+    :return: The layout moved to a turn: every ship at x = turn + its id, planet 0 losing 10 health per turn
+    :rtype: (list[tuple], list[tuple])
+    """
+    ships = [ship[:2] + (float(turn + ship[0]),) + ship[3:] for ship in ships]
+    planets = [planets[0][:4] + (2000 - 10 * turn,) + planets[0][5:]] + planets[1:]
+    return ships, planets
+
+
+def _layout(count):
+    rng = random.Random(3)
+    planets = frames.random_planets(rng, 3)
+    return frames.random_ships(rng, count, []), planets
+
+
+def test_keeps_the_last_capacity_frames():
+    ships, planets = _layout(4)
+    history = FrameHistory(capacity=8)
+    for turn in range(20):
+        history.append(frames.parse(frames.frame(*_turn(ships, planets, turn))), turn)
+    assert len(history) == 8
+    assert history.turns().tolist() == list(range(12, 20))
+    turns, x = history.ship_series(2, "x")
+    assert turns.tolist() == list(range(12, 20))
+    assert x.tolist() == [turn + 2.0 for turn in range(12, 20)]
+    turns, health = history.planet_series(0, "health")
+    assert health.tolist() == [2000.0 - 10 * turn for turn in range(12, 20)]
+    assert history.ship_series(2)[1].shape == (8, 6)
+
+
+def test_partial_buffer():
+    ships, planets = _layout(4)
+    history = FrameHistory(capacity=8)
+    for turn in range(3):
+        history.append(frames.parse(frames.frame(*_turn(ships, planets, turn))), turn)
+    assert len(history) == 3
+    assert history.turns().tolist() == [0, 1, 2]
+    assert history.ship_series(99, "x")[0].tolist() == []
+
+
+def test_dead_ship_slots_are_recycled_oldest_first():
+    ships, planets = _layout(4)
+    history = FrameHistory(capacity=8, max_ships=5)
+    for turn in range(3):
+        history.append(frames.parse(frames.frame(*_turn(ships, planets, turn))), turn)
+    # Ship 0 dies, ship 1 dies a turn later: their histories stay readable
+    history.append(frames.parse(frames.frame(*_turn(ships[1:], planets, 3))), 3)
+    history.append(frames.parse(frames.frame(*_turn(ships[2:], planets, 4))), 4)
+    assert history.ship_series(0, "x")[0].tolist() == [0, 1, 2]
+    assert history.ship_series(1, "x")[0].tolist() == [0, 1, 2, 3]
+
+    # The free slot goes first, then the slot of ship 0, which dies first
+    spawned = frames.random_ships(random.Random(4), 2, [], first_id=10)
+    history.append(frames.parse(frames.frame(*_turn(ships[2:] + spawned, planets, 5))), 5)
+    assert history.ship_series(0, "x")[0].tolist() == []
+    assert history.ship_series(1, "x")[0].tolist() == [0, 1, 2, 3]
+    turns, x = history.ship_series(11, "x")
+    assert turns.tolist() == [5] and x.tolist() == [16.0]
+
+
+def test_full_buffer_skips_ships_and_warns_once(caplog):
+    ships, planets = _layout(6)
+    history = FrameHistory(capacity=4, max_ships=4)
+    with caplog.at_level(logging.WARNING):
+        for turn in range(3):
+            game_map = frames.parse(frames.frame(*_turn(ships, planets, turn)))
+            history.append(game_map, turn)
+    assert len([record for record in caplog.records if "FrameHistory is full" in record.message]) == 1
+    # Slots go to the ships in frame order, players one after the other
+    order = [ship.id for ship in game_map._all_ships()]
+    assert [len(history.ship_series(ship_id)[0]) for ship_id in order] == [3, 3, 3, 3, 0, 0]
+    assert np.array_equal(history.ship_series(order[3], "x")[1], [order[3] + turn for turn in range(3)])
@@ -0,0 +1,88 @@
+import math
+import random
+
+import pytest
+
+from hlt import constants, neighbor_list
+from tests import frames
+
+
+def _gap(a, b):
+    return math.hypot(a.x - b.x, a.y - b.y) - a.radius - b.radius
+
+
+def _turns(seed, count, step):
+    """
+    Random walk of a crowd of ships: every turn ships move up to step, some die and some spawn, and planet 0
+    is destroyed halfway.
+
+    :return: Ships and planets of every turn
+    :rtype: list[(list[tuple], list[tuple])]
+    """
+    rng = random.Random(seed)
+    planets = frames.random_planets(rng, 6)
+    ships = frames.random_ships(rng, 120, planets)
+    next_id = len(ships)
+    turns = []
+    for turn in range(count):
+        moved = []
+        for ship in ships:
+            angle, distance = rng.uniform(0, 2 * math.pi), rng.uniform(0, step)
+            x = round(min(max(ship[2] + distance * math.cos(angle), 1), frames.WIDTH - 1), 4)
+            y = round(min(max(ship[3] + distance * math.sin(angle), 1), frames.HEIGHT - 1), 4)
+            moved.append(ship[:2] + (x, y) + ship[4:])
+        ships = [ship for ship in moved if rng.random() > 0.03]
+        spawned = frames.random_ships(rng, rng.randrange(4), planets, first_id=next_id)
+        next_id += len(spawned)
+        ships += spawned
+        if turn == count // 2:
+            planets = planets[1:]
+        turns.append((ships, planets))
+    return turns
+
+
+def _assert_complete(game_map, gap):
+    lists = game_map.neighbor_list()
+    ships, planets = game_map._all_ships(), game_map.all_planets()
+    for ship in ships:
+        expected = [other for other in ships if other is not ship and _gap(ship, other) <= gap]
+        assert lists.ships_near(ship, gap) == expected
+        assert lists.ships_near(ship, gap, owner=1) == [other for other in expected if other.owner.id == 1]
+        assert lists.planets_near(ship, gap) == [planet for planet in planets if _gap(ship, planet) <= gap]
+        # Without a gap the lists hold at least the ships within the cutoff
+        near = lists.ships_near(ship)
+        assert all(other in near for other in ships if other is not ship and
+                   _gap(ship, other) <= neighbor_list.CUTOFF)
+    for planet in planets:
+        assert lists.ships_near_planet(planet, gap) == [ship for ship in ships if _gap(ship, planet) <= gap]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("gap", [5.0, neighbor_list.CUTOFF])
+def test_ships_near_every_frame(seed, gap):
+    game_map = None
+    for ships, planets in _turns(seed, 16, constants.MAX_SPEED):
+        game_map = frames.parse(frames.frame(ships, planets), into=game_map)
+        _assert_complete(game_map, gap)
+    # Ships that barely move keep their lists
+    assert game_map.neighbor_list().refreshed < len(game_map._all_ships())
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("used", [(0, 5, 6, 15), (3, 4, 11, 12)])
+def test_ships_near_after_skipped_frames(seed, used):
+    game_map = None
+    for turn, (ships, planets) in enumerate(_turns(seed, 16, constants.MAX_SPEED)):
+        game_map = frames.parse(frames.frame(ships, planets), into=game_map)
+        if turn in used:
+            _assert_complete(game_map, neighbor_list.CUTOFF)
+
+
+def test_ships_near_limits():
+    ships, planets = _turns(0, 1, 0)[0]
+    game_map = frames.parse(frames.frame(ships, planets))
+    lists = game_map.neighbor_list()
+    with pytest.raises(ValueError):
+        lists.ships_near(game_map._all_ships()[0], neighbor_list.CUTOFF + 1)
+    other = frames.parse(frames.frame(frames.random_ships(random.Random(1), 1, planets, first_id=999), planets))
+    assert lists.ships_near(other._all_ships()[0]) is None
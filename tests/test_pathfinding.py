@@ -0,0 +1,142 @@
+import heapq
+import math
+import random
+
+import pytest
+
+from hlt import entity, pathfinding
+from tests import frames
+
+
+def _planets(seed, count=10):
+    planets = frames.random_planets(random.Random(seed), count)
+    return frames.parse(frames.frame([], planets)).all_planets()
+
+
+def _segment_gap(x0, y0, x1, y1, planet):
+    """
+    :return: Distance from the surface of a planet to the closest point of a segment
+    :rtype: float
+    """
+    dx, dy = x1 - x0, y1 - y0
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0 else min(max(((planet.x - x0) * dx + (planet.y - y0) * dy) / length2, 0.0), 1.0)
+    return math.hypot(x0 + t * dx - planet.x, y0 + t * dy - planet.y) - planet.radius
+
+
+def _free_points(rng, planets, count):
+    """
+    :return: Random points that keep clearance from every planet
+    :rtype: list[entity.Position]
+    """
+    points = []
+    while len(points) < count:
+        point = entity.Position(rng.uniform(0, frames.WIDTH), rng.uniform(0, frames.HEIGHT))
+        if all(point.calculate_distance_between(planet) > planet.radius + pathfinding.CLEARANCE
+               for planet in planets):
+            points.append(point)
+    return points
+
+
+def _shortest(graph, planets, start, target):
+    """
+    Dijkstra over the waypoints and both ends, linking every pair of points whose leg keeps clearance.
+
+    :return: Length of the shortest route, inf if there is none
+    :rtype: float
+    """
+    points = [(start.x, start.y)] + list(zip(graph.x.tolist(), graph.y.tolist())) + [(target.x, target.y)]
+
+    def open_leg(a, b):
+        return all(_segment_gap(*points[a], *points[b], planet) > graph.clearance for planet in planets)
+
+    best = {0: 0.0}
+    frontier = [(0.0, 0)]
+    done = set()
+    while frontier:
+        cost, node = heapq.heappop(frontier)
+        if node in done:
+            continue
+        done.add(node)
+        if node == len(points) - 1:
+            return cost
+        for other in range(len(points)):
+            if other not in done and open_leg(node, other):
+                candidate = cost + math.hypot(points[other][0] - points[node][0], points[other][1] - points[node][1])
+                if candidate < best.get(other, math.inf):
+                    best[other] = candidate
+                    heapq.heappush(frontier, (candidate, other))
+    return math.inf
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_routes_keep_clearance_and_end_at_the_target(seed):
+    planets = _planets(seed)
+    graph = pathfinding.VisibilityGraph(planets, frames.WIDTH, frames.HEIGHT)
+    rng = random.Random(seed)
+    points = _free_points(rng, planets, 40)
+    for start, target in zip(points[::2], points[1::2]):
+        route = graph.route(start, target)
+        assert route is not None
+        assert (route[-1].x, route[-1].y) == (target.x, target.y)
+        legs = [start] + route
+        for a, b in zip(legs, legs[1:]):
+            for planet in planets:
+                assert _segment_gap(a.x, a.y, b.x, b.y, planet) >= graph.clearance - 1e-6
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_routes_are_shortest_paths(seed):
+    planets = _planets(seed, 6)
+    graph = pathfinding.VisibilityGraph(planets, frames.WIDTH, frames.HEIGHT)
+    rng = random.Random(seed)
+    points = _free_points(rng, planets, 12)
+    for start, target in zip(points[::2], points[1::2]):
+        route = graph.route(start, target)
+        legs = [start] + route
+        length = sum(a.calculate_distance_between(b) for a, b in zip(legs, legs[1:]))
+        assert length == pytest.approx(_shortest(graph, planets, start, target))
+
+
+def test_open_line_is_flown_straight():
+    planets = _planets(0)
+    graph = pathfinding.VisibilityGraph(planets, frames.WIDTH, frames.HEIGHT)
+    start, target = _free_points(random.Random(1), planets, 1)[0], None
+    for point in _free_points(random.Random(2), planets, 50):
+        if all(_segment_gap(start.x, start.y, point.x, point.y, planet) > graph.clearance for planet in planets):
+            target = point
+            break
+    assert target is not None
+    route = graph.route(start, target)
+    assert len(route) == 1 and (route[0].x, route[0].y) == (target.x, target.y)
+
+
+def test_cached_routes_are_checked_from_every_start():
+    planets = _planets(1)
+    graph = pathfinding.VisibilityGraph(planets, frames.WIDTH, frames.HEIGHT)
+    rng = random.Random(3)
+    targets = _free_points(rng, planets, 5)
+    for start in _free_points(rng, planets, 60):
+        target = rng.choice(targets)
+        # A ship next to start is usually in the same region and gets the cached route of start
+        for other in (start, entity.Position(start.x + rng.uniform(-3, 3), start.y + rng.uniform(-3, 3))):
+            if not 0 <= other.x <= frames.WIDTH or not 0 <= other.y <= frames.HEIGHT or \
+                    any(other.calculate_distance_between(p) <= p.radius + graph.clearance for p in planets):
+                continue
+            first = graph.route(other, target)[0]
+            assert all(_segment_gap(other.x, other.y, first.x, first.y, planet) >= graph.clearance - 1e-6
+                       for planet in planets)
+
+
+def test_a_ship_next_to_a_planet_can_leave_it():
+    planets = _planets(2)
+    graph = pathfinding.VisibilityGraph(planets, frames.WIDTH, frames.HEIGHT)
+    planet = planets[0]
+    docked = entity.Position(planet.x + planet.radius + 1, planet.y)
+    target = _free_points(random.Random(4), planets, 1)[0]
+    route = graph.route(docked, target)
+    assert route is not None and (route[-1].x, route[-1].y) == (target.x, target.y)
+    legs = [docked] + route
+    # Only the first leg may run within clearance of the planet the ship is next to
+    for a, b in zip(legs[1:], legs[2:]):
+        assert _segment_gap(a.x, a.y, b.x, b.y, planet) >= graph.clearance - 1e-6
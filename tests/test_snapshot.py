@@ -0,0 +1,101 @@
+import math
+import random
+
+import pytest
+
+from hlt import snapshot
+from tests import frames
+
+
+def _layout():
+    """
+    :return: Ships and planets of a frame where player 0 owns planet 0 and has three ships docked to it
+    :rtype: (list[tuple], list[tuple])
+    """
+    rng = random.Random(5)
+    planets = frames.random_planets(rng, 4)
+    planets[0] = planets[0][:6] + (0,)
+    _, x, y, radius, _, _, _ = planets[0]
+    docked = [(ship_id, 0, round(x + (radius + 1) * math.cos(ship_id), 4),
+               round(y + (radius + 1) * math.sin(ship_id), 4), 255, frames.DOCKED, 0, 0, 0) for ship_id in range(3)]
+    return docked + frames.random_ships(rng, 20, planets, first_id=10), planets
+
+
+def _next_turn(ships, planets):
+    """
+    :return: The layout a turn later: undocked ships moved, docked ship 1 was hit and planet 1 was rammed
+    :rtype: (list[tuple], list[tuple])
+    """
+    ships = [ship if ship[5] == frames.DOCKED else ship[:2] + (round(ship[2] + 0.5, 4),) + ship[3:]
+             for ship in ships]
+    ships[1] = ships[1][:4] + (191,) + ships[1][5:]
+    planets = list(planets)
+    planets[1] = planets[1][:4] + (1745,) + planets[1][5:]
+    return ships, planets
+
+
+def _assert_matches(snap, game_map):
+    """
+    Assert that the records of a snapshot hold the state of the entities of the map.
+    """
+    assert snap.my_id == game_map.my_id
+    assert sorted(ship.id for ship in snap._all_ships()) == sorted(game_map._ships)
+    for ship in game_map._all_ships():
+        assert snap.get_ship(ship.id) == snapshot.ShipRecord.capture(ship)
+    assert [planet.id for planet in snap.all_planets()] == [planet.id for planet in game_map.all_planets()]
+    for planet in game_map.all_planets():
+        assert snap.get_planet(planet.id) == snapshot.PlanetRecord.capture(planet)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_snapshot_holds_the_frame(incremental):
+    ships, planets = _layout()
+    game_map = frames.parse(frames.frame(ships, planets), incremental=incremental)
+    snap = game_map.snapshot()
+    _assert_matches(snap, game_map)
+    assert game_map.snapshot() is snap
+    assert snap.get_ship(0).owner_id == 0 and snap.get_ship(0).planet_id == 0
+    assert snap.get_planet(0).docked_ship_ids == (0, 1, 2)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_snapshot_is_frozen(incremental):
+    ships, planets = _layout()
+    game_map = frames.parse(frames.frame(ships, planets), incremental=incremental)
+    first = game_map.snapshot()
+    expected = {ship.id: snapshot.ShipRecord.capture(ship) for ship in game_map._all_ships()}
+    frames.parse(frames.frame(*_next_turn(ships, planets)), into=game_map)
+    assert {ship.id: ship for ship in first._all_ships()} == expected
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_consecutive_snapshots_share_unchanged_records(incremental):
+    ships, planets = _layout()
+    game_map = frames.parse(frames.frame(ships, planets), incremental=incremental)
+    first = game_map.snapshot()
+    frames.parse(frames.frame(*_next_turn(ships, planets)), into=game_map)
+    second = game_map.snapshot()
+
+    _assert_matches(second, game_map)
+    # Docked ships and unowned planets that did not change keep their record
+    assert second.get_ship(0) is first.get_ship(0)
+    assert second.get_ship(2) is first.get_ship(2)
+    assert second.get_planet(2) is first.get_planet(2)
+    # Damage, movement and owned planets make new records
+    assert second.get_ship(1) is not first.get_ship(1) and second.get_ship(1).health == 191
+    assert second.get_planet(1) is not first.get_planet(1) and second.get_planet(1).health == 1745
+    assert second.get_ship(10) is not first.get_ship(10)
+    assert second.get_planet(0) is not first.get_planet(0)
+
+
+def test_records_are_not_shared_across_a_frame_without_snapshot():
+    ships, planets = _layout()
+    game_map = frames.parse(frames.frame(ships, planets))
+    first = game_map.snapshot()
+    # Ship 0 undocks and docks again meanwhile: only the change sets of the last frame would not show it
+    undocked = [ship[:5] + (frames.UNDOCKED, None, 0, 0) if ship[0] == 0 else ship for ship in ships]
+    frames.parse(frames.frame(undocked, planets), into=game_map)
+    frames.parse(frames.frame(ships, planets), into=game_map)
+    third = game_map.snapshot()
+    _assert_matches(third, game_map)
+    assert third.get_ship(0) == first.get_ship(0) and third.get_ship(0) is not first.get_ship(0)
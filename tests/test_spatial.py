@@ -0,0 +1,77 @@
+import math
+import random
+
+import pytest
+
+from engine import scenario
+from hlt import entity, spatial
+from tests import frames
+
+
+def _game_map(seed):
+    return scenario.generate(seed, num_players=4, num_ships=150).map(), random.Random(seed)
+
+
+def _entities(game_map, kind, owner):
+    """
+    :return: The entities of the map a query with these filters considers, ships first
+    :rtype: list[entity.Entity]
+    """
+    candidates = []
+    if kind is None or kind is entity.Ship:
+        candidates += game_map._all_ships()
+    if kind is None or kind is entity.Planet:
+        candidates += game_map.all_planets()
+    if owner is None:
+        return candidates
+    return [e for e in candidates if (spatial.UNOWNED if e.owner is None else e.owner.id) == owner]
+
+
+def _queries(game_map, rng, count):
+    """
+    :return: Ships of the map and random points, to query around
+    :rtype: list[entity.Entity]
+    """
+    points = [entity.Position(rng.uniform(0, game_map.width), rng.uniform(0, game_map.height))
+              for _ in range(count)]
+    return rng.sample(game_map._all_ships(), count) + points
+
+
+FILTERS = [(None, None), (entity.Ship, None), (entity.Planet, None), (None, 0), (entity.Ship, 3),
+           (entity.Planet, spatial.UNOWNED), (entity.Planet, 1)]
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("kind, owner", FILTERS)
+def test_entities_within_matches_a_scan(seed, kind, owner):
+    game_map, rng = _game_map(seed)
+    for position in _queries(game_map, rng, 20):
+        radius = rng.choice([0.0, 1.5, 7.0, 20.0, 60.0])
+        expected = [e for e in _entities(game_map, kind, owner) if e is not position and
+                    math.hypot(e.x - position.x, e.y - position.y) <= radius + e.radius]
+        assert game_map.entities_within(position, radius, kind, owner) == expected
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("kind, owner", FILTERS)
+def test_nearest_entity_matches_a_scan(seed, kind, owner):
+    game_map, rng = _game_map(seed)
+    for position in _queries(game_map, rng, 20):
+        max_distance = rng.choice([math.inf, 5.0, 30.0])
+        distances = [(math.hypot(e.x - position.x, e.y - position.y), e)
+                     for e in _entities(game_map, kind, owner) if e is not position]
+        distances = [(distance, e) for distance, e in distances if distance <= max_distance]
+        found = game_map.nearest_entity(position, kind, owner, max_distance)
+        if not distances:
+            assert found is None
+        else:
+            best = min(distance for distance, _ in distances)
+            assert found is not None
+            assert math.hypot(found.x - position.x, found.y - position.y) == best
+
+
+def test_queries_on_an_empty_frame():
+    game_map = frames.parse(frames.frame([], []))
+    position = entity.Position(10, 10)
+    assert game_map.entities_within(position, 50) == []
+    assert game_map.nearest_entity(position) is None
@@ -1,7 +1,9 @@
-from collections import OrderedDict
 import logging
+import numpy as np
 import hlt
 import utils.constants as my_const
+from utils.frame_history import FrameHistory
+from utils.forward_model import ForwardModel
 
 
 class FeatureCollector:
@@ -24,9 +26,16 @@ class FeatureCollector:
     :ivar rush_leader: Allied ship that is closest to enemy while rushing
     :ivar rush_leader_modelled: Flag indicating whether rush leader movement was modelled
     :ivar rush_leader_move: List with information about speed and angle (in this order)
+    :ivar history: Ring buffer with the last frames of the game, for features that need a time series. None
+        unless the collector was created with keep_history=True
+    :ivar forward_model: One-turn simulator of the current frame, built by predict_turn on first use
     """
 
-    def __init__(self):
+    def __init__(self, keep_history=False):
+        """
+        :param bool keep_history: Store every frame in a FrameHistory. Off by default: filling it costs time every
+            turn, so only bots with features reading the history should turn it on.
+        """
         self.turn = -1
         self.players = []
         self.assigned_ships = {}
@@ -44,6 +53,8 @@ class FeatureCollector:
         self.rush_leader = None
         self.rush_leader_modelled = False
         self.rush_leader_move = []
+        self.history = FrameHistory() if keep_history else None
+        self.forward_model = None
 
     # noinspection PyAttributeOutsideInit
     def iterate_turn(self, game_map: hlt.game_map):
@@ -58,9 +69,12 @@ class FeatureCollector:
         self.move_table = {}
         self.command_queue = []
         self.players = self.game_map.all_players()
+        if self.history is not None:
+            self.history.append(self.game_map, self.turn)
+        self.forward_model = None
 
         self.team_ships = self.game_map.get_me().all_ships()
-        self.enemy_ships = [ship for ship in self.game_map._all_ships() if ship not in self.team_ships]
+        self.enemy_ships = [ship for ship in self.game_map._all_ships() if ship.owner.id != self.game_map.my_id]
 
         self.my_ships_count = len(self.team_ships)
         self.enemy_ships_count = len(self.enemy_ships)
@@ -72,6 +86,18 @@ class FeatureCollector:
             # to update the position of rush leader
             self.rush_leader = self.game_map.get_me().get_ship(self.rush_leader.id)
 
+    def predict_turn(self, command_queue=None):
+        """
+        Simulate the next turn with the rules of the local engine, to check commands (e.g. for self-collisions)
+        before they are sent. The forward model of the turn is built on first use.
+
+        :param command_queue: Commands to simulate, the ones queued so far by default
+        :return: utils.forward_model.Prediction
+        """
+        if self.forward_model is None:
+            self.forward_model = ForwardModel(self.game_map)
+        return self.forward_model.predict(self.command_queue if command_queue is None else command_queue)
+
     # noinspection PyAttributeOutsideInit
     def collect(self, ship: hlt.entity.Ship):
         """
@@ -80,93 +106,34 @@ class FeatureCollector:
 
         :param ship: Allied ship
         """
-        self.entities_by_distance = self.game_map.nearby_entities_by_distance(ship)
-        self.entities_by_distance = OrderedDict(sorted(self.entities_by_distance.items(), key=lambda t: t[0]))
-
-        self.closest_empty_planets = [self.entities_by_distance[distance][0] for distance in
-                                      self.entities_by_distance if
-                                      isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and not
-                                      self.entities_by_distance[distance][0].is_owned()]
-
-        self.closest_empty_planets_distances = [distance for distance in self.entities_by_distance if
-                                                isinstance(self.entities_by_distance[distance][0],
-                                                           hlt.entity.Planet) and not
-                                                self.entities_by_distance[distance][0].is_owned()]
-
-        self.closest_not_my_planets = [self.entities_by_distance[distance][0] for distance in self.entities_by_distance
-                                       if
-                                       (isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and
-                                        self.entities_by_distance[distance][0].is_owned() and
-                                        (self.entities_by_distance[distance][
-                                             0].owner.id != self.game_map.get_me().id)) or
-                                       (isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and not
-                                       self.entities_by_distance[distance][0].is_owned())]
-
-        self.closest_not_my_planets_distances = [distance for distance in self.entities_by_distance if
-                                                 (isinstance(self.entities_by_distance[distance][0],
-                                                             hlt.entity.Planet) and
-                                                  self.entities_by_distance[distance][0].is_owned() and
-                                                  (self.entities_by_distance[distance][
-                                                       0].owner.id != self.game_map.get_me().id)) or
-                                                 (isinstance(self.entities_by_distance[distance][0],
-                                                             hlt.entity.Planet) and not
-                                                  self.entities_by_distance[distance][0].is_owned())]
-
-        self.closest_not_enemy_planets = [self.entities_by_distance[distance][0] for distance in
-                                          self.entities_by_distance
-                                          if
-                                          (isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and
-                                           self.entities_by_distance[distance][0].is_owned() and
-                                           (self.entities_by_distance[distance][
-                                                0].owner.id == self.game_map.get_me().id)) or
-                                          (isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and not
-                                          self.entities_by_distance[distance][0].is_owned())]
-
-        self.closest_not_enemy_planets_distances = [distance for distance in self.entities_by_distance if
-                                                    (isinstance(self.entities_by_distance[distance][0],
-                                                                hlt.entity.Planet) and
-                                                     self.entities_by_distance[distance][0].is_owned() and
-                                                     (self.entities_by_distance[distance][
-                                                          0].owner.id == self.game_map.get_me().id)) or
-                                                    (isinstance(self.entities_by_distance[distance][0],
-                                                                hlt.entity.Planet) and not
-                                                     self.entities_by_distance[distance][0].is_owned())]
-
-        self.closest_my_planets = [self.entities_by_distance[distance][0] for distance in self.entities_by_distance
-                                   if isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and
-                                   self.entities_by_distance[distance][0].is_owned() and (
-                                           self.entities_by_distance[distance][
-                                               0].owner.id == self.game_map.get_me().id)]
-
-        self.closest_my_planets_distances = [distance for distance in self.entities_by_distance if
-                                             isinstance(self.entities_by_distance[distance][0],
-                                                        hlt.entity.Planet) and
-                                             self.entities_by_distance[distance][0].is_owned() and (
-                                                     self.entities_by_distance[distance][
-                                                         0].owner.id == self.game_map.get_me().id)]
-
-        self.closest_enemy_ships = [self.entities_by_distance[distance][0] for distance in self.entities_by_distance
-                                    if isinstance(self.entities_by_distance[distance][0], hlt.entity.Ship) and
-                                    self.entities_by_distance[distance][0] not in self.team_ships]
-
-        self.closest_enemy_ships_distances = [distance for distance in self.entities_by_distance if
-                                              isinstance(self.entities_by_distance[distance][0],
-                                                         hlt.entity.Ship) and
-                                              self.entities_by_distance[distance][0] not in self.team_ships]
-
-        self.closest_enemy_planets = [self.entities_by_distance[distance][0] for distance in
-                                      self.entities_by_distance if
-                                      isinstance(self.entities_by_distance[distance][0], hlt.entity.Planet) and
-                                      self.entities_by_distance[distance][0] not in self.closest_my_planets and
-                                      self.entities_by_distance[distance][0] not in self.closest_empty_planets]
-
-        self.closest_enemy_planets_distances = [distance for distance in self.entities_by_distance if
-                                                isinstance(self.entities_by_distance[distance][0],
-                                                           hlt.entity.Planet) and
-                                                self.entities_by_distance[distance][
-                                                    0] not in self.closest_my_planets and
-                                                self.entities_by_distance[distance][
-                                                    0] not in self.closest_empty_planets]
+        matrix = self.game_map.distance_matrix()
+        rows = np.arange(len(matrix))
+        distances = matrix.from_entity(ship)
+        if distances is None:
+            distances = np.concatenate([matrix.ships.distances_from(ship), matrix.planets.distances_from(ship)])
+        else:
+            rows = np.delete(rows, matrix.row_of(ship))
+
+        # One entity per distance, the first one in map order, sorted by distance
+        sorted_distances, first = np.unique(distances[rows], return_index=True)
+        closest = rows[first]
+        owner = matrix.owner[closest]
+        planet = closest >= len(matrix.ships)
+        mine = owner == self.game_map.get_me().id
+        free = owner == hlt.columns.NO_ID
+        closest = closest.tolist()
+        sorted_distances = sorted_distances.tolist()
+
+        def select(mask):
+            indices = np.flatnonzero(mask).tolist()
+            return [matrix.entities[closest[i]] for i in indices], [sorted_distances[i] for i in indices]
+
+        self.closest_empty_planets, self.closest_empty_planets_distances = select(planet & free)
+        self.closest_not_my_planets, self.closest_not_my_planets_distances = select(planet & ~mine)
+        self.closest_not_enemy_planets, self.closest_not_enemy_planets_distances = select(planet & (mine | free))
+        self.closest_my_planets, self.closest_my_planets_distances = select(planet & mine)
+        self.closest_enemy_ships, self.closest_enemy_ships_distances = select(~planet & ~mine)
+        self.closest_enemy_planets, self.closest_enemy_planets_distances = select(planet & ~mine & ~free)
 
     # how many of my attackers assigned to this enemy
     def assign_enemy(self, enemy_id):
@@ -290,8 +257,8 @@ class FeatureCollector:
         - planet became occupied by enemy -> re-assign ships on that enemy
         - update positions of enemy ships
         """
-        alive_ships_ids = [ship.id for ship in self.team_ships]
-        alive_planets_ids = [planet.id for planet in self.game_map.all_planets()]
+        alive_ships_ids = {ship.id for ship in self.team_ships}
+        alive_planets_ids = {planet.id for planet in self.game_map.all_planets()}
 
         # my deaths
         status_changed_ships_ids = []
@@ -336,6 +303,8 @@ class FeatureCollector:
                         self.unassign_ship(s_id)
 
                         new_target = self.closest_enemy_to_planet(p_id)
+                        if new_target is None:
+                            continue
 
                         self.assign_ship(s_id, "enemy")
                         self.assign_enemy(new_target.id)
@@ -347,41 +316,36 @@ class FeatureCollector:
                     self.unassign_planet_to_ship(s_id)
                     self.unassign_ship(s_id)
 
-        # position update
+        # position update (a no-op for maps in incremental mode, where ship objects persist between turns)
         for k, v in self.ship_enemy_ship_dict.items():
-            enemy = [ship for ship in self.game_map._all_ships() if ship.id == v.id]
-            if enemy:
-                self.ship_enemy_ship_dict.update({k: enemy[0]})
+            enemy = self.game_map.get_ship(v.id)
+            if enemy is not None:
+                self.ship_enemy_ship_dict[k] = enemy
 
         for k, v in self.kamikaze_assign_ship.items():
-            enemy = [ship for ship in self.game_map._all_ships() if ship.id == v.id]
-            if enemy:
-                self.kamikaze_assign_ship.update({k: enemy[0]})
+            enemy = self.game_map.get_ship(v.id)
+            if enemy is not None:
+                self.kamikaze_assign_ship[k] = enemy
 
     def closest_enemy_to_planet(self, p_id):
-        entities_near_planet = self.game_map.nearby_entities_by_distance(self.game_map.get_planet(p_id))
-        sorted_entities_near_planet = OrderedDict(
-            sorted(entities_near_planet.items(), key=lambda t: t[0]))
-
-        closest_enemy = [sorted_entities_near_planet[distance][0] for distance in
-                         sorted_entities_near_planet if
-                         isinstance(sorted_entities_near_planet[distance][0], hlt.entity.Ship) and
-                         sorted_entities_near_planet[distance][0].owner.id != self.game_map.get_me().id][0]
+        """
+        :param p_id: Planet id
+        :return: The enemy ship closest to the planet, None if no enemy ship is left
+        """
+        _, closest_enemy = next(self.game_map.entities_by_distance(self.game_map.get_planet(p_id), kind=hlt.entity.Ship,
+                                                                   exclude_owner=self.game_map.get_me().id),
+                                (None, None))
         return closest_enemy
 
     def sorted_ships_from_enemy(self, enemy):
-        entities_near_enemy = self.game_map.nearby_entities_by_distance(enemy)
-        sorted_entities = OrderedDict(sorted(entities_near_enemy.items(), key=lambda t: t[0]))
-
-        closest_ships = [sorted_entities[distance][0] for distance in sorted_entities if
-                         isinstance(sorted_entities[distance][0], hlt.entity.Ship) and
-                         sorted_entities[distance][0].owner.id == self.game_map.get_me().id]
+        closest_ships = [ship for _, ship in self.game_map.entities_by_distance(enemy, kind=hlt.entity.Ship,
+                                                                                 owner=self.game_map.get_me().id)]
         return closest_ships
 
     def assign_rush_leader(self):
         # ship that is farthest from enemies will become rush leader
         closest_enemy = self.closest_enemy_ships[0]
-        ships_distances = [(ship, closest_enemy.calculate_distance_between(ship)) for ship in self.team_ships]
+        ships_distances = [(ship, self.game_map.distance(closest_enemy, ship)) for ship in self.team_ships]
         self.rush_leader = list(sorted(ships_distances, key=lambda pair: pair[1], reverse=True))[0][0]
 
     def center_of_mass(self, exclude=None):
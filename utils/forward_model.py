@@ -0,0 +1,305 @@
+import numpy as np
+
+import hlt
+from hlt import constants, physics
+from hlt.columns import NO_ID
+
+UNDOCKED = hlt.entity.Ship.DockingStatus.UNDOCKED.value
+DOCKING = hlt.entity.Ship.DockingStatus.DOCKING.value
+DOCKED = hlt.entity.Ship.DockingStatus.DOCKED.value
+UNDOCKING = hlt.entity.Ship.DockingStatus.UNDOCKING.value
+
+
+class ForwardModel:
+    """
+    One-turn simulator of the current frame, running the movement, collision and combat rules of hlt.physics (the
+    kernels of the local engine) on the ship columns of the frame. Everything the commands cannot change, the ship
+    pairs close enough to meet, their offsets and who may fire, is computed once per frame; every prediction then
+    only applies a command list and steps, so several alternatives can be tried before calling send_command_queue.
+
+    Only our own commands are known: enemy ships are assumed to stand still, and their weapons fire as usual.
+    Production and spawning are not simulated, a prediction only covers the ships of the frame.
+
+    :ivar game_map: The frame the model was built from
+    """
+
+    def __init__(self, game_map: hlt.game_map.Map):
+        self.game_map = game_map
+        ships = game_map.ship_columns()
+        planets = game_map.planet_columns()
+        self._ships = ships
+        # Keyed by the id as written in the commands, which saves parsing it
+        self._own_rows = {str(ship_id): row for row, (ship_id, owner) in
+                          enumerate(zip(ships.id.tolist(), ships.owner.tolist())) if owner == game_map.my_id}
+
+        # Planets are indexed by id, as a batch of one game for the physics kernels
+        num_planets = int(planets.id.max()) + 1 if len(planets) else 0
+        self._planet_alive = np.zeros((1, num_planets), dtype=np.bool_)
+        self._planet_x = np.zeros((1, num_planets))
+        self._planet_y = np.zeros((1, num_planets))
+        self._planet_radius = np.zeros((1, num_planets))
+        self._planet_health = np.zeros(num_planets, dtype=np.int64)
+        self._planet_alive[0, planets.id] = True
+        self._planet_x[0, planets.id] = planets.x
+        self._planet_y[0, planets.id] = planets.y
+        self._planet_radius[0, planets.id] = planets.radius
+        self._planet_health[planets.id] = planets.health
+        self._planet_owner = np.full(num_planets, NO_ID, dtype=np.int64)
+        self._planet_owner[planets.id] = planets.owner
+        self._planet_spots = np.zeros(num_planets, dtype=np.int64)
+        self._planet_spots[planets.id] = planets.num_docking_spots
+        attached = (ships.docking_status != UNDOCKED) & (ships.planet != NO_ID)
+        self._occupied = np.bincount(ships.planet[attached], minlength=num_planets)
+
+        self._games = np.zeros(len(ships), dtype=np.int64)
+        self._can_fire = (ships.docking_status == UNDOCKED) & (ships.cooldown <= 1)
+        first, second = physics.nearby_pairs(self._games, ships.x, ships.y, game_map.width,
+                                             physics.INTERACTION_RADIUS)
+        dx, dy = ships.x[first] - ships.x[second], ships.y[first] - ships.y[second]
+        distance2 = dx * dx + dy * dy
+        # Pairs of ships standing still meet at time 0 if they are within reach already, never otherwise: only
+        # the pairs with a moving ship are solved for each prediction, the others are sorted out here
+        enemies = ships.owner[first] != ships.owner[second]
+        in_range = enemies & (distance2 <= physics.ATTACK_RADIUS * physics.ATTACK_RADIUS)
+        self._pairs = (first, second, dx, dy, distance2)
+        self._approaching = enemies & ~in_range
+        self._touching = distance2 <= physics.SHIP_COLLISION_RADIUS * physics.SHIP_COLLISION_RADIUS
+        self._in_range = np.flatnonzero(in_range)
+        self._in_range_time = np.zeros(len(self._in_range))
+
+    def predict(self, command_queue):
+        """
+        Simulate the next turn. Commands for ships we do not own, and any command after the first one for the same
+        ship, are ignored, as the engine does.
+
+        :param list[str] command_queue: Our commands, as generated by Ship.thrust / dock / undock
+        :return: The predicted outcome
+        :rtype: Prediction
+        """
+        ships = self._ships
+        count = len(ships)
+        status = ships.docking_status.copy()
+        progress = ships.docking_progress.copy()
+        planet = ships.planet.copy()
+
+        issued = set()
+        thrusts, arguments = [], []
+        docks = []
+        for command in command_queue:
+            kind, ship_id, *values = command.split()
+            row = self._own_rows.get(ship_id)
+            if row is None or row in issued:
+                continue
+            issued.add(row)
+            if kind == "t":
+                thrusts.append(row)
+                arguments += values
+            elif kind == "d":
+                docks.append((row, int(values[0])))
+            elif status[row] == DOCKED:
+                status[row] = UNDOCKING
+                progress[row] = constants.DOCK_TURNS
+        if docks:
+            self._dock(docks, status, progress, planet)
+
+        vx = np.zeros(count)
+        vy = np.zeros(count)
+        if thrusts:
+            rows = np.array(thrusts)
+            ok = status[rows] == UNDOCKED
+            rows = rows[ok]
+            magnitude, angle = np.array(arguments, dtype=np.float64).reshape(-1, 2)[ok].T
+            magnitude = np.minimum(np.maximum(magnitude, 0), constants.MAX_SPEED)
+            radians = np.radians(angle)
+            vx[rows] = magnitude * np.cos(radians)
+            vy[rows] = magnitude * np.sin(radians)
+
+        first, second = self._pairs[:2]
+        moving = (vx != 0) | (vy != 0)
+        active = np.flatnonzero(moving[first] | moving[second] | self._touching)
+        first, second, dx, dy, distance2 = (values[active] for values in self._pairs)
+        dvx, dvy = vx[first] - vx[second], vy[first] - vy[second]
+        speed2, dot = dvx * dvx + dvy * dvy, dx * dvx + dy * dvy
+        dead_at, planet_damage = physics.resolve_collisions(
+            self._planet_x, self._planet_y, self._planet_radius, self._planet_alive,
+            self.game_map.width, self.game_map.height, self._games, ships.x, ships.y, vx, vy, ships.health,
+            first, second, physics.solve_contact(speed2, dot, distance2, physics.SHIP_COLLISION_RADIUS))
+
+        # Enemies in range from the start, and the enemies a moving ship gets in range of
+        attacking, t_range = self._in_range, self._in_range_time
+        approaching = np.flatnonzero(self._approaching[active])
+        if len(approaching):
+            t_approach = physics.solve_contact(speed2[approaching], dot[approaching], distance2[approaching],
+                                               physics.ATTACK_RADIUS)
+            meet = np.isfinite(t_approach)
+            attacking = np.concatenate([attacking, active[approaching[meet]]])
+            t_range = np.concatenate([t_range, t_approach[meet]])
+        first, second, dx, dy, _ = (values[attacking] for values in self._pairs)
+        dvx, dvy = vx[first] - vx[second], vy[first] - vy[second]
+        # Ships that started (un)docking this turn hold fire
+        can_fire = self._can_fire & (status == UNDOCKED) if docks else self._can_fire
+        fired, attack_damage = physics.resolve_attacks(ships.owner, can_fire, dead_at, first, second, dx, dy,
+                                                       dvx, dvy, t_range)
+
+        collided = np.isfinite(dead_at)
+        damage = np.where(collided, ships.health, np.minimum(attack_damage, ships.health))
+        move = np.where(collided, dead_at, 1.0)
+        x = ships.x + vx * move
+        y = ships.y + vy * move
+        remaining = ships.health - damage
+        if planet_damage.any():
+            self._explode(planet_damage[0], x, y, status, planet, remaining, damage)
+
+        destroyed = remaining <= 0
+        for counting, done in ((DOCKING, DOCKED), (UNDOCKING, UNDOCKED)):
+            rows = (status == counting) & ~destroyed
+            progress[rows] -= 1
+            finished = rows & (progress <= 0)
+            status[finished] = done
+            progress[finished] = 0
+        return Prediction(ships, x, y, remaining, damage, status, destroyed, collided)
+
+    def _dock(self, docks, status, progress, planet):
+        """
+        Start docking, with the rule of engine.rules.dock: the ship must be undocked and within DOCK_RADIUS of
+        the surface of a living planet that is unowned or ours and has a free spot. Requests are served in row
+        order.
+
+        :param list[(int, int)] docks: (row, planet id) of every dock command
+        :return: nothing
+        """
+        ships = self._ships
+        free = self._planet_spots - self._occupied
+        for row, target in sorted(docks):
+            if status[row] != UNDOCKED or not 0 <= target < len(free) or not self._planet_alive[0, target]:
+                continue
+            if self._planet_owner[target] not in (NO_ID, self.game_map.my_id) or free[target] <= 0:
+                continue
+            dx = ships.x[row] - self._planet_x[0, target]
+            dy = ships.y[row] - self._planet_y[0, target]
+            reach = self._planet_radius[0, target] + constants.DOCK_RADIUS + constants.SHIP_RADIUS
+            if dx * dx + dy * dy > reach * reach:
+                continue
+            free[target] -= 1
+            status[row] = DOCKING
+            progress[row] = constants.DOCK_TURNS
+            planet[row] = target
+
+    def _explode(self, planet_damage, x, y, status, planet, health, damage):
+        """
+        Apply collision damage to planets and the blast of every planet destroyed by it.
+
+        :param numpy.ndarray health: Health of the ships after the other damage of the turn, updated
+        :param numpy.ndarray damage: Damage taken by the ships this turn, updated
+        :return: nothing
+        """
+        exploded = self._planet_alive[0] & (self._planet_health - planet_damage <= 0)
+        for target in np.flatnonzero(exploded):
+            rows = np.flatnonzero(health > 0)
+            dx = x[rows] - self._planet_x[0, target]
+            dy = y[rows] - self._planet_y[0, target]
+            surface = np.sqrt(dx * dx + dy * dy) - self._planet_radius[0, target]
+            attached = (planet[rows] == target) & (status[rows] != UNDOCKED)
+            blast = np.minimum(physics.explosion_damage(surface, attached), health[rows])
+            health[rows] -= blast
+            damage[rows] += blast
+
+
+def predict(game_map: hlt.game_map.Map, command_queue):
+    """
+    Predict the next turn of a frame. Use ForwardModel directly to evaluate several command lists on one frame.
+
+    :param hlt.game_map.Map game_map: The current frame
+    :param list[str] command_queue: Our commands
+    :return: The predicted outcome
+    :rtype: Prediction
+    """
+    return ForwardModel(game_map).predict(command_queue)
+
+
+class Prediction:
+    """
+    State of the ships of a frame after one simulated turn, as arrays in the row order of the ship columns.
+
+    :ivar x: x-coordinate at the end of the turn
+    :ivar y: y-coordinate at the end of the turn
+    :ivar health_after: Health at the end of the turn, 0 if destroyed
+    :ivar damage_taken: Damage taken during the turn
+    :ivar status: DockingStatus value at the end of the turn
+    :ivar destroyed: Mask of the ships destroyed during the turn
+    :ivar collided: Mask of the ships destroyed by a collision during the turn
+    """
+
+    def __init__(self, ships, x, y, health, damage, status, destroyed, collided):
+        self._ships = ships
+        self.x = x
+        self.y = y
+        self.health_after = health
+        self.damage_taken = damage
+        self.status = status
+        self.destroyed = destroyed
+        self.collided = collided
+
+    def position(self, ship_id):
+        """
+        :param int ship_id: Id of a ship of the frame
+        :return: Where the ship ends the turn (where it was destroyed, for destroyed ships)
+        :rtype: hlt.entity.Position
+        """
+        row = self._ships.rows[ship_id]
+        return hlt.entity.Position(float(self.x[row]), float(self.y[row]))
+
+    def health(self, ship_id):
+        """
+        :param int ship_id: Id of a ship of the frame
+        :return: Health at the end of the turn, 0 if destroyed
+        :rtype: int
+        """
+        return int(self.health_after[self._ships.rows[ship_id]])
+
+    def damage(self, ship_id):
+        """
+        :param int ship_id: Id of a ship of the frame
+        :return: Damage taken during the turn
+        :rtype: int
+        """
+        return int(self.damage_taken[self._ships.rows[ship_id]])
+
+    def docking_status(self, ship_id):
+        """
+        :param int ship_id: Id of a ship of the frame
+        :return: Docking status at the end of the turn
+        :rtype: hlt.entity.Ship.DockingStatus
+        """
+        return hlt.entity.Ship.DockingStatus(int(self.status[self._ships.rows[ship_id]]))
+
+    def is_destroyed(self, ship_id):
+        """
+        :param int ship_id: Id of a ship of the frame
+        :rtype: bool
+        """
+        return bool(self.destroyed[self._ships.rows[ship_id]])
+
+    def destroyed_ships(self, player_id=None):
+        """
+        :param int player_id: Only return ships of this player (optional)
+        :return: Ids of the ships destroyed during the turn
+        :rtype: list[int]
+        """
+        return self._ids(self.destroyed, player_id)
+
+    def collided_ships(self, player_id=None):
+        """
+        Ships lost to a collision with a ship, a planet or the map border, e.g. to check our own commands for
+        self-collisions before sending them.
+
+        :param int player_id: Only return ships of this player (optional)
+        :return: Ids of the ships destroyed by a collision during the turn
+        :rtype: list[int]
+        """
+        return self._ids(self.collided, player_id)
+
+    def _ids(self, mask, player_id):
+        if player_id is not None:
+            mask = mask & (self._ships.owner == player_id)
+        return self._ships.id[mask].tolist()
@@ -0,0 +1,184 @@
+from collections import deque
+import logging
+import numpy as np
+import hlt
+
+#: Per-ship values stored for every frame, in column order
+SHIP_FIELDS = ("x", "y", "health", "owner", "docking_status", "planet")
+#: Per-planet values stored for every frame, in column order
+PLANET_FIELDS = ("owner", "health", "num_docked", "current_production", "remaining_resources")
+
+
+class FrameHistory:
+    """
+    Fixed-capacity ring buffer of past frames, stored as compact numeric arrays instead of Map objects.
+
+    Every entity id is bound to a slot (a column of the buffer) for as long as it lives, so the time series of an
+    entity is a strided read of one slot across frames. Slots of destroyed ships are recycled oldest-first, which
+    keeps their history readable until the slot is handed to a new ship. All arrays are allocated up front, so memory stays flat
+    for the whole game no matter how many ships spawn and die.
+
+    :ivar capacity: Number of frames kept
+    :ivar max_ships: Number of ships that can be tracked at the same time
+    :ivar max_planets: Number of planets that can be tracked
+    """
+
+    def __init__(self, capacity=32, max_ships=1024, max_planets=64):
+        self.capacity = capacity
+        self.max_ships = max_ships
+        self.max_planets = max_planets
+        self._turns = np.full(capacity, -1, dtype=np.int32)
+        self._ship_ids = np.full((capacity, max_ships), hlt.columns.NO_ID, dtype=np.int32)
+        self._ships = np.zeros((capacity, max_ships, len(SHIP_FIELDS)), dtype=np.float32)
+        self._planet_ids = np.full((capacity, max_planets), hlt.columns.NO_ID, dtype=np.int32)
+        self._planets = np.zeros((capacity, max_planets, len(PLANET_FIELDS)), dtype=np.float32)
+        self._ship_slots = {}
+        self._retired_ship_slots = {}
+        self._planet_slots = {}
+        self._free_ship_slots = deque(range(max_ships))
+        self._slot_ship = np.full(max_ships, hlt.columns.NO_ID, dtype=np.int64)
+        self._warned_full = set()
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, game_map, turn):
+        """
+        Store a frame, overwriting the oldest one once the buffer is full.
+
+        :param hlt.game_map.Map game_map: The parsed frame
+        :param int turn: Turn number of the frame
+        :return: nothing
+        """
+        frame = self._head
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self._turns[frame] = turn
+
+        ships = game_map.ship_columns()
+        for ship_id in self._ship_slots.keys() - ships.rows.keys():
+            slot = self._ship_slots.pop(ship_id)
+            self._retired_ship_slots[ship_id] = slot
+            self._free_ship_slots.append(slot)
+        rows, slots = self._bind_ship_slots(ships.id.tolist())
+
+        self._ship_ids[frame] = hlt.columns.NO_ID
+        self._ship_ids[frame, slots] = ships.id[rows]
+        self._ships[frame, slots] = np.column_stack(
+            [ships.x, ships.y, ships.health, ships.owner, ships.docking_status, ships.planet])[rows]
+
+        planets = game_map.planet_columns()
+        rows, slots = self._bind_planet_slots(planets.id.tolist())
+        self._planet_ids[frame] = hlt.columns.NO_ID
+        self._planet_ids[frame, slots] = planets.id[rows]
+        self._planets[frame, slots] = np.column_stack(
+            [planets.owner, planets.health, planets.num_docked, planets.current_production,
+             planets.remaining_resources])[rows]
+
+    def _bind_ship_slots(self, ship_ids):
+        """
+        Find or allocate the slot of every ship of a frame.
+
+        :param list[int] ship_ids: Ids of the ships of the frame, in row order
+        :return: Rows of the ships that have a slot, and their slots
+        :rtype: (list[int], list[int])
+        """
+        rows, slots = [], []
+        for row, ship_id in enumerate(ship_ids):
+            slot = self._ship_slots.get(ship_id)
+            if slot is None:
+                if not self._free_ship_slots:
+                    self._warn_full("ships", ship_id)
+                    continue
+                slot = self._free_ship_slots.popleft()
+                # The slot may still hold the history of a dead ship: forget that ship
+                self._retired_ship_slots.pop(int(self._slot_ship[slot]), None)
+                self._retired_ship_slots.pop(ship_id, None)
+                self._slot_ship[slot] = ship_id
+                self._ship_slots[ship_id] = slot
+            rows.append(row)
+            slots.append(slot)
+        return rows, slots
+
+    def _bind_planet_slots(self, planet_ids):
+        """
+        Find or allocate the slot of every planet of a frame. Planets are never created during a game, so their
+        slots are never recycled.
+
+        :param list[int] planet_ids: Ids of the planets of the frame, in row order
+        :return: Rows of the planets that have a slot, and their slots
+        :rtype: (list[int], list[int])
+        """
+        rows, slots = [], []
+        for row, planet_id in enumerate(planet_ids):
+            slot = self._planet_slots.get(planet_id)
+            if slot is None:
+                if len(self._planet_slots) >= self.max_planets:
+                    self._warn_full("planets", planet_id)
+                    continue
+                slot = self._planet_slots[planet_id] = len(self._planet_slots)
+            rows.append(row)
+            slots.append(slot)
+        return rows, slots
+
+    def _warn_full(self, kind, entity_id):
+        """
+        Log the first entity of a kind left untracked because its slots are used up; later ones are skipped
+        silently, so a full buffer does not flood the log every frame.
+
+        :param str kind: "ships" or "planets"
+        :param int entity_id: Id of the untracked entity
+        :return: nothing
+        """
+        if kind not in self._warned_full:
+            self._warned_full.add(kind)
+            logging.warning("FrameHistory is full, not tracking {} {} and any further {}".format(
+                kind[:-1], entity_id, kind))
+
+    def _frames(self):
+        """
+        :return: Buffer indices of the stored frames, oldest first
+        :rtype: numpy.ndarray
+        """
+        return (np.arange(self._size) + self._head - self._size) % self.capacity
+
+    def turns(self):
+        """
+        :return: Turn numbers of the stored frames, oldest first
+        :rtype: numpy.ndarray
+        """
+        return self._turns[self._frames()]
+
+    def ship_series(self, ship_id, field=None):
+        """
+        Time series of a ship over the stored frames in which it was alive.
+
+        :param int ship_id: The ship id
+        :param str field: One of SHIP_FIELDS, or None for all of them
+        :return: Turn numbers, and the values as an array of shape (turns,) or (turns, len(SHIP_FIELDS))
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        slot = self._ship_slots.get(ship_id, self._retired_ship_slots.get(ship_id))
+        return self._series(slot, ship_id, self._ship_ids, self._ships, SHIP_FIELDS, field)
+
+    def planet_series(self, planet_id, field=None):
+        """
+        Time series of a planet over the stored frames in which it existed.
+
+        :param int planet_id: The planet id
+        :param str field: One of PLANET_FIELDS, or None for all of them
+        :return: Turn numbers, and the values as an array of shape (turns,) or (turns, len(PLANET_FIELDS))
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        return self._series(self._planet_slots.get(planet_id), planet_id, self._planet_ids, self._planets,
+                            PLANET_FIELDS, field)
+
+    def _series(self, slot, entity_id, ids, values, fields, field):
+        columns = slice(None) if field is None else fields.index(field)
+        if slot is None:
+            return np.empty(0, dtype=self._turns.dtype), values[:0, 0, columns]
+        frames = self._frames()
+        present = ids[frames, slot] == entity_id
+        return self._turns[frames[present]], values[frames[present], slot, columns]
@@ -2,6 +2,8 @@
 
 import math
 
+import numpy as np
+
 
 class Point:
     def __init__(self, x, y):
@@ -81,3 +83,89 @@ def min_dist(seg1, seg2):
     delta = seg2.d_vect() - seg1.d_vect()
     seg_eff = Seg(start, start + delta)
     return ps_dist(Point(0, 0), seg_eff)
+
+
+# Point Segment Distance over arrays: the points (px, py) and the segments (x1, y1)-(x2, y2) are broadcast against
+# each other. The operations are those of ps_dist, in the same order, so every distance is the one ps_dist gives;
+# squares go through np.float_power, which rounds like the ** operator where x * x and np.power may not.
+def ps_dist_array(px, py, x1, y1, x2, y2):
+    v1x = px - x1
+    v1y = py - y1
+    v2x = x2 - x1
+    v2y = y2 - y1
+    d = np.float_power(v2x, 2) + np.float_power(v2y, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (v1x * v2x + v1y * v2y) / d
+    t = np.where(d == 0, 0.0, np.clip(t, 0.0, 1.0))
+    qx = (1 - t) * x1 + t * x2
+    qy = (1 - t) * y1 + t * y2
+    return np.sqrt(np.float_power(qx - px, 2) + np.float_power(qy - py, 2))
+
+
+# Min Distance over arrays, see min_dist and ps_dist_array: paths (ax1, ay1)-(ax2, ay2) against (bx1, by1)-(bx2, by2)
+def min_dist_array(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2):
+    start_x = bx1 - ax1
+    start_y = by1 - ay1
+    delta_x = (bx2 - bx1) - (ax2 - ax1)
+    delta_y = (by2 - by1) - (ay2 - ay1)
+    return ps_dist_array(0.0, 0.0, start_x, start_y, start_x + delta_x, start_y + delta_y)
+
+
+# Headings, in degrees, at which a path of the given length from the origin comes within radius of an object that
+# starts at (ax, ay) and moves by (dx, dy) meanwhile, (0, 0) if it stays in place: the headings min_dist tells
+# apart. Returns the blocked arcs as (start, end) pairs, 0 <= start < 360 and start <= end <= start + 360.
+# In the frame of the object the path is Seg(a, a + (dx, dy) - polar(length, heading)), whose end runs along a
+# circle as the heading turns. The path touches the disc of radius around the origin when its end is in the disc,
+# or when it points between the tangents from a to the disc and its end is out of the circle with diameter a to the
+# origin (the point of the path closest to the origin is then inside it). The headings where the end crosses those
+# two circles and the tangent lines split the headings into arcs that are all blocked or all free.
+def blocked_headings(ax, ay, dx, dy, length, radius):
+    a2 = ax ** 2 + ay ** 2
+    ex = ax + dx
+    ey = ay + dy
+    if a2 <= radius ** 2 or length <= 0:
+        # Blocked from the start, or the end does not move with the heading
+        return [(0.0, 360.0)] if ps_dist(Point(0, 0), Seg(Point(ax, ay), Point(ex, ey))) <= radius else []
+    a = math.sqrt(a2)
+    if a - radius > length + math.sqrt(dx ** 2 + dy ** 2):
+        return []
+    if not dx and not dy:
+        # A path toward an object in place hits it within the tangents when it is longer than they are, else
+        # when its end is in the disc
+        if length ** 2 >= a2 - radius ** 2:
+            spread = math.asin(radius / a)
+        else:
+            spread = math.acos(min((length ** 2 + a2 - radius ** 2) / (2 * length * a), 1.0))
+        start = (math.degrees(math.atan2(ay, ax) - spread)) % 360
+        return [(start, start + 2 * math.degrees(spread))]
+
+    crossings = []
+    for cx, cy, r in ((0.0, 0.0, radius), (ax / 2, ay / 2, a / 2)):
+        fx = ex - cx
+        fy = ey - cy
+        f = math.sqrt(fx ** 2 + fy ** 2)
+        if f:
+            k = (f ** 2 + length ** 2 - r ** 2) / (2 * length * f)
+            if -1 <= k <= 1:
+                crossings += [math.atan2(fy, fx) - math.acos(k), math.atan2(fy, fx) + math.acos(k)]
+    to_origin = math.atan2(-ay, -ax)
+    spread = math.asin(radius / a)
+    for tangent in (to_origin - spread, to_origin + spread):
+        nx = -math.sin(tangent)
+        ny = math.cos(tangent)
+        k = (nx * dx + ny * dy) / length
+        if -1 <= k <= 1:
+            crossings += [math.atan2(ny, nx) - math.acos(k), math.atan2(ny, nx) + math.acos(k)]
+
+    def blocked(heading):
+        end = Point(ex - length * math.cos(math.radians(heading)), ey - length * math.sin(math.radians(heading)))
+        return ps_dist(Point(0, 0), Seg(Point(ax, ay), end)) <= radius
+
+    crossings = sorted(set(math.degrees(c) % 360 for c in crossings))
+    if not crossings:
+        return [(0.0, 360.0)] if blocked(0.0) else []
+    arcs = []
+    for start, end in zip(crossings, crossings[1:] + [crossings[0] + 360]):
+        if blocked((start + end) / 2):
+            arcs.append((start, end))
+    return arcs
@@ -1,10 +1,13 @@
 import hlt
 import math
 from hlt.entity import Position, Ship, Planet, Entity
-from utils.geometry import Point, Seg, min_dist, ps_dist
+from utils.geometry import Point, Seg, blocked_headings, min_dist, min_dist_array, ps_dist, ps_dist_array
 from hlt.constants import *
 from utils.feature_collector import FeatureCollector
 import logging
+from bisect import bisect_right
+
+import numpy as np
 
 
 def unite_for_rush(ship: Ship, target: Ship, fc: FeatureCollector):
@@ -173,6 +176,162 @@ def undocking_thrust(ship: Ship, target: Position, fc: FeatureCollector, speed=h
     return ship.thrust(speed, angle)
 
 
+def gather_obstacles(ship, gmap, dist):
+    """
+    Entities a ship may run into on its way: planets and docked allied ships closer than the target, and undocked
+    allied ships that can get in the way this turn. Allied ships come from the neighbor lists of the map when
+    their range allows it, which gives the same entities in the same order as scanning all allied ships.
+
+    :param ship: Allied ship
+    :param gmap: hlt.game_map
+    :param dist: Distance to the target
+    :return: List of entities on the way
+    """
+    my_ships = gmap.get_me().all_ships()
+    neighbors = gmap.neighbor_list()
+    near_ships = neighbors.ships_near(ship, owner=gmap.my_id)
+    if near_ships is None:
+        near_ships = my_ships
+    dships = [s for s in (near_ships if dist <= neighbors.cutoff else my_ships)
+              if not (s.docking_status == Ship.DockingStatus.UNDOCKED)]
+    uships = [s for s in near_ships if (s.docking_status == Ship.DockingStatus.UNDOCKED)]
+    obs = [e for e in gmap.all_planets() + dships
+           if ship.calculate_distance_between(e) - ship.radius - e.radius <= dist]
+    obs.extend([e for e in uships if e != ship
+                and ship.calculate_distance_between(e) - ship.radius - e.radius <= MAX_SPEED * 2])
+    return obs
+
+
+#: Directions of the candidate moves for every integer angle, the values Point.polar uses
+_COS = np.array([math.cos(math.radians(ang)) for ang in range(360)])
+_SIN = np.array([math.sin(math.radians(ang)) for ang in range(360)])
+#: Angles tested by the first array pass of first_free_move, and growth factor of the later ones
+_FIRST_CHUNK = 8
+_CHUNK_GROWTH = 4
+#: Degrees added on both sides of the blocked arcs of interval_nav, against rounding in their ends
+_ARC_PAD = 1e-6
+
+
+def split_obstacles(obs, move_table):
+    """
+    :param obs: List of entities on the way
+    :param move_table: Dict of moves of ships
+    :return: Planets and docked ships, which stay in place this turn; and the other obstacles, undocked ships and
+        ships with a move in the move table
+    """
+    static, moving = [], []
+    for e in obs:
+        if e in move_table or (type(e) == Ship and e.docking_status == Ship.DockingStatus.UNDOCKED):
+            moving.append(e)
+        else:
+            static.append(e)
+    return static, moving
+
+
+def free_speed(ship, dist, move_ang, speeds, static, moving, move_table, margin=0):
+    """
+    First speed, in the order of speeds, at which a move at one angle runs into none of the obstacles.
+
+    :param ship: Allied ship
+    :param dist: Distance to the target
+    :param move_ang: Angle of the move, in whole degrees
+    :param speeds: Speeds to try, in order
+    :param static: Planets and docked ships, which must be clear of the full course to the target
+    :param moving: Undocked ships and ships in the move table, which must be clear of the move of this turn
+    :param move_table: Dict of moves of ships
+    :param margin: Extra distance to keep from planets and docked ships
+    :return: The speed, None if the move collides at every speed
+    """
+    full_move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + Point.polar(dist, move_ang))
+    for e in static:
+        if ps_dist(Point(e.x, e.y), full_move) <= ship.radius + e.radius + .00001 + margin:
+            return None
+    for spd in speeds:
+        move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + Point.polar(spd, move_ang))
+        for e in moving:
+            collide_dist = ship.radius + e.radius + .00001
+            if e in move_table and min_dist(move, move_table[e]) <= collide_dist:
+                break
+            elif not e in move_table and ps_dist(Point(e.x, e.y), move) <= collide_dist:
+                break
+        else:
+            return spd
+    return None
+
+
+def first_free_move(ship, dist, angle, angs, speeds, obs, move_table, margin=0):
+    """
+    First candidate move, angle by angle in the order of angs and then speed by speed, that runs into none of the
+    obstacles: the move the loops of nav and rush_nav used to stop at. The first angle is tested with free_speed;
+    the others with array operations, a chunk of angles at a time, the chunks growing as long as nothing is free.
+    Planets and docked ships must be clear of the full course to the target, with margin; moving ships
+    and ships in the move table only of the move of this turn.
+
+    :param ship: Allied ship
+    :param dist: Distance to the target
+    :param angle: Angle to the target, in whole degrees
+    :param angs: Deviations from the angle to try, in order
+    :param speeds: Speeds to try for every angle, in order
+    :param obs: List of entities on the way
+    :param move_table: Dict of moves of ships
+    :param margin: Extra distance to keep from planets and docked ships
+    :return: Angle and speed of the move, (None, None) if every candidate collides
+    """
+    if not angs or not speeds:
+        return None, None
+    static, moving = split_obstacles(obs, move_table)
+    # The course straight to the target is free most of the time, and cheaper to test alone without arrays
+    move_ang = (angle + angs[0]) % 360
+    spd = free_speed(ship, dist, move_ang, speeds, static, moving, move_table, margin)
+    if spd is not None:
+        return move_ang, spd
+
+    unplanned = [e for e in moving if e not in move_table]
+    planned = [e for e in moving if e in move_table]
+    static_x = np.array([e.x for e in static])
+    static_y = np.array([e.y for e in static])
+    static_limit = np.array([ship.radius + e.radius + .00001 for e in static]) + margin
+    unplanned_x = np.array([e.x for e in unplanned])
+    unplanned_y = np.array([e.y for e in unplanned])
+    unplanned_limit = np.array([ship.radius + e.radius + .00001 for e in unplanned])
+    planned_moves = [move_table[e] for e in planned]
+    planned_x1 = np.array([m.p1.x for m in planned_moves])
+    planned_y1 = np.array([m.p1.y for m in planned_moves])
+    planned_x2 = np.array([m.p2.x for m in planned_moves])
+    planned_y2 = np.array([m.p2.y for m in planned_moves])
+    planned_limit = np.array([ship.radius + e.radius + .00001 for e in planned])
+    spds = np.array(speeds)
+
+    first = 1
+    size = _FIRST_CHUNK
+    while first < len(angs):
+        move_angs = (angle + np.array(angs[first:first + size])) % 360
+        cos, sin = _COS[move_angs], _SIN[move_angs]
+        free = np.ones((len(move_angs), len(speeds)), dtype=bool)
+        if static:
+            end_x = (ship.x + dist * cos)[:, None]
+            end_y = (ship.y + dist * sin)[:, None]
+            hits = ps_dist_array(static_x, static_y, ship.x, ship.y, end_x, end_y) <= static_limit
+            free &= ~hits.any(axis=1)[:, None]
+        if unplanned or planned:
+            end_x = (ship.x + spds[None, :] * cos[:, None])[:, :, None]
+            end_y = (ship.y + spds[None, :] * sin[:, None])[:, :, None]
+            if unplanned:
+                hits = ps_dist_array(unplanned_x, unplanned_y, ship.x, ship.y, end_x, end_y) <= unplanned_limit
+                free &= ~hits.any(axis=2)
+            if planned:
+                hits = min_dist_array(ship.x, ship.y, end_x, end_y, planned_x1, planned_y1, planned_x2,
+                                      planned_y2) <= planned_limit
+                free &= ~hits.any(axis=2)
+        found = np.flatnonzero(free)
+        if len(found):
+            row, column = divmod(int(found[0]), len(speeds))
+            return int(move_angs[row]), speeds[column]
+        first += size
+        size *= _CHUNK_GROWTH
+    return None, None
+
+
 def nav(ship, targ, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviation=60):
     # Source: https://github.com/Mvwivs/halite2-deep-rl-bot
 
@@ -181,41 +340,171 @@ def nav(ship, targ, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviation=60)
     speed = speed if (dist >= speed) else int(dist)
 
     if obs == None:
-        dships = [s for s in gmap.get_me().all_ships() if not (s.docking_status == Ship.DockingStatus.UNDOCKED)]
-        uships = [s for s in gmap.get_me().all_ships() if (s.docking_status == Ship.DockingStatus.UNDOCKED)]
-        obs = [e for e in gmap.all_planets() + dships
-               if ship.calculate_distance_between(e) - ship.radius - e.radius <= dist]
-        obs.extend([e for e in uships if e != ship
-                    and ship.calculate_distance_between(e) - ship.radius - e.radius <= MAX_SPEED * 2])
-
-    obs = sorted(obs, key=lambda t: ship.calculate_distance_between(t))
+        obs = gather_obstacles(ship, gmap, dist)
+
     angs = [int(n / 2) if n % 2 == 0 else -int(n / 2) for n in range(1, max_deviation * 2 + 2)]
     speeds = [speed, round(speed / 2)]
 
-    for d_ang in angs:
-        for spd in speeds:
-            move_ang = (angle + d_ang) % 360
-            d = Point.polar(spd, move_ang)
-            move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + d)
+    move_ang, spd = first_free_move(ship, dist, angle, angs, speeds, obs, move_table, margin=0)
+    if move_ang is None:
+        return None, None
+    move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + Point.polar(spd, move_ang))
+    return ship.thrust(spd, move_ang), move
 
-            d = Point.polar(dist, move_ang)
-            full_move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + d)
 
-            for e in obs:
+def closest_free_deviation(arcs, angle, max_deviation):
+    """
+    Whole deviation from an angle that is out of every blocked arc, smallest first and positive before negative
+    like the angles nav tries.
+
+    :param arcs: Blocked arcs of headings, (start, end) pairs in degrees as given by geometry.blocked_headings
+    :param angle: Angle to the target, in whole degrees
+    :param max_deviation: Max deviation of angle
+    :return: The deviation in degrees, None if every one up to max_deviation is blocked
+    """
+    intervals = []
+    for start, end in arcs:
+        if end - start >= 360:
+            return None
+        low = (start - angle + 180) % 360 - 180 - _ARC_PAD
+        high = low + (end - start) + 2 * _ARC_PAD
+        intervals.append((low, high))
+        if high > 180:
+            intervals.append((low - 360, high - 360))
+        elif low < -180:
+            intervals.append((low + 360, high + 360))
+    intervals.sort()
+    lows, highs = [], []
+    for low, high in intervals:
+        if highs and low <= highs[-1]:
+            highs[-1] = max(highs[-1], high)
+        else:
+            lows.append(low)
+            highs.append(high)
+
+    def covering(deviation):
+        index = bisect_right(lows, deviation) - 1
+        return index if index >= 0 and deviation <= highs[index] else None
+
+    above = below = 0
+    index = covering(0)
+    if index is None:
+        return 0
+    while index is not None:
+        above = math.floor(highs[index]) + 1
+        index = covering(above)
+    index = covering(0)
+    while index is not None:
+        below = math.ceil(lows[index]) - 1
+        index = covering(below)
+    if above <= -below and above <= max_deviation:
+        return above
+    if -below <= max_deviation:
+        return below
+    return None
+
+
+def interval_nav(ship, targ, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviation=60):
+    """
+    nav without trial and error. When the course straight to the target is blocked, the headings each obstacle
+    blocks are found in closed form with geometry.blocked_headings, per speed for the moving ones, and the whole
+    angle closest to the target out of all of them is taken, deviations and speeds in the order nav tries them.
+    That costs O(obstacles log obstacles) per ship instead of a test per obstacle, angle and speed. The move found
+    is checked with the collision test of nav, which decides if rounding in the arc ends ever lets one through.
+
+    :param ship: Allied ship
+    :param targ: Position
+    :param gmap: hlt.game_map
+    :param obs: List of entities on the way
+    :param move_table: Dict of moves of ships
+    :param speed: Speed of allied ship
+    :param max_deviation: Max deviation of angle
+    :return: Thrust command and move if there is available move without collision, None otherwise
+    """
+    dist = ship.calculate_distance_between(targ)
+    angle = round(ship.calculate_angle_between(targ))
+    speed = speed if (dist >= speed) else int(dist)
+
+    if obs == None:
+        obs = gather_obstacles(ship, gmap, dist)
+
+    speeds = [speed, round(speed / 2)]
+    static, moving = split_obstacles(obs, move_table)
+    spd = free_speed(ship, dist, angle % 360, speeds, static, moving, move_table)
+    if spd is not None:
+        move_ang = angle % 360
+    else:
+        static_arcs = []
+        for e in static:
+            static_arcs += blocked_headings(e.x - ship.x, e.y - ship.y, 0, 0, dist, ship.radius + e.radius + .00001)
+        best = None
+        for candidate in speeds:
+            arcs = list(static_arcs)
+            for e in moving:
                 collide_dist = ship.radius + e.radius + .00001
+                if e in move_table:
+                    other = move_table[e]
+                    arcs += blocked_headings(other.p1.x - ship.x, other.p1.y - ship.y, other.p2.x - other.p1.x,
+                                             other.p2.y - other.p1.y, candidate, collide_dist)
+                else:
+                    arcs += blocked_headings(e.x - ship.x, e.y - ship.y, 0, 0, candidate, collide_dist)
+            d_ang = closest_free_deviation(arcs, angle, max_deviation)
+            if d_ang is not None and (best is None or (abs(d_ang), d_ang < 0) < (abs(best[0]), best[0] < 0)):
+                best = d_ang, candidate
+        if best is None:
+            return None, None
+        move_ang = (angle + best[0]) % 360
+        spd = best[1]
+        if free_speed(ship, dist, move_ang, [spd], static, moving, move_table) is None:
+            return nav(ship, targ, gmap, obs, move_table, speed=speed, max_deviation=max_deviation)
+
+    move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + Point.polar(spd, move_ang))
+    return ship.thrust(spd, move_ang), move
+
+
+def route_nav(ship, targ, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviation=60):
+    """
+    Navigation for long trips behind planets: the target is reached through the waypoints of the visibility graph
+    of the map, and only the first leg of the route goes through nav.
+
+    :param ship: Allied ship
+    :param targ: Position
+    :param gmap: hlt.game_map
+    :param obs: List of entities on the way
+    :param move_table: Dict of moves of ships
+    :param speed: Speed of allied ship
+    :param max_deviation: Max deviation of angle
+    :return: Thrust command and move if there is available move without collision, None otherwise
+    """
+    route = gmap.visibility_graph().route(ship, targ)
+    waypoint = route[0] if route else targ
+    return nav(ship, waypoint, gmap, obs, move_table, speed=speed, max_deviation=max_deviation)
 
-                if e in move_table and min_dist(move, move_table[e]) <= collide_dist:
-                    break
-                elif not e in move_table:
-                    if type(e) == Ship and (e.docking_status == Ship.DockingStatus.UNDOCKED):
-                        if ps_dist(Point(e.x, e.y), move) <= collide_dist:
-                            break
-                    elif ps_dist(Point(e.x, e.y), full_move) <= collide_dist:
-                        break
-            else:
-                return ship.thrust(spd, move_ang), move
 
-    return None, None
+def flow_nav(ship, target, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviation=60):
+    """
+    Navigation to a planet for the expansion phase. Ships whose way to the planet is not straight read their heading
+    from the flow field of the planet, computed once for all ships going there, and nav only avoids collisions
+    around it. Otherwise the ship goes for the closest point of the planet, like go_to_planet.
+
+    :param ship: Allied ship
+    :param target: Planet
+    :param gmap: hlt.game_map
+    :param obs: List of entities on the way
+    :param move_table: Dict of moves of ships
+    :param speed: Speed of allied ship
+    :param max_deviation: Max deviation of angle
+    :return: Thrust command and move if there is available move without collision, None otherwise
+    """
+    closest = ship.closest_point_to(target)
+    heading = None
+    if not gmap.planet_field().segment_clear(ship.x, ship.y, closest.x, closest.y, ship.radius + .00001):
+        heading = gmap.flow_fields().heading(target, ship)
+    if heading is None:
+        return nav(ship, closest, gmap, obs, move_table, speed=speed, max_deviation=max_deviation)
+    step = Point.polar(speed, heading)
+    return nav(ship, Position(ship.x + step.x, ship.y + step.y), gmap, obs, move_table, speed=speed,
+               max_deviation=max_deviation)
 
 
 def rush_nav(ship, targ, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviation=180):
@@ -237,37 +526,13 @@ def rush_nav(ship, targ, gmap, obs, move_table={}, speed=MAX_SPEED, max_deviatio
     speed = speed if (dist >= speed) else int(dist)
 
     if obs == None:
-        dships = [s for s in gmap.get_me().all_ships() if not (s.docking_status == Ship.DockingStatus.UNDOCKED)]
-        uships = [s for s in gmap.get_me().all_ships() if (s.docking_status == Ship.DockingStatus.UNDOCKED)]
-        obs = [e for e in gmap.all_planets() + dships
-               if ship.calculate_distance_between(e) - ship.radius - e.radius <= dist]
-        obs.extend([e for e in uships if e != ship
-                    and ship.calculate_distance_between(e) - ship.radius - e.radius <= MAX_SPEED * 2])
-
-    obs = sorted(obs, key=lambda t: ship.calculate_distance_between(t))
+        obs = gather_obstacles(ship, gmap, dist)
+
     angs = [int(n / 2) if n % 2 == 0 else -int(n / 2) for n in range(1, max_deviation * 2 + 2)]
     speeds = [spd for spd in range(speed, 0, -1)]
 
-    for d_ang in angs:
-        for spd in speeds:
-            move_ang = (angle + d_ang) % 360
-            d = Point.polar(spd, move_ang)
-            move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + d)
-
-            d = Point.polar(dist, move_ang)
-            full_move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + d)
-
-            for e in obs:
-                collide_dist = ship.radius + e.radius + .00001
-
-                if e in move_table and min_dist(move, move_table[e]) <= collide_dist:
-                    break
-                elif not e in move_table:
-                    if type(e) == Ship and (e.docking_status == Ship.DockingStatus.UNDOCKED):
-                        if ps_dist(Point(e.x, e.y), move) <= collide_dist:
-                            break
-                    elif ps_dist(Point(e.x, e.y), full_move) <= collide_dist + 2:
-                        break
-            else:
-                return ship.thrust(spd, move_ang), move, spd, move_ang
-    return None, None, None, None
+    move_ang, spd = first_free_move(ship, dist, angle, angs, speeds, obs, move_table, margin=2)
+    if move_ang is None:
+        return None, None, None, None
+    move = Seg(Point(ship.x, ship.y), Point(ship.x, ship.y) + Point.polar(spd, move_ang))
+    return ship.thrust(spd, move_ang), move, spd, move_ang
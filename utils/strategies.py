@@ -31,17 +31,18 @@ def standard_strategy(ship: hlt.entity.Ship, fc: FeatureCollector):
     elif fc.closest_avail_assigned_planet() and fc.closest_avail_unassigned_planet():
         # logging.info("GO TO CLOSEST AVAIL PLANET FROM (ASSIGNED AND UNASSIGNED PLANETS)")
         # Starting planet choice assumes greedy choice
-        if ((fc.turn < 10) and ship.calculate_distance_between(
+        if ((fc.turn < 10) and fc.game_map.distance(ship,
                 fc.closest_avail_unassigned_planet()) + my_const.GREEDY_PLANET_DISTANCE <
-            ship.calculate_distance_between(fc.closest_avail_assigned_planet())) or \
-                ((fc.turn >= 10) and ship.calculate_distance_between(
-                    fc.closest_avail_unassigned_planet()) < ship.calculate_distance_between(
+            fc.game_map.distance(ship, fc.closest_avail_assigned_planet())) or \
+                ((fc.turn >= 10) and fc.game_map.distance(ship,
+                    fc.closest_avail_unassigned_planet()) < fc.game_map.distance(ship,
                     fc.closest_avail_assigned_planet())):
 
             if fc.closest_avail_unassigned_planet().is_owned():
                 # it's enemy's
-                navigation.attack_and_assign(ship, fc.closest_enemy_to_planet(
-                    fc.closest_avail_unassigned_planet().id), fc)
+                enemy = fc.closest_enemy_to_planet(fc.closest_avail_unassigned_planet().id)
+                if enemy is not None:
+                    navigation.attack_and_assign(ship, enemy, fc)
             else:
                 # it's empty
                 if ship.can_dock(fc.closest_avail_unassigned_planet()):
@@ -81,8 +82,9 @@ def standard_strategy(ship: hlt.entity.Ship, fc: FeatureCollector):
         logging.info("NO AVAIL ASSIGNED PLANETS. GO ON CLOSEST AVAIL UNASSIGNED")
         if fc.closest_avail_unassigned_planet().is_owned():
             # it's enemy's
-            navigation.attack_and_assign(ship, fc.closest_enemy_to_planet(
-                fc.closest_avail_unassigned_planet().id), fc)
+            enemy = fc.closest_enemy_to_planet(fc.closest_avail_unassigned_planet().id)
+            if enemy is not None:
+                navigation.attack_and_assign(ship, enemy, fc)
         else:
             # it's empty
             if ship.can_dock(fc.closest_avail_unassigned_planet()):
@@ -115,7 +117,7 @@ def strategy_if_assigned(ship: hlt.entity.Ship, fc: FeatureCollector):
 
     # Strategy for ship assigned to enemy ships
     if fc.assigned_ships[ship.id] == "enemy":
-        if ship.calculate_distance_between(fc.closest_enemy_ships[0]) < (2 * hlt.constants.MAX_SPEED):
+        if fc.game_map.distance(ship, fc.closest_enemy_ships[0]) < (2 * hlt.constants.MAX_SPEED):
             # if closest enemy closer than 2 * MAX_SPEED
             if fc.closest_enemy_ships[0].id == fc.ship_enemy_ship_dict[ship.id].id:
                 # if it is that same assigned enemy
@@ -199,7 +201,7 @@ def rush_strategy(ship: hlt.entity.Ship, fc: FeatureCollector):
                 fc.rush_leader = [ship for ship in fc.sorted_ships_from_enemy(fc.closest_enemy_ships[0]) if
                                   ship.id != fc.rush_miner.id][0]
 
-                distances = [ship.calculate_distance_between(target) for target in fc.team_ships if
+                distances = [fc.game_map.distance(ship, target) for target in fc.team_ships if
                              (target.id != ship.id) and (target.id != fc.rush_miner.id)]
 
                 # Ships need to be close to each other for more efficient defence.
@@ -258,7 +260,7 @@ def rush_strategy(ship: hlt.entity.Ship, fc: FeatureCollector):
         elif ship.docking_status == ship.DockingStatus.UNDOCKED:
             fc.rush_leader = fc.sorted_ships_from_enemy(fc.closest_enemy_ships[0])[0]
 
-            distances = [ship.calculate_distance_between(target) for target in fc.team_ships if
+            distances = [fc.game_map.distance(ship, target) for target in fc.team_ships if
                          target.id != ship.id]
 
             # Ships need to be close to each other for more efficient defence.